@@ -1,15 +1,31 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 import time
 from typing import Optional
 
-import numpy as np
+from av import VideoFrame
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 
-from app.core.dependencies import get_ocr_service, get_yolo_service
+from app.core.dependencies import (
+    get_batch_scheduler,
+    get_ocr_pool,
+    get_ocr_service,
+    get_resource_plan,
+    get_session_registry,
+    get_yolo_service,
+    is_detector_ready,
+    is_ocr_ready,
+)
 from app.schemas.models import OfferRequest
+from app.services import metrics
+from app.services.frame_quality import RingEntry, assess_frame
+from app.services.motion_gate import predict_gated
+from app.services.ocr_cache import OCRResultCache
+from app.services.ocr_pool import OCRBusyError
+from app.services.session_service import KTPSession
 from app.services.webrtc_service import WebRTCService
 
 logger = logging.getLogger(__name__)
@@ -22,7 +38,7 @@ _main_loop: Optional[asyncio.AbstractEventLoop] = None  # ✅ simpan loop di mod
 def get_webrtc_service() -> WebRTCService:
     global _webrtc_service
     if _webrtc_service is None:
-        _webrtc_service = WebRTCService()
+        _webrtc_service = WebRTCService(sessions=get_session_registry())
     return _webrtc_service
 
 
@@ -32,15 +48,19 @@ class ConnectionManager:
     def __init__(self) -> None:
         self._connections: list[WebSocket] = []
 
+    @property
+    def count(self) -> int:
+        return len(self._connections)
+
     async def connect(self, ws: WebSocket) -> None:
         await ws.accept()
         self._connections.append(ws)
-        logger.info("WebSocket terhubung. Total: %d", len(self._connections))
+        logger.info("WebSocket terhubung. Total: %d", self.count)
 
     def disconnect(self, ws: WebSocket) -> None:
         if ws in self._connections:
             self._connections.remove(ws)
-        logger.info("WebSocket terputus. Total: %d", len(self._connections))
+        logger.info("WebSocket terputus. Total: %d", self.count)
 
     async def broadcast(self, message: dict) -> None:
         dead: list[WebSocket] = []
@@ -56,21 +76,6 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
-# ─── YOLO Throttle ────────────────────────────────────────────────────────────
-
-class YOLOThrottle:
-    INTERVAL = 0.3  # ✅ 3 → 0.3 (3 fps, bukan 1 frame per 3 detik)
-
-    def __init__(self) -> None:
-        self._last_ts: float = 0.0
-
-    def should_run(self) -> bool:
-        return (time.perf_counter() - self._last_ts) >= self.INTERVAL
-
-    def mark(self) -> None:
-        self._last_ts = time.perf_counter()
-
-
 # ─── WebRTC Offer — KTP ───────────────────────────────────────────────────────
 
 @router.post("/offer")
@@ -78,35 +83,49 @@ async def offer(payload: OfferRequest) -> dict:
     global _main_loop
     _main_loop = asyncio.get_running_loop()  # ✅ get_running_loop, bukan get_event_loop
 
+    if not is_detector_ready():
+        raise HTTPException(status_code=503, detail="Detektor KTP masih dimuat. Coba lagi sebentar.")
+
     service  = get_webrtc_service()
-    throttle = YOLOThrottle()
+    session  = get_session_registry().create()
+    session.auto_capture.enabled = payload.auto_capture
+    throttle = session.throttle
+    tracker  = session.tracker
 
-    def on_frame(frame: np.ndarray) -> None:
+    def on_frame(frame: VideoFrame) -> None:
         svc = get_yolo_service()
         if svc is None or _main_loop is None:
             logger.warning("on_frame: service atau loop belum siap")
             return
 
-        svc.store_frame(frame)
+        session.store_frame(frame)
 
-        if not throttle.should_run():
-            return
-
-        throttle.mark()
-        logger.debug("on_frame: scheduling _run_yolo")
-        asyncio.run_coroutine_threadsafe(
-            _run_yolo(frame, svc), _main_loop  # ✅ pakai _main_loop
-        )
+        # Detektor penuh hanya jika tracker tidak yakin / cadence lambat sudah lewat.
+        if tracker.redetect_due() and throttle.should_run():
+            throttle.mark()
+            logger.debug("on_frame: scheduling _run_yolo")
+            asyncio.run_coroutine_threadsafe(
+                _run_yolo(svc, session), _main_loop  # ✅ pakai _main_loop
+            )
+        elif tracker.track_due() and not throttle.in_flight:
+            tracker.in_flight = True
+            asyncio.run_coroutine_threadsafe(_run_tracker(session), _main_loop)
 
     try:
         answer = await service.handle_offer(
             sdp=payload.sdp,
             type_=payload.type,
             on_frame=on_frame,
+            session_id=session.session_id,
+            decode=False,
         )
-        return answer
+        session.peer_active = True
+        # Kredensial sesi hanya dikirim ke pemilik peer connection ini; client
+        # memakainya untuk membuka /ws/notify.
+        return {**answer, "session_id": session.session_id, "session_token": session.token}
     except Exception as e:
         logger.error("Gagal handle offer: %s", e)
+        get_session_registry().remove(session.session_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -119,7 +138,7 @@ async def offer_face(payload: OfferRequest) -> dict:
 
     service = get_webrtc_service()
 
-    def on_frame(frame: np.ndarray) -> None:
+    def on_frame(frame: VideoFrame) -> None:
         if _main_loop is None:
             return
         asyncio.run_coroutine_threadsafe(
@@ -132,6 +151,7 @@ async def offer_face(payload: OfferRequest) -> dict:
             sdp=payload.sdp,
             type_=payload.type,
             on_frame=on_frame,
+            decode=False,
         )
         return answer
     except Exception as e:
@@ -141,103 +161,398 @@ async def offer_face(payload: OfferRequest) -> dict:
 
 # ─── YOLO Runner ─────────────────────────────────────────────────────────────
 
-async def _run_yolo(frame: np.ndarray, yolo_service) -> None:
-    logger.info("_run_yolo: started")
-    loop = asyncio.get_running_loop()
+def _predict_latest(yolo_service, session: KTPSession) -> tuple:
+    # Decode baru terjadi di sini (thread executor), hanya untuk frame yang lolos throttle.
+    frame = session.last_frame
+    if frame is None:
+        return None, []
+    return frame, predict_gated(yolo_service, session.motion_gate, frame)
+
+
+async def _run_yolo(yolo_service, session: KTPSession) -> None:
+    logger.info("_run_yolo: started | session=%s", session.session_id)
+    loop      = asyncio.get_running_loop()
+    scheduler = get_batch_scheduler()
+    t0        = time.perf_counter()
 
     try:
-        boxes = await loop.run_in_executor(None, yolo_service.predict, frame)
+        if scheduler is not None:
+            frame, boxes = await scheduler.submit(session)
+        else:
+            frame, boxes = await loop.run_in_executor(None, _predict_latest, yolo_service, session)
         logger.info("_run_yolo: %d box ditemukan", len(boxes))
 
+        await loop.run_in_executor(
+            None, _reset_tracker, session, frame, boxes[0] if boxes else None
+        )
+
+        session.auto_capture.observe(boxes[0] if boxes else None)
+
         if boxes:
-            yolo_service.store_box(boxes[0])
-            await manager.broadcast({
-                "event": "yolo_result",
-                "boxes": [b.to_dict() for b in boxes],
+            session.store_box(boxes[0])
+            await session.send({
+                "event":  "yolo_result",
+                "source": "detector",
+                "boxes":  [b.to_dict() for b in boxes],
             })
             logger.info("YOLO KTP detected: score=%.2f", boxes[0].score)
+            _maybe_auto_capture(session)
         else:
-            yolo_service.store_box(None)
-            await manager.broadcast({"event": "no_ktp"})
+            session.store_box(None)
+            await session.send({"event": "no_ktp"})
 
     except Exception as e:
         logger.error("YOLO predict error: %s", e)
 
+    finally:
+        session.throttle.done(
+            time.perf_counter() - t0,
+            backlog=scheduler.queue_depth if scheduler is not None else 0,
+        )
+
+
+# ─── Box Tracker ─────────────────────────────────────────────────────────────
+
+def _reset_tracker(session: KTPSession, frame, box) -> None:
+    session.tracker.reset(frame, box)
+    if box is not None:
+        session.frame_ring.push(frame, box)
+
+
+def _track_latest(session: KTPSession):
+    seq   = session.mailbox.seq
+    frame = session.last_frame
+    if frame is None:
+        return None
+    box = session.tracker.update(frame, seq=seq)
+    if box is not None:
+        session.frame_ring.push(frame, box)
+    return box
+
+
+async def _run_tracker(session: KTPSession) -> None:
+    loop = asyncio.get_running_loop()
+
+    try:
+        box = await loop.run_in_executor(None, _track_latest, session)
+        if box is None:
+            return
+
+        session.store_box(box)
+        await session.send({
+            "event":  "yolo_result",
+            "source": "tracker",
+            "boxes":  [box.to_dict()],
+        })
+
+    except Exception as e:
+        logger.error("Box tracker error: %s", e)
+
+    finally:
+        session.tracker.in_flight = False
+
 
 # ─── WebSocket Notify ─────────────────────────────────────────────────────────
 
 @router.websocket("/ws/notify")
-async def notify(ws: WebSocket) -> None:
+async def notify(ws: WebSocket, session_id: Optional[str] = None, token: Optional[str] = None) -> None:
+    session = get_session_registry().attach_websocket(session_id, token, ws)
+    if session is None:
+        await ws.close(code=1008)  # policy violation: sesi/token tidak cocok atau sudah dipakai
+        return
     await manager.connect(ws)
 
     try:
-        await ws.send_json({"event": "connected", "message": "Siap menerima notifikasi."})
+        await ws.send_json({
+            "event":      "connected",
+            "message":    "Siap menerima notifikasi.",
+            "session_id": session.session_id,
+        })
 
         while True:
             data  = await ws.receive_json()
             event = data.get("event")
 
             if event == "capture":
-                await _handle_capture(ws)
+                await _handle_capture(ws, session, data.get("ocr_profile"))
+            elif event == "auto_capture":
+                session.auto_capture.enabled = bool(data.get("enabled", True))
             elif event == "ping":
                 await ws.send_json({"event": "pong"})
 
     except WebSocketDisconnect:
-        manager.disconnect(ws)
+        pass
     except Exception as e:
         logger.error("WebSocket error: %s", e)
+    finally:
         manager.disconnect(ws)
+        get_session_registry().detach_websocket(session)
+
+
+# ─── Sessions ─────────────────────────────────────────────────────────────────
+
+@router.get("/sessions")
+def sessions() -> dict:
+    registry  = get_session_registry()
+    scheduler = get_batch_scheduler()
+    ocr_pool  = get_ocr_pool()
+    ocr_cache = _ocr_cache()
+    plan      = get_resource_plan()
+    return {
+        "active_sessions":         len(registry),
+        "active_peer_connections": get_webrtc_service().active_connections,
+        "yolo_batching": {
+            "queue_depth": scheduler.queue_depth,
+            **scheduler.stats.to_dict(),
+        } if scheduler is not None else None,
+        "ocr_pool":                ocr_pool.to_dict() if ocr_pool is not None else None,
+        "ocr_cache":               ocr_cache.to_dict() if ocr_cache is not None else None,
+        "ocr_predictors":          _ocr_predictor_usage(),
+        "resource_plan":           plan.to_dict() if plan is not None else None,
+        "sessions":                registry.snapshot(),
+    }
+
+
+def _ocr_predictor_usage() -> Optional[dict]:
+    """Utilisasi pool predictor PaddleOCR in-process (None jika OCR jalan di process pool)."""
+    if get_ocr_pool() is not None:
+        return None
+    try:
+        return get_ocr_service().predictor_usage()
+    except HTTPException:
+        return None
 
 
-# ─── Capture Handler ──────────────────────────────────────────────────────────
+def _allowed_ocr_profiles() -> tuple[str, ...]:
+    """Profil PaddleOCR yang dimuat server (OCR_PADDLE_PROFILE + OCR_ALLOWED_PROFILES)."""
+    ocr_pool = get_ocr_pool()
+    if ocr_pool is not None:
+        return ocr_pool.allowed_profiles
+    return get_ocr_service().allowed_profiles
 
-async def _handle_capture(ws: WebSocket) -> None:
-    ocr_service  = get_ocr_service()
-    yolo_service = get_yolo_service()
-    loop         = asyncio.get_running_loop()  # ✅ get_running_loop
 
-    if yolo_service.last_frame is None:
-        await ws.send_json({
+def _ocr_cache() -> Optional[OCRResultCache]:
+    ocr_pool = get_ocr_pool()
+    if ocr_pool is not None:
+        return ocr_pool.cache
+    try:
+        return get_ocr_service().cache
+    except HTTPException:
+        return None
+
+
+# ─── Metrics ──────────────────────────────────────────────────────────────────
+# Gauge dibaca saat /metrics di-scrape; histogram latency tahap diisi langsung
+# oleh service (app/services/metrics.py).
+
+metrics.register_gauge(
+    "ekyc_peer_connections", "Peer connection WebRTC aktif.",
+    lambda: get_webrtc_service().active_connections,
+)
+metrics.register_gauge(
+    "ekyc_websocket_clients", "Client WebSocket terhubung.",
+    lambda: manager.count,
+)
+metrics.register_gauge(
+    "ekyc_yolo_queue_depth", "Frame yang menunggu batch YOLO.",
+    lambda: get_batch_scheduler().queue_depth if get_batch_scheduler() is not None else 0,
+)
+metrics.register_gauge(
+    "ekyc_ocr_in_flight", "Job OCR yang sedang berjalan di process pool.",
+    lambda: get_ocr_pool().in_flight if get_ocr_pool() is not None else 0,
+)
+metrics.register_gauge(
+    "ekyc_session_frames_dropped_total", "Frame tertimpa di mailbox sebelum sempat di-decode, per sesi.",
+    lambda: get_session_registry().frames_dropped(),
+    label="session", kind="counter",
+)
+
+
+# ─── Capture Handler ──────────────────────────────────────────────────────────
+
+async def _handle_capture(ws: WebSocket, session: KTPSession, ocr_profile: Optional[str] = None) -> None:
+    # Single-flight per sesi: capture yang datang saat OCR (manual/otomatis)
+    # masih berjalan tidak memulai OCR kedua; hasilnya dikirim oleh run tersebut.
+    if session.capture_in_flight:
+        logger.info("Capture digabung ke OCR yang sedang berjalan | session=%s", session.session_id)
+        return
+    if not is_ocr_ready():
+        await session.send({
             "event":  "capture_failed",
-            "reason": "Belum ada frame yang diterima.",
+            "reason": "OCR masih dimuat. Coba lagi sebentar.",
         })
         return
-
-    if yolo_service.last_box is None:
-        await ws.send_json({
+    allowed = _allowed_ocr_profiles()
+    if ocr_profile is not None and ocr_profile not in allowed:
+        await session.send({
             "event":  "capture_failed",
-            "reason": "KTP belum terdeteksi. Arahkan KTP ke kamera.",
+            "reason": f"Profil OCR tidak diizinkan: {ocr_profile!r}. Pilihan: {', '.join(allowed)}",
         })
         return
+    await _start_capture(session, ocr_profile=ocr_profile)
 
-    await ws.send_json({
-        "event":   "capture_processing",
-        "message": "Memproses OCR...",
-    })
+
+def _start_capture(
+        session: KTPSession,
+        auto: bool = False,
+        ocr_profile: Optional[str] = None,
+) -> asyncio.Task:
+    session.capture_task = asyncio.get_running_loop().create_task(_run_capture(session, auto, ocr_profile))
+    return session.capture_task
+
+
+def _maybe_auto_capture(session: KTPSession) -> None:
+    trigger = session.auto_capture
+    if session.capture_in_flight or not is_ocr_ready() or not trigger.ready(session.frame_ring.best()):
+        return
+    trigger.fired()
+    logger.info("Auto-capture | session=%s | stable=%d", session.session_id, trigger.stable_count)
+    _start_capture(session, auto=True)
+
+
+async def _run_capture(session: KTPSession, auto: bool = False, ocr_profile: Optional[str] = None) -> None:
+    ocr_pool     = get_ocr_pool()
+    ocr_service  = get_ocr_service() if ocr_pool is None else None
+    yolo_service = get_yolo_service()
+    loop         = asyncio.get_running_loop()  # ✅ get_running_loop
+    captured     = False
 
     try:
-        frame   = yolo_service.last_frame
-        box     = yolo_service.last_box
-        cropped = yolo_service.crop(frame, box)
+        if not session.has_frame:
+            await session.send({
+                "event":  "capture_failed",
+                "reason": "Belum ada frame yang diterima.",
+            })
+            return
 
-        ktp_data = await loop.run_in_executor(
-            None, ocr_service.extract_from_array, cropped
-        )
+        if session.last_box is None:
+            await session.send({
+                "event":  "capture_failed",
+                "reason": "KTP belum terdeteksi. Arahkan KTP ke kamera.",
+            })
+            return
 
-        await ws.send_json({
+        # Gate kualitas: frame yang pasti gagal di-OCR ditolak tanpa masuk antrian.
+        entry = await loop.run_in_executor(None, _best_capture_frame, session)
+        if entry.quality.hopeless:
+            logger.info(
+                "Capture ditolak (kualitas) | session=%s | %s",
+                session.session_id, entry.quality.to_dict(),
+            )
+            await session.send({
+                "event":   "capture_failed",
+                "reason":  entry.quality.reason(),
+                "quality": entry.quality.to_dict(),
+            })
+            return
+
+        # Frame yang sama sudah pernah di-OCR: kirim ulang hasilnya.
+        if entry.frame is session.captured_frame and session.captured_result is not None:
+            captured = True
+            await session.send({
+                "event": "ktp_result",
+                "data":  session.captured_result,
+                "auto":  auto,
+            })
+            return
+
+        if ocr_pool is not None and ocr_pool.in_flight >= ocr_pool.capacity:
+            await _send_busy(session, ocr_pool.estimated_wait())
+            return
+
+        await session.send({
+            "event":   "capture_processing",
+            "message": "Memproses OCR...",
+            "auto":    auto,
+        })
+
+        # Konsensus: frame terbaik + frame bagus lain dari ring (jika diaktifkan).
+        n_frames   = ocr_pool.consensus_frames if ocr_pool is not None else ocr_service.consensus_frames
+        entries    = [entry]
+        for e in session.frame_ring.top(n_frames):
+            if len(entries) < n_frames and all(e.frame is not x.frame for x in entries):
+                entries.append(e)
+        crops      = [yolo_service.crop(e.frame, e.box) for e in entries]
+        on_partial = _partial_sender(session, loop)
+
+        if ocr_pool is not None:
+            ktp_data = await ocr_pool.extract_consensus(
+                crops, session_id=session.session_id, on_partial=on_partial, ocr_profile=ocr_profile
+            )
+        else:
+            ktp_data = await loop.run_in_executor(
+                None,
+                functools.partial(
+                    ocr_service.extract_consensus,
+                    crops,
+                    session_id=session.session_id,
+                    on_partial=on_partial,
+                    ocr_profile=ocr_profile,
+                ),
+            )
+
+        captured = True
+        session.captured_frame  = entry.frame
+        session.captured_result = ktp_data.to_dict()
+        await session.send({
             "event": "ktp_result",
-            "data":  ktp_data.to_dict(),
+            "data":  session.captured_result,
+            "auto":  auto,
         })
 
         logger.info(
-            "Capture selesai | completeness=%.0f%% | NIK=%s",
+            "Capture selesai | session=%s | auto=%s | completeness=%.0f%% | NIK=%s",
+            session.session_id,
+            auto,
             ktp_data.completeness * 100,
             ktp_data.nik or "NOT FOUND",
         )
 
+    except OCRBusyError as e:
+        await _send_busy(session, e.estimated_wait)
+
     except Exception as e:
         logger.error("Capture OCR error: %s", e)
-        await ws.send_json({
+        await session.send({
             "event":  "capture_failed",
             "reason": f"OCR error: {str(e)}",
         })
+
+    finally:
+        if auto and not captured:
+            session.auto_capture.rearm()
+
+
+def _partial_sender(session: KTPSession, loop: asyncio.AbstractEventLoop):
+    """
+    Callback hasil OCR parsial. Dipanggil dari thread executor / thread
+    pembaca OCR pool, jadi pengiriman dijadwalkan ke event loop.
+    """
+    def send(partial: dict) -> None:
+        asyncio.run_coroutine_threadsafe(
+            session.send({"event": "ktp_partial", **partial}), loop
+        )
+    return send
+
+
+def _best_capture_frame(session: KTPSession) -> RingEntry:
+    """
+    Frame terbaik dari ring buffer sesi. Jika ring kosong/kedaluwarsa, pakai
+    frame terakhir + box terakhir dan nilai kualitasnya saat itu juga.
+    """
+    entry = session.frame_ring.best()
+    if entry is not None:
+        return entry
+    frame = session.mailbox.latest()
+    box   = session.last_box
+    return RingEntry(frame=frame, box=box, quality=assess_frame(frame, box), ts=time.perf_counter())
+
+
+async def _send_busy(session: KTPSession, estimated_wait: float) -> None:
+    logger.warning("Capture ditolak: antrian OCR penuh (~%.1fs)", estimated_wait)
+    await session.send({
+        "event":       "capture_failed",
+        "reason":      f"Server sibuk, coba lagi dalam ~{estimated_wait:.0f} detik.",
+        "busy":        True,
+        "retry_after": round(estimated_wait, 1),
+    })
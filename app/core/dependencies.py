@@ -1,7 +1,11 @@
 import logging
 from typing import Optional
 
+from app.services.batch_scheduler import YOLOBatchScheduler
+from app.services.ocr_pool import OCRProcessPool
 from app.services.ocr_service import OCRService
+from app.services.resource_plan import ResourcePlan
+from app.services.session_service import SessionRegistry
 from app.services.yolo_service import YOLOService
 from fastapi import HTTPException
 
@@ -9,22 +13,57 @@ logger = logging.getLogger(__name__)
 
 _ocr_service: Optional[OCRService] = None
 _yolo_service: Optional[YOLOService] = None
+_batch_scheduler: Optional[YOLOBatchScheduler] = None
+_ocr_pool: Optional[OCRProcessPool] = None
+_resource_plan: Optional[ResourcePlan] = None
+_session_registry = SessionRegistry()
 
+# Cold start per tahap (detik) dan error tahap yang gagal, untuk /health.
+_startup_timings: dict[str, float] = {}
+_startup_errors: dict[str, str] = {}
 
-def set_services(
-        ocr_svc: OCRService,
-        yolo_svc: YOLOService
-) -> None:
-    global _ocr_service, _yolo_service
 
-    _ocr_service = ocr_svc
+def set_resource_plan(resource_plan: Optional[ResourcePlan]) -> None:
+    global _resource_plan
+    _resource_plan = resource_plan
+
+
+def set_detector(yolo_svc: YOLOService, batch_scheduler: Optional[YOLOBatchScheduler] = None) -> None:
+    """Tahap detektor siap: preview KTP (offer + YOLO) sudah bisa dilayani."""
+    global _yolo_service, _batch_scheduler
+
     _yolo_service = yolo_svc
+    _batch_scheduler = batch_scheduler
+    logger.info("Dependencies registered: YOLO Service=%s | YOLO Batcher=%s",
+                _yolo_service is not None, _batch_scheduler is not None)
+
+
+def set_ocr(ocr_svc: Optional[OCRService], ocr_pool: Optional[OCRProcessPool] = None) -> None:
+    """Tahap OCR siap: capture sudah bisa dilayani."""
+    global _ocr_service, _ocr_pool
+
+    _ocr_service = ocr_svc
+    _ocr_pool = ocr_pool
+    _session_registry.ocr_cache = ocr_pool.cache if ocr_pool is not None else getattr(ocr_svc, "cache", None)
+    logger.info("Dependencies registered: OCR Service=%s | OCR Pool=%s",
+                _ocr_service is not None, _ocr_pool is not None)
+
+
+def record_startup(stage: str, seconds: float) -> None:
+    _startup_timings[stage] = seconds
+    logger.info("Cold start | %-12s | %.2fs", stage, seconds)
+
+
+def record_startup_error(stage: str, error: Exception) -> None:
+    _startup_errors[stage] = str(error)
+    logger.error("Cold start gagal | %s | %s", stage, error)
+
 
-    logger.info("=" * 60)
-    logger.info("Dependencies registered:")
-    logger.info("  OCR  Service : %s", _ocr_service is not None)
-    logger.info("  YOLO Service : %s", _yolo_service is not None)
-    logger.info("=" * 60)
+def startup_report() -> dict:
+    return {
+        "timings_s": {k: round(v, 3) for k, v in _startup_timings.items()},
+        "errors": dict(_startup_errors),
+    }
 
 
 def get_ocr_service() -> OCRService:
@@ -46,17 +85,47 @@ def get_yolo_service() -> YOLOService:
 
     return _yolo_service
 
+def get_ocr_pool() -> Optional[OCRProcessPool]:
+    return _ocr_pool
+
+
+def get_batch_scheduler() -> Optional[YOLOBatchScheduler]:
+    return _batch_scheduler
+
+
+def get_resource_plan() -> Optional[ResourcePlan]:
+    return _resource_plan
+
+
+def get_session_registry() -> SessionRegistry:
+    return _session_registry
+
+
 def cleanup_services() -> None:
-    global _ocr_service, _yolo_service
+    global _ocr_service, _yolo_service, _batch_scheduler, _ocr_pool, _resource_plan
 
     logger.info("Membersihkan semua service...")
+    if _ocr_pool is not None:
+        _ocr_pool.shutdown()
     _ocr_service = None
     _yolo_service = None
+    _batch_scheduler = None
+    _ocr_pool = None
+    _resource_plan = None
+    _startup_timings.clear()
+    _startup_errors.clear()
+    _session_registry.clear()
+    _session_registry.ocr_cache = None
     logger.info("Semua service dibersihkan.")
 
 
+def is_detector_ready() -> bool:
+    return _yolo_service is not None
+
+
+def is_ocr_ready() -> bool:
+    return _ocr_service is not None or _ocr_pool is not None
+
+
 def is_initialized() -> bool:
-    return all([
-        _ocr_service is not None,
-        _yolo_service is not None,
-    ])
+    return is_detector_ready() and is_ocr_ready()
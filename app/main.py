@@ -1,17 +1,41 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import functools
+import importlib
 import logging
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+import numpy as np
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 
 from app.api.routes import router as webrtc_router, get_webrtc_service
-from app.core.dependencies import set_services, cleanup_services, is_initialized
+from app.core.dependencies import (
+    cleanup_services,
+    get_batch_scheduler,
+    is_detector_ready,
+    is_initialized,
+    is_ocr_ready,
+    record_startup,
+    record_startup_error,
+    set_detector,
+    set_ocr,
+    set_resource_plan,
+    startup_report,
+)
+from app.services import metrics
+from app.services.batch_scheduler import YOLOBatchScheduler
+from app.services.ocr_cache import OCRResultCache
+from app.services.ocr_pool import OCRProcessPool
 from app.services.ocr_service import OCRService
+from app.services.resource_plan import ResourcePlan, plan_resources
 from app.services.yolo_service import YOLOService
 
 logging.basicConfig(
@@ -23,6 +47,134 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 MODEL_PATH = "model development/models/YOLO26/best_yolo26_5c0b9964.pt"
+YOLO_BACKEND = "auto"  # "auto" | "pytorch" | "onnx" | "openvino" | "openvino-int8"
+WARMUP_FRAME_SHAPE = (720, 1280, 3)  # frame kamera 720p untuk warm-up YOLO
+
+# Micro-batching YOLO lintas sesi
+YOLO_MAX_BATCH = 8
+YOLO_MAX_WAIT = 0.01  # detik
+
+# OCR di proses terpisah; 0 = OCR jalan di thread pool proses utama
+OCR_WORKERS = 2
+OCR_MAX_QUEUE = 4
+OCR_MIN_CONFIDENCE = 0.65
+OCR_MODE = "full"  # "full" | "fields" (recognition per ROI) | "layout" (deteksi + pemetaan box ke fields.json)
+OCR_PREPROCESS = "quality"  # "quality" | "balanced" | "fast" — lihat src/benchmark_preprocess.py
+# Profil PaddleOCR "default" | "server" | "mobile" | "fast" — lihat src/benchmark_paddle_profiles.py.
+# Client boleh memilih profil per capture ({"event": "capture", "ocr_profile": ...}) hanya
+# dari OCR_PADDLE_PROFILE + OCR_ALLOWED_PROFILES; semuanya dimuat di setiap worker saat startup.
+OCR_PADDLE_PROFILE = "default"
+OCR_ALLOWED_PROFILES: tuple[str, ...] = ()
+
+# Konsensus multi-frame saat capture (opt-in, frame di-OCR berurutan dalam satu
+# slot OCR); 1 = OCR satu frame terbaik saja
+OCR_CONSENSUS_FRAMES = 1
+OCR_CONSENSUS_BUDGET = 2.0  # detik
+
+# Pembagian core CPU antara event loop, YOLO, dan predictor PaddleOCR.
+# OCR_WORKERS > 0: satu predictor per proses worker; OCR_WORKERS = 0: OCR_PREDICTORS
+# instance in-process (None = ditentukan planner dari jumlah core).
+CPU_CORES = None  # None = semua core yang boleh dipakai proses ini
+OCR_PREDICTORS = None
+YOLO_CORE_SHARE = 0.25
+
+# Cache hasil OCR per sesi untuk capture berulang atas kartu yang sama
+OCR_CACHE_SIZE = 64
+OCR_CACHE_TTL = 30.0  # detik
+
+
+def _timed(stage: str, fn, *args, **kwargs):
+    """Jalankan fn (di thread executor) dan catat durasinya sebagai tahap cold start."""
+    t0 = time.perf_counter()
+    result = fn(*args, **kwargs)
+    record_startup(stage, time.perf_counter() - t0)
+    return result
+
+
+async def _start_detector(plan: ResourcePlan) -> None:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, _timed, "yolo_import", importlib.import_module, "ultralytics")
+    yolo_service = await loop.run_in_executor(None, functools.partial(
+        _timed, "yolo_load", YOLOService,
+        model_path=MODEL_PATH, device="auto", backend=YOLO_BACKEND, threads=plan.yolo_threads,
+    ))
+    # Load di atas sudah warm-up input persegi; ulangi dengan ukuran frame kamera sebenarnya.
+    dummy = np.zeros(WARMUP_FRAME_SHAPE, dtype=np.uint8)
+    await loop.run_in_executor(None, _timed, "yolo_warmup", yolo_service.predict, dummy)
+
+    batch_scheduler = YOLOBatchScheduler(
+        yolo_service,
+        max_batch_size=YOLO_MAX_BATCH,
+        max_wait=YOLO_MAX_WAIT,
+    )
+    batch_scheduler.start()
+    set_detector(yolo_service, batch_scheduler)
+
+
+async def _start_ocr(plan: ResourcePlan) -> None:
+    loop = asyncio.get_running_loop()
+    ocr_cache = OCRResultCache(max_entries=OCR_CACHE_SIZE, ttl=OCR_CACHE_TTL)
+
+    if OCR_WORKERS > 0:
+        # Import, load, dan warm-up PaddleOCR terjadi di tiap worker; batas thread
+        # native (cpu_threads) dipasang di environment worker, bukan proses utama.
+        ocr_pool = OCRProcessPool(
+            workers=OCR_WORKERS,
+            max_queue=OCR_MAX_QUEUE,
+            ocr_kwargs={
+                "min_confidence": OCR_MIN_CONFIDENCE,
+                "mode": OCR_MODE,
+                "preprocess": OCR_PREPROCESS,
+                "paddle_profile": OCR_PADDLE_PROFILE,
+                "allowed_profiles": OCR_ALLOWED_PROFILES,
+                "cpu_threads": plan.ocr_threads,
+                "consensus_frames": OCR_CONSENSUS_FRAMES,
+                "consensus_budget": OCR_CONSENSUS_BUDGET,
+            },
+            cache=ocr_cache,
+        )
+        start = loop.run_in_executor(None, _timed, "ocr_pool", ocr_pool.start)
+        try:
+            await asyncio.shield(start)
+        except BaseException:
+            # Gagal atau dibatalkan saat shutdown: start() bisa masih berjalan di
+            # executor, jadi tunggu selesai dulu lalu matikan worker yang sudah di-spawn.
+            await asyncio.gather(start, return_exceptions=True)
+            ocr_pool.shutdown()
+            raise
+        set_ocr(None, ocr_pool)
+        return
+
+    await loop.run_in_executor(None, _timed, "ocr_import", importlib.import_module, "paddleocr")
+    ocr_service = await loop.run_in_executor(None, functools.partial(
+        _timed, "ocr_load", OCRService,
+        min_confidence=OCR_MIN_CONFIDENCE,
+        mode=OCR_MODE,
+        preprocess=OCR_PREPROCESS,
+        paddle_profile=OCR_PADDLE_PROFILE,
+        allowed_profiles=OCR_ALLOWED_PROFILES,
+        predictors=plan.ocr_predictors,
+        cpu_threads=plan.ocr_threads,
+        consensus_frames=OCR_CONSENSUS_FRAMES,
+        consensus_budget=OCR_CONSENSUS_BUDGET,
+        cache=ocr_cache,
+    ))
+    await loop.run_in_executor(None, _timed, "ocr_warmup", ocr_service.warmup)
+    set_ocr(ocr_service)
+
+
+async def _warm_up(plan: ResourcePlan) -> None:
+    """Muat detektor dan OCR bersamaan; masing-masing terdaftar begitu siap."""
+    t0 = time.perf_counter()
+    stages = {"detector": _start_detector(plan), "ocr": _start_ocr(plan)}
+    results = await asyncio.gather(*stages.values(), return_exceptions=True)
+    for stage, result in zip(stages, results):
+        if isinstance(result, BaseException):
+            record_startup_error(stage, result)
+    record_startup("total", time.perf_counter() - t0)
+    if is_initialized():
+        logger.info("Semua service siap.")
+        logger.info("=" * 60)
 
 
 @asynccontextmanager
@@ -31,21 +183,43 @@ async def lifespan(app: FastAPI):
     logger.info("Veriface eKYC System starting...")
     logger.info("=" * 60)
 
-    # Load semua service saat startup
-    yolo_service = YOLOService(model_path=MODEL_PATH, device="cuda")
-    ocr_service = OCRService(min_confidence=0.65)
+    plan = plan_resources(
+        cores=CPU_CORES,
+        ocr_predictors=OCR_WORKERS if OCR_WORKERS > 0 else OCR_PREDICTORS,
+        yolo_share=YOLO_CORE_SHARE,
+        ocr_in_process=OCR_WORKERS == 0,
+    )
+    plan.log()
+    set_resource_plan(plan)
+    executor = metrics.CountingExecutor(max_workers=plan.executor_threads, thread_name_prefix="ekyc")
+    asyncio.get_running_loop().set_default_executor(executor)
+    metrics.register_gauge(
+        "ekyc_executor_queue_depth", "Task yang menunggu thread di executor default.",
+        lambda: executor.queued,
+    )
+    metrics.register_gauge(
+        "ekyc_executor_running", "Task yang sedang berjalan di executor default.",
+        lambda: executor.running,
+    )
 
-    set_services(ocr_svc=ocr_service, yolo_svc=yolo_service)
-
-    logger.info("Semua service siap. Server online.")
-    logger.info("=" * 60)
+    # Model dimuat di background: server langsung menerima request, dan /health
+    # melaporkan detector_ready / ocr_ready per tahap.
+    warm_up = asyncio.create_task(_warm_up(plan))
+    logger.info("Server online, model dimuat di background.")
 
     yield
 
     # Cleanup saat shutdown
     logger.info("Server shutting down...")
+    warm_up.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await warm_up
     await get_webrtc_service().close_all()
+    batch_scheduler = get_batch_scheduler()
+    if batch_scheduler is not None:
+        await batch_scheduler.stop()
     cleanup_services()
+    executor.shutdown(wait=False, cancel_futures=True)
     logger.info("Shutdown selesai.")
 
 
@@ -82,7 +256,28 @@ def index():
 
 @app.get("/health")
 def health():
+    report = startup_report()
     return {
-        "status": "ok",
+        "status": "error" if report["errors"] else "ok",
         "initialized": is_initialized(),
+        "detector_ready": is_detector_ready(),
+        "ocr_ready": is_ocr_ready(),
+        "startup": report,
     }
+
+
+@app.get("/health/{stage}")
+def health_stage(stage: str):
+    """Probe per tahap untuk load balancer: 200 jika siap, 503 jika belum."""
+    checks = {"detector": is_detector_ready, "ocr": is_ocr_ready, "all": is_initialized}
+    if stage not in checks:
+        raise HTTPException(status_code=404, detail=f"Tahap tidak dikenal: {stage!r}. Pilihan: {tuple(checks)}")
+    if not checks[stage]():
+        raise HTTPException(status_code=503, detail=f"{stage} belum siap.")
+    return {"stage": stage, "ready": True}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Latency per tahap pipeline KTP dan gauge runtime dalam format teks Prometheus."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -3,3 +3,4 @@ from pydantic import BaseModel
 class OfferRequest(BaseModel):
     sdp:  str
     type: str
+    auto_capture: bool = False
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from app.services.frame_quality import RingEntry, box_iou
+from app.services.yolo_service import YOLOBox
+
+
+class AutoCaptureTrigger:
+    """
+    Pemicu capture otomatis (opt-in per sesi).
+
+    Setiap hasil detektor diumpankan ke observe(). Box dianggap stabil jika
+    IoU-nya dengan deteksi sebelumnya >= STABLE_IOU; setelah STABLE_DETECTIONS
+    deteksi stabil berturut-turut dan frame terbaik di ring lolos MIN_SCORE,
+    ready() bernilai True. Setelah fired(), trigger tidak aktif lagi sampai
+    kartu hilang atau bergeser (stabilitas terputus), supaya kartu yang sama
+    tidak di-OCR berulang kali.
+    """
+
+    STABLE_DETECTIONS = 3
+    STABLE_IOU = 0.85
+    MIN_SCORE = 0.5
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.stable_count: int = 0
+        self.armed: bool = True
+        self.fired_count: int = 0
+        self._prev_box: Optional[YOLOBox] = None
+
+    def observe(self, box: Optional[YOLOBox]) -> None:
+        if box is None:
+            self.stable_count = 0
+            self.armed = True
+        elif self._prev_box is not None and box_iou(box, self._prev_box) >= self.STABLE_IOU:
+            self.stable_count += 1
+        else:
+            self.stable_count = 1
+            self.armed = True
+        self._prev_box = box
+
+    def ready(self, entry: Optional[RingEntry]) -> bool:
+        return (
+            self.enabled
+            and self.armed
+            and self.stable_count >= self.STABLE_DETECTIONS
+            and entry is not None
+            and not entry.quality.hopeless
+            and entry.quality.score >= self.MIN_SCORE
+        )
+
+    def fired(self) -> None:
+        self.armed = False
+        self.fired_count += 1
+
+    def rearm(self) -> None:
+        """Capture otomatis gagal; boleh dicoba lagi pada deteksi stabil berikutnya."""
+        self.armed = True
+
+    def to_dict(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "stable_count": self.stable_count,
+            "armed": self.armed,
+            "fired": self.fired_count,
+        }
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+from app.services.session_service import KTPSession
+from app.services.yolo_service import YOLOBox, YOLOService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Pending:
+    session: KTPSession
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class BatchStats:
+    batches: int = 0
+    frames: int = 0
+    max_batch: int = 0
+    wait_total: float = 0.0
+    wait_count: int = 0
+    wait_max: float = 0.0
+    predict_total: float = 0.0
+    size_hist: dict[int, int] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+
+    def record(self, size: int, waits: list[float], predict_s: float) -> None:
+        self.batches += 1
+        self.frames += size
+        self.max_batch = max(self.max_batch, size)
+        self.size_hist[size] = self.size_hist.get(size, 0) + 1
+        self.wait_total += sum(waits)
+        self.wait_count += len(waits)
+        self.wait_max = max(self.wait_max, max(waits, default=0.0))
+        self.predict_total += predict_s
+
+    def to_dict(self) -> dict:
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch": round(self.frames / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "batch_size_hist": dict(sorted(self.size_hist.items())),
+            "avg_queue_wait_ms": round(self.wait_total / self.wait_count * 1000, 2) if self.wait_count else 0.0,
+            "max_queue_wait_ms": round(self.wait_max * 1000, 2),
+            "avg_predict_ms": round(self.predict_total / self.batches * 1000, 2) if self.batches else 0.0,
+            "utilisation": round(min(1.0, self.predict_total / max(1e-9, time.perf_counter() - self.started)), 3),
+        }
+
+
+class YOLOBatchScheduler:
+    """
+    Micro-batching lintas sesi untuk YOLO.
+
+    Setiap YOLO tick memanggil submit(session). Request dikumpulkan sampai
+    max_batch_size terisi atau max_wait habis sejak request pertama, lalu
+    dijalankan sebagai satu YOLOService.predict_batch di executor. Batch
+    berikutnya baru dikumpulkan setelah batch sebelumnya selesai, sehingga
+    antrian yang menumpuk selama inference otomatis menjadi batch yang lebih besar.
+    """
+
+    def __init__(
+            self,
+            yolo_service: YOLOService,
+            max_batch_size: int = 8,
+            max_wait: float = 0.01,
+    ) -> None:
+        self.yolo_service = yolo_service
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait)
+        self.stats = BatchStats()
+        self._queue: asyncio.Queue[_Pending] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+            logger.info(
+                "YOLO batch scheduler aktif | max_batch=%d | max_wait=%.0fms",
+                self.max_batch_size, self.max_wait * 1000,
+            )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.cancel()
+
+    async def submit(self, session: KTPSession) -> tuple[Optional[np.ndarray], list[YOLOBox]]:
+        """
+        Antrikan frame terbaru milik sesi dan tunggu hasil deteksinya.
+        Return (frame yang dideteksi, boxes); frame None jika sesi belum punya frame.
+        """
+        if self._task is None:
+            raise RuntimeError("YOLO batch scheduler belum dijalankan.")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Pending(session=session, future=future))
+        return await future
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._dispatch(batch)
+
+    async def _dispatch(self, batch: list[_Pending]) -> None:
+        started = time.perf_counter()
+        waits = [started - p.enqueued_at for p in batch]
+
+        # Satu sesi cukup satu slot per batch; request ganda menerima hasil yang sama.
+        sessions: dict[str, KTPSession] = {}
+        for p in batch:
+            sessions.setdefault(p.session.session_id, p.session)
+
+        try:
+            results, predicted = await asyncio.get_running_loop().run_in_executor(
+                None, self._predict, list(sessions.values())
+            )
+        except Exception as e:
+            logger.error("YOLO batch predict error: %s", e)
+            for p in batch:
+                if not p.future.done():
+                    p.future.set_exception(e)
+            return
+
+        if predicted:
+            self.stats.record(predicted, waits, time.perf_counter() - started)
+
+        for p in batch:
+            if not p.future.done():
+                p.future.set_result(results.get(p.session.session_id, (None, [])))
+
+    def _predict(
+            self, sessions: list[KTPSession]
+    ) -> tuple[dict[str, tuple[np.ndarray, list[YOLOBox]]], int]:
+        """
+        Decode frame terbaru tiap sesi di thread executor, lewati sesi yang
+        scene-nya tidak berubah (MotionGate), lalu predict sisanya sekaligus.
+        Return (hasil per session_id, jumlah frame yang benar-benar di-predict).
+        """
+        results: dict[str, tuple[np.ndarray, list[YOLOBox]]] = {}
+        pending = []
+
+        for session in sessions:
+            frame = session.last_frame
+            if frame is None:
+                continue
+            boxes, sig = session.motion_gate.lookup(frame)
+            if boxes is not None:
+                results[session.session_id] = (frame, boxes)
+            else:
+                pending.append((session, frame, sig))
+
+        if pending:
+            predictions = self.yolo_service.predict_batch([frame for _, frame, _ in pending])
+            for (session, frame, sig), boxes in zip(pending, predictions):
+                session.motion_gate.store(sig, boxes)
+                results[session.session_id] = (frame, boxes)
+
+        return results, len(pending)
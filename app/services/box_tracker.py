@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import replace
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from app.services.yolo_service import YOLOBox
+
+
+class BoxTracker:
+    """
+    Tracker murah untuk menggeser YOLOBox terakhir di frame-frame antara dua deteksi.
+
+    Template kartu diambil dari frame deteksi (grayscale, lebar TRACK_WIDTH),
+    lalu dicari ulang dengan cv2.matchTemplate di jendela sekitar posisi
+    terakhir. Template tidak di-update saat tracking supaya tidak drift;
+    deteksi YOLO berikutnya yang me-reset template.
+
+    Detektor penuh dijalankan ulang jika confidence tracking turun di bawah
+    MIN_CONFIDENCE atau deteksi terakhir lebih tua dari REDETECT_INTERVAL.
+    """
+
+    TRACK_WIDTH = 160
+    SEARCH_MARGIN = 0.25      # jendela pencarian = box + 25% di tiap sisi
+    MIN_CONFIDENCE = 0.6
+    TRACK_INTERVAL = 1 / 15   # detik antar update tracking
+    REDETECT_INTERVAL = 1.0   # detik, cadence lambat detektor saat tracking stabil
+    MIN_TEMPLATE = 8          # piksel, template lebih kecil dari ini tidak di-track
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._template: Optional[np.ndarray] = None
+        self._box: Optional[YOLOBox] = None
+        self._generation: int = 0
+        self._last_seq: int = -1
+        self.confidence: float = 0.0
+        self.detected_at: float = 0.0
+        self.tracked_at: float = 0.0
+        self.in_flight: bool = False
+        self.updates: int = 0
+
+    @property
+    def active(self) -> bool:
+        return self._template is not None
+
+    def redetect_due(self) -> bool:
+        if not self.active:
+            return True
+        if self.confidence < self.MIN_CONFIDENCE:
+            return True
+        return (time.perf_counter() - self.detected_at) >= self.REDETECT_INTERVAL
+
+    def track_due(self) -> bool:
+        return (
+            self.active
+            and not self.in_flight
+            and (time.perf_counter() - self.tracked_at) >= self.TRACK_INTERVAL
+        )
+
+    @classmethod
+    def _thumbnail(cls, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        th = max(1, round(h * cls.TRACK_WIDTH / w))
+        small = cv2.resize(frame, (cls.TRACK_WIDTH, th), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def reset(self, frame: Optional[np.ndarray], box: Optional[YOLOBox]) -> None:
+        """Set ulang template dari frame deteksi. box=None menonaktifkan tracker."""
+        template = None
+        if frame is not None and box is not None:
+            thumb = self._thumbnail(frame)
+            x1, y1, x2, y2 = box.to_pixel(thumb.shape[1], thumb.shape[0])
+            x1, y1 = max(0, x1), max(0, y1)
+            crop = thumb[y1:y2, x1:x2]
+            if min(crop.shape[:2]) >= self.MIN_TEMPLATE:
+                template = crop.copy()
+
+        now = time.perf_counter()
+        with self._lock:
+            self._generation += 1
+            self._template = template
+            self._box = box if template is not None else None
+            self.confidence = 1.0 if template is not None else 0.0
+            self.detected_at = now
+            self.tracked_at = now
+
+    def update(self, frame: np.ndarray, seq: int = -1) -> Optional[YOLOBox]:
+        """
+        Cari template di frame baru. Return box hasil tracking, atau None jika
+        tracker tidak aktif, frame sama dengan sebelumnya, atau deteksi baru
+        masuk selama update berjalan.
+        """
+        with self._lock:
+            template, box, generation = self._template, self._box, self._generation
+            if template is None or box is None or seq == self._last_seq:
+                return None
+
+        thumb = self._thumbnail(frame)
+        th, tw = template.shape[:2]
+        H, W = thumb.shape[:2]
+
+        x1, y1, _, _ = box.to_pixel(W, H)
+        mx, my = int(tw * self.SEARCH_MARGIN) + 1, int(th * self.SEARCH_MARGIN) + 1
+        sx1, sy1 = max(0, x1 - mx), max(0, y1 - my)
+        sx2, sy2 = min(W, x1 + tw + mx), min(H, y1 + th + my)
+        window = thumb[sy1:sy2, sx1:sx2]
+
+        if window.shape[0] < th or window.shape[1] < tw:
+            score, new_box = 0.0, box
+        else:
+            result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (px, py) = cv2.minMaxLoc(result)
+            new_box = replace(box, x=(sx1 + px) / W, y=(sy1 + py) / H)
+
+        with self._lock:
+            if generation != self._generation:
+                return None
+            self._box = new_box
+            self._last_seq = seq
+            self.confidence = float(score)
+            self.tracked_at = time.perf_counter()
+            self.updates += 1
+
+        return new_box if score >= self.MIN_CONFIDENCE else None
+
+    def to_dict(self) -> dict:
+        return {
+            "active": self.active,
+            "confidence": round(self.confidence, 3),
+            "updates": self.updates,
+        }
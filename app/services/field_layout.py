@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence
+
+Box = tuple[float, float, float, float]   # (x1, y1, x2, y2)
+
+
+class FieldLayout:
+    """
+    Index spasial field box template (koordinat fields.json) untuk memetakan
+    box teks hasil deteksi PaddleOCR ke field KTP.
+
+    Bidang template dibagi grid GRID x GRID sel; tiap sel menyimpan field yang
+    box-nya (plus PAD) menyentuh sel itu. Box teks hanya dibandingkan dengan
+    field di sel yang ia tutupi, jadi biaya per baris konstan dan total
+    assign() linear terhadap jumlah baris OCR. Baris yang tidak menyentuh
+    field mana pun (label statis "Nama", "Agama", header provinsi, dst.)
+    langsung dibuang.
+    """
+
+    GRID = 16
+    PAD = 8               # piksel template di sekitar tiap field box
+    MIN_V_OVERLAP = 0.5   # irisan vertikal minimal relatif tinggi yang lebih kecil
+
+    def __init__(self, fields: dict[str, Sequence[int]], size: tuple[int, int]) -> None:
+        self.size = size
+        self._cell_w = size[0] / self.GRID
+        self._cell_h = size[1] / self.GRID
+        self._fields: list[tuple[str, Box]] = []
+        self._cells: list[list[list[int]]] = [[[] for _ in range(self.GRID)] for _ in range(self.GRID)]
+
+        for name, (x1, y1, x2, y2) in fields.items():
+            idx = len(self._fields)
+            box = (x1 - self.PAD, y1 - self.PAD, x2 + self.PAD, y2 + self.PAD)
+            self._fields.append((name, box))
+            for row in self._span(box[1], box[3], self._cell_h):
+                for col in self._span(box[0], box[2], self._cell_w):
+                    self._cells[row][col].append(idx)
+
+    def _span(self, lo: float, hi: float, cell: float) -> range:
+        first = min(self.GRID - 1, max(0, int(lo // cell)))
+        last = min(self.GRID - 1, max(0, int(hi // cell)))
+        return range(first, last + 1)
+
+    def match(self, box: Box) -> Optional[str]:
+        """Field dengan irisan terbesar terhadap box (koordinat template), atau None."""
+        x1, y1, x2, y2 = box
+        candidates: set[int] = set()
+        for row in self._span(y1, y2, self._cell_h):
+            for col in self._span(x1, x2, self._cell_w):
+                candidates.update(self._cells[row][col])
+
+        best, best_area = None, 0.0
+        for idx in candidates:
+            name, (fx1, fy1, fx2, fy2) = self._fields[idx]
+            iw = min(x2, fx2) - max(x1, fx1)
+            ih = min(y2, fy2) - max(y1, fy1)
+            if iw <= 0 or ih <= 0:
+                continue
+            if ih < self.MIN_V_OVERLAP * min(y2 - y1, fy2 - fy1):
+                continue
+            if iw * ih > best_area:
+                best, best_area = name, iw * ih
+        return best
+
+    def assign(
+            self,
+            texts: Sequence[str],
+            scores: Sequence[float],
+            boxes: Sequence[Box],
+            image_size: tuple[int, int],
+    ) -> dict[str, tuple[str, float]]:
+        """
+        Kelompokkan baris OCR per field. Box dalam piksel gambar berukuran
+        image_size (w, h) yang sudah di-rectify ke template; dinormalisasi
+        ke koordinat template dulu. Beberapa box dalam satu field digabung
+        urut kiri ke kanan, skornya dirata-rata.
+        """
+        sx = self.size[0] / image_size[0]
+        sy = self.size[1] / image_size[1]
+        parts: dict[str, list[tuple[float, str, float]]] = {}
+
+        for text, score, (x1, y1, x2, y2) in zip(texts, scores, boxes):
+            box = (x1 * sx, y1 * sy, x2 * sx, y2 * sy)
+            name = self.match(box)
+            if name is not None:
+                parts.setdefault(name, []).append((box[0], text, score))
+
+        result: dict[str, tuple[str, float]] = {}
+        for name, items in parts.items():
+            items.sort(key=lambda p: p[0])
+            text = " ".join(t.strip() for _, t, _ in items if t.strip())
+            result[name] = (text, sum(s for _, _, s in items) / len(items))
+        return result
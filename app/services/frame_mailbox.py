@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+from av import VideoFrame
+
+from app.services import metrics
+
+
+class FrameMailbox:
+    """
+    Mailbox "latest-frame-wins" untuk satu video track.
+
+    Track consumer hanya menaruh av.VideoFrame mentah (tanpa decode). Konversi
+    ke numpy BGR baru dilakukan saat consumer (YOLO tick / capture) memanggil
+    latest(), dan hasilnya di-cache sampai frame berikutnya masuk. Frame yang
+    tertimpa sebelum sempat di-decode dihitung sebagai skipped.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._frame: Optional[VideoFrame] = None
+        self._decoded: Optional[np.ndarray] = None
+        self._seq: int = 0
+        self.received: int = 0
+        self.decoded: int = 0
+        self.skipped: int = 0
+
+    @property
+    def seq(self) -> int:
+        """Nomor urut frame terbaru, naik setiap put()."""
+        return self._seq
+
+    @property
+    def empty(self) -> bool:
+        return self._frame is None
+
+    def put(self, frame: VideoFrame) -> None:
+        with self._lock:
+            if self._frame is not None and self._decoded is None:
+                self.skipped += 1
+            self._frame = frame
+            self._decoded = None
+            self._seq += 1
+            self.received += 1
+
+    def latest(self) -> Optional[np.ndarray]:
+        """Decode frame terbaru ke BGR (sekali per frame). Aman dipanggil dari thread executor."""
+        with self._lock:
+            frame, decoded, seq = self._frame, self._decoded, self._seq
+        if frame is None:
+            return None
+        if decoded is not None:
+            return decoded
+
+        t0 = time.perf_counter()
+        img = frame.to_ndarray(format="bgr24")
+        metrics.observe("decode", time.perf_counter() - t0)
+
+        with self._lock:
+            self.decoded += 1
+            if self._seq == seq:
+                self._decoded = img
+        return img
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frame = None
+            self._decoded = None
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "decoded": self.decoded,
+            "skipped": self.skipped,
+        }
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from app.services.yolo_service import YOLOBox
+
+
+@dataclass
+class FrameQuality:
+    sharpness: float    # variance of Laplacian crop KTP (lebar QUALITY_WIDTH)
+    glare: float        # fraksi piksel crop yang hampir putih (0..1)
+    stability: float    # IoU box dengan box frame sebelumnya (0..1)
+
+    # Batas gate pre-OCR: di bawah/atas ini hasil OCR praktis pasti gagal.
+    MIN_SHARPNESS = 25.0
+    MAX_GLARE = 0.25
+    # Sharpness yang dianggap sudah "tajam penuh" untuk skor.
+    SHARPNESS_REF = 150.0
+
+    @property
+    def score(self) -> float:
+        sharp = min(1.0, self.sharpness / self.SHARPNESS_REF)
+        clear = max(0.0, 1.0 - self.glare / self.MAX_GLARE)
+        return sharp * clear * (0.5 + 0.5 * self.stability)
+
+    @property
+    def hopeless(self) -> bool:
+        return self.sharpness < self.MIN_SHARPNESS or self.glare > self.MAX_GLARE
+
+    def reason(self) -> Optional[str]:
+        if self.sharpness < self.MIN_SHARPNESS:
+            return "Gambar KTP buram. Tahan kartu dan kamera tetap diam."
+        if self.glare > self.MAX_GLARE:
+            return "KTP terkena pantulan cahaya. Ubah sudut kartu."
+        return None
+
+    def to_dict(self) -> dict:
+        return {
+            "sharpness": round(self.sharpness, 1),
+            "glare": round(self.glare, 3),
+            "stability": round(self.stability, 3),
+            "score": round(self.score, 3),
+        }
+
+
+QUALITY_WIDTH = 320
+GLARE_LEVEL = 245
+
+
+def box_iou(a: YOLOBox, b: YOLOBox) -> float:
+    ix = max(0.0, min(a.x + a.w, b.x + b.w) - max(a.x, b.x))
+    iy = max(0.0, min(a.y + a.h, b.y + b.h) - max(a.y, b.y))
+    inter = ix * iy
+    union = a.w * a.h + b.w * b.h - inter
+    return inter / union if union > 0 else 0.0
+
+
+def assess_frame(frame: np.ndarray, box: YOLOBox, prev_box: Optional[YOLOBox] = None) -> FrameQuality:
+    """
+    Skor kualitas area KTP pada frame. Crop diperkecil ke lebar QUALITY_WIDTH
+    dulu supaya biayanya tetap kecil berapa pun resolusi kamera.
+    """
+    h, w = frame.shape[:2]
+    x1, y1 = max(0, int(box.x * w)), max(0, int(box.y * h))
+    x2, y2 = min(w, int((box.x + box.w) * w)), min(h, int((box.y + box.h) * h))
+    crop = frame[y1:y2, x1:x2]
+    if crop.size == 0:
+        return FrameQuality(sharpness=0.0, glare=0.0, stability=0.0)
+
+    ch, cw = crop.shape[:2]
+    size = (QUALITY_WIDTH, max(1, int(ch * QUALITY_WIDTH / cw)))
+    small = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    return FrameQuality(
+        sharpness=float(cv2.Laplacian(gray, cv2.CV_32F).var()),
+        glare=float(np.count_nonzero(gray >= GLARE_LEVEL)) / gray.size,
+        stability=box_iou(box, prev_box) if prev_box is not None else 0.0,
+    )
+
+
+@dataclass
+class RingEntry:
+    frame: np.ndarray       # referensi ke array hasil decode mailbox, bukan copy
+    box: YOLOBox
+    quality: FrameQuality
+    ts: float
+
+
+class FrameRing:
+    """
+    Ring buffer beberapa frame terakhir yang punya box KTP, masing-masing
+    dengan skor kualitas yang dihitung sekali saat frame masuk (setelah
+    deteksi/tracking, di thread executor). Capture memilih frame terbaik
+    yang belum lebih tua dari MAX_AGE, bukan sekadar frame terakhir.
+    """
+
+    SIZE = 6
+    MAX_AGE = 1.5   # detik
+    STABLE_GAP = 0.5  # detik; box lebih lama dari ini tidak dihitung untuk stabilitas
+
+    def __init__(self, size: int = SIZE) -> None:
+        self._entries: deque[RingEntry] = deque(maxlen=max(1, size))
+        self._lock = threading.Lock()
+
+    def push(self, frame: np.ndarray, box: YOLOBox) -> RingEntry:
+        now = time.perf_counter()
+        with self._lock:
+            prev = self._entries[-1] if self._entries else None
+        prev_box = prev.box if prev is not None and now - prev.ts <= self.STABLE_GAP else None
+
+        entry = RingEntry(frame=frame, box=box, quality=assess_frame(frame, box, prev_box), ts=now)
+        with self._lock:
+            self._entries.append(entry)
+        return entry
+
+    def best(self) -> Optional[RingEntry]:
+        now = time.perf_counter()
+        with self._lock:
+            fresh = [e for e in self._entries if now - e.ts <= self.MAX_AGE]
+        return max(fresh, key=lambda e: e.quality.score, default=None)
+
+    def top(self, n: int) -> list[RingEntry]:
+        """n frame segar terbaik (skor menurun), tanpa frame yang tidak lolos gate."""
+        now = time.perf_counter()
+        with self._lock:
+            fresh = [e for e in self._entries if now - e.ts <= self.MAX_AGE and not e.quality.hopeless]
+        return sorted(fresh, key=lambda e: e.quality.score, reverse=True)[:n]
+
+    def latest(self) -> Optional[RingEntry]:
+        with self._lock:
+            return self._entries[-1] if self._entries else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def to_dict(self) -> dict:
+        latest = self.latest()
+        return {
+            "frames": len(self._entries),
+            "latest": latest.quality.to_dict() if latest is not None else None,
+        }
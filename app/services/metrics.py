@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import logging
+import threading
+from bisect import bisect_left
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Tahap pipeline KTP yang diukur (label "stage" di ekyc_stage_seconds).
+STAGES = ("decode", "yolo_predict", "crop", "preprocess", "ocr_predict", "parse")
+
+# Batas atas bucket (detik): dari decode ~1 ms sampai OCR penuh beberapa detik.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+GaugeValue = Union[float, dict[str, float]]
+
+
+class Histogram:
+    """
+    Histogram satu seri. observe() hanya bisect + tiga penjumlahan di bawah
+    lock, jadi aman dan murah dipanggil per frame dari thread mana pun;
+    bucket kumulatif baru dihitung saat render.
+    """
+
+    __slots__ = ("counts", "sum", "count", "_lock")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)   # slot terakhir = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        i = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def take(self) -> tuple[list[int], float, int]:
+        """Ambil isi histogram lalu kosongkan (untuk dikirim worker ke proses utama)."""
+        with self._lock:
+            state = (self.counts, self.sum, self.count)
+            self.counts, self.sum, self.count = [0] * (len(BUCKETS) + 1), 0.0, 0
+        return state
+
+    def merge(self, counts: list[int], total: float, count: int) -> None:
+        with self._lock:
+            self.counts = [a + b for a, b in zip(self.counts, counts)]
+            self.sum += total
+            self.count += count
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor yang menghitung task menunggu (queued) dan sedang
+    berjalan (running) untuk gauge /metrics. Semua jalur (termasuk
+    loop.run_in_executor) lewat submit(), jadi cukup override di sini.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._count_lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        with self._count_lock:
+            self._queued += 1
+        try:
+            future = super().submit(self._run, fn, *args, **kwargs)
+        except BaseException:
+            with self._count_lock:
+                self._queued -= 1
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _run(self, fn, *args, **kwargs):
+        with self._count_lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._count_lock:
+                self._running -= 1
+
+    def _on_done(self, future: Future) -> None:
+        # Task yang dibatalkan sebelum sempat jalan tidak pernah masuk _run.
+        if future.cancelled():
+            with self._count_lock:
+                self._queued -= 1
+
+
+_stages: dict[str, Histogram] = {stage: Histogram() for stage in STAGES}
+_gauges: list[tuple[str, str, str, Optional[str], Callable[[], GaugeValue]]] = []
+
+
+def observe(stage: str, seconds: float) -> None:
+    _stages[stage].observe(seconds)
+
+
+def take_stages() -> dict[str, tuple[list[int], float, int]]:
+    """Isi histogram tahap yang terisi sejak take_stages() terakhir (dipakai worker OCR)."""
+    return {stage: h.take() for stage, h in _stages.items() if h.count}
+
+
+def merge_stages(stages: dict[str, tuple[list[int], float, int]]) -> None:
+    for stage, (counts, total, count) in stages.items():
+        _stages[stage].merge(counts, total, count)
+
+
+def register_gauge(
+        name: str,
+        help_text: str,
+        fn: Callable[[], GaugeValue],
+        label: Optional[str] = None,
+        kind: str = "gauge",
+) -> None:
+    """
+    Metrik yang nilainya dibaca saat scrape (tanpa biaya di hot path). fn
+    mengembalikan angka, atau dict {nilai label: angka} jika label diberikan.
+    Nama yang sama didaftarkan ulang menggantikan yang lama.
+    """
+    _gauges[:] = [g for g in _gauges if g[0] != name]
+    _gauges.append((name, help_text, kind, label, fn))
+
+
+def _fmt(value: float) -> str:
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render() -> str:
+    """Semua metrik dalam format teks Prometheus (exposition format 0.0.4)."""
+    lines = [
+        "# HELP ekyc_stage_seconds Latency per tahap pipeline KTP.",
+        "# TYPE ekyc_stage_seconds histogram",
+    ]
+    for stage, h in _stages.items():
+        with h._lock:
+            counts, total, count = list(h.counts), h.sum, h.count
+        cumulative = 0
+        for bound, n in zip(BUCKETS, counts):
+            cumulative += n
+            lines.append(f'ekyc_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'ekyc_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'ekyc_stage_seconds_sum{{stage="{stage}"}} {_fmt(total)}')
+        lines.append(f'ekyc_stage_seconds_count{{stage="{stage}"}} {count}')
+
+    for name, help_text, kind, label, fn in _gauges:
+        try:
+            value = fn()
+        except Exception as e:
+            logger.warning("Metrik %s gagal dibaca: %s", name, e)
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if label is None:
+            lines.append(f"{name} {_fmt(value)}")
+        else:
+            for key, v in value.items():
+                lines.append(f'{name}{{{label}="{_escape(str(key))}"}} {_fmt(v)}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from app.services.yolo_service import YOLOBox
+
+
+class MotionGate:
+    """
+    Gate perubahan scene sebelum YOLO predict.
+
+    Signature scene = thumbnail grayscale 32x24 dari frame yang terakhir
+    benar-benar dideteksi. Frame baru dibandingkan dengan signature itu
+    (mean absolute difference, 0..1). Jika perubahannya di bawah THRESHOLD,
+    hasil deteksi sebelumnya dipakai ulang tanpa memanggil YOLOService.predict.
+    Karena pembandingnya selalu frame deteksi terakhir, pergeseran pelan yang
+    menumpuk tetap akan melewati threshold. Hasil lama tidak dipakai lebih
+    dari MAX_REUSE detik.
+    """
+
+    THUMB_SIZE = (32, 24)   # (w, h)
+    THRESHOLD = 0.03
+    MAX_REUSE = 2.0         # detik
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._signature: Optional[np.ndarray] = None
+        self._boxes: Optional[list[YOLOBox]] = None
+        self._stored_at: float = 0.0
+        self.last_diff: float = 0.0
+        self.checks: int = 0
+        self.skipped: int = 0
+
+    @classmethod
+    def signature(cls, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, cls.THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.float32) / 255.0
+
+    def lookup(self, frame: np.ndarray) -> tuple[Optional[list[YOLOBox]], np.ndarray]:
+        """
+        Return (boxes lama, signature). boxes None berarti scene berubah dan
+        predict harus dijalankan; simpan hasilnya dengan store(signature, boxes).
+        """
+        sig = self.signature(frame)
+
+        with self._lock:
+            self.checks += 1
+            if self._signature is None or self._boxes is None:
+                return None, sig
+            if time.perf_counter() - self._stored_at > self.MAX_REUSE:
+                return None, sig
+
+            self.last_diff = float(np.mean(np.abs(sig - self._signature)))
+            if self.last_diff >= self.THRESHOLD:
+                return None, sig
+
+            self.skipped += 1
+            return list(self._boxes), sig
+
+    def store(self, sig: np.ndarray, boxes: list[YOLOBox]) -> None:
+        with self._lock:
+            self._signature = sig
+            self._boxes = list(boxes)
+            self._stored_at = time.perf_counter()
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.checks if self.checks else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "checks": self.checks,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skip_ratio, 3),
+            "last_diff": round(self.last_diff, 4),
+        }
+
+
+def predict_gated(yolo_service, gate: MotionGate, frame: np.ndarray) -> list[YOLOBox]:
+    """YOLOService.predict yang melewati MotionGate terlebih dulu."""
+    boxes, sig = gate.lookup(frame)
+    if boxes is None:
+        boxes = yolo_service.predict(frame)
+        gate.store(sig, boxes)
+    return boxes
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import copy
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Hashable, Optional
+
+import cv2
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.services.ocr_service import KTPData
+
+HASH_SIZE = 32   # dHash 32x32 = 1024 bit
+
+
+def perceptual_hash(image: np.ndarray, hash_size: int = HASH_SIZE) -> np.ndarray:
+    """
+    dHash: tanda gradien horizontal thumbnail grayscale (hash_size+1) x hash_size,
+    dikemas jadi array bit uint8. Tahan terhadap noise kamera dan perubahan
+    exposure kecil, tapi berubah jika isi teks kartu berbeda.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+
+def hamming(a: np.ndarray, b: np.ndarray) -> int:
+    return int(np.unpackbits(np.bitwise_xor(a, b)).sum())
+
+
+@dataclass
+class _Entry:
+    scope: Hashable
+    key: np.ndarray
+    data: "KTPData"
+    stored_at: float
+
+
+class OCRResultCache:
+    """
+    Cache hasil OCR (LRU + TTL) untuk capture berulang atas kartu yang sama.
+
+    Key = perceptual hash crop yang sudah di-rectify; entry cocok jika jarak
+    Hamming-nya <= max_distance (fraksi jumlah bit). Setiap entry terikat ke
+    satu scope (session_id + mode OCR) dan lookup hanya melihat entry dengan
+    scope yang sama, sehingga hasil OCR tidak pernah berpindah antar user.
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 64,
+            ttl: float = 30.0,
+            max_distance: float = 0.08,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def get(self, scope: Hashable, key: np.ndarray) -> Optional["KTPData"]:
+        """Salinan KTPData untuk kartu yang mirip dalam scope ini, atau None."""
+        limit = int(self.max_distance * key.size * 8)
+        now = time.perf_counter()
+
+        with self._lock:
+            self._expire(now)
+            best_id, best_dist = None, limit + 1
+            for entry_id, entry in self._entries.items():
+                if entry.scope != scope:
+                    continue
+                dist = hamming(entry.key, key)
+                if dist < best_dist:
+                    best_id, best_dist = entry_id, dist
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return copy.deepcopy(self._entries[best_id].data)
+
+    def put(self, scope: Hashable, key: np.ndarray, data: "KTPData") -> None:
+        with self._lock:
+            self._entries[next(self._ids)] = _Entry(
+                scope=scope, key=key, data=copy.deepcopy(data), stored_at=time.perf_counter()
+            )
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def drop(self, session_id: str) -> None:
+        """Hapus semua entry milik satu sesi (scope berupa (session_id, ...))."""
+        with self._lock:
+            for entry_id in [i for i, e in self._entries.items() if _session_of(e.scope) == session_id]:
+                del self._entries[entry_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _expire(self, now: float) -> None:
+        # Urutan LRU bukan urutan waktu simpan, jadi periksa semua entry.
+        for entry_id in [i for i, e in self._entries.items() if now - e.stored_at > self.ttl]:
+            del self._entries[entry_id]
+            self.evictions += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hit_ratio, 3),
+        }
+
+
+def _session_of(scope: Hashable):
+    return scope[0] if isinstance(scope, tuple) else scope
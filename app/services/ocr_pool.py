@@ -0,0 +1,310 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import math
+import multiprocessing as mp
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from app.services import metrics
+from app.services.ocr_cache import OCRResultCache
+from app.services.ocr_service import (
+    KTPData,
+    KTPOCRError,
+    OCRService,
+    PartialCallback,
+    card_hash,
+)
+from app.services.resource_plan import set_thread_env
+
+logger = logging.getLogger(__name__)
+
+
+class OCRBusyError(KTPOCRError):
+    """Antrian OCR penuh. estimated_wait = perkiraan detik sampai ada slot."""
+
+    def __init__(self, estimated_wait: float) -> None:
+        super().__init__(f"Server OCR sibuk, coba lagi dalam ~{estimated_wait:.1f} detik.")
+        self.estimated_wait = estimated_wait
+
+
+# ─── Worker process ───────────────────────────────────────────────────────────
+
+_worker_ocr: Optional[OCRService] = None
+_worker_progress = None   # mp.Queue hasil parsial ke proses utama
+_worker_ready = None      # mp.Barrier seukuran pool, dipakai _worker_ping saat start
+
+
+def _init_worker(ocr_kwargs: dict, progress_queue=None, ready_barrier=None) -> None:
+    global _worker_ocr, _worker_progress, _worker_ready
+    # Env dipasang sebelum PaddleOCR di-import (lazy) supaya runtime native-nya
+    # hanya memakai jatah thread worker ini. OpenCV sudah ter-import saat modul
+    # ini di-unpickle (env tidak lagi dibaca), jadi dibatasi langsung. BLAS numpy
+    # juga sudah termuat; OCR tidak memakai operasi BLAS berat.
+    threads = ocr_kwargs.get("cpu_threads")
+    if threads:
+        set_thread_env(threads)
+        cv2.setNumThreads(threads)
+    _worker_ocr = OCRService(**ocr_kwargs)
+    _worker_progress = progress_queue
+    _worker_ready = ready_barrier
+    _worker_ocr.warmup()
+    metrics.take_stages()  # latency warm-up tidak ikut dilaporkan
+
+
+def _worker_ping() -> int:
+    """
+    Dijalankan setelah initializer (load + warm-up) selesai. Menunggu di barrier
+    sampai semua worker juga sampai di sini, jadi satu worker yang cepat tidak
+    bisa menjawab ping milik worker lain.
+    """
+    if _worker_ready is not None:
+        _worker_ready.wait()
+    return mp.current_process().pid
+
+
+def _worker_extract(
+        specs: list[tuple[str, tuple[int, ...], str]],
+        job_id: Optional[int] = None,
+        ocr_profile: Optional[str] = None,
+) -> tuple[KTPData, dict]:
+    """
+    specs = (nama shm, shape, dtype) per frame; lebih dari satu frame = konsensus.
+    Return (hasil, histogram tahap dari job ini) — metrik worker digabung di proses utama.
+    """
+    # Block dimiliki dan di-unlink oleh proses utama; worker cukup attach by name
+    # dan close(), tanpa menyentuh resource tracker (dipakai bersama parent).
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+    images = [
+        np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        for shm, (_, shape, dtype) in zip(blocks, specs)
+    ]
+
+    if job_id is not None and _worker_progress is not None:
+        def send_partial(partial: dict) -> None:
+            _worker_progress.put((job_id, partial))
+        on_partial = send_partial
+    else:
+        on_partial = None
+
+    try:
+        result = _worker_ocr.extract_consensus(images, on_partial=on_partial, ocr_profile=ocr_profile)
+        return result, metrics.take_stages()
+    finally:
+        # View harus dilepas dulu, shm.close() gagal selama buffer masih diekspor.
+        del images
+        for shm in blocks:
+            shm.close()
+
+
+# ─── Pool ─────────────────────────────────────────────────────────────────────
+
+class OCRProcessPool:
+    """
+    Pool N proses OCR, masing-masing dengan PaddleOCR sendiri yang sudah di-warm-up.
+
+    Crop dikirim lewat shared memory (yang di-pickle hanya nama block, shape
+    dan dtype). Jumlah pekerjaan in-flight dibatasi workers + max_queue; jika
+    penuh, submit langsung melempar OCRBusyError beserta estimasi waktu tunggu
+    dari rata-rata latency OCR, bukan ikut mengantri tanpa batas.
+
+    Hasil parsial (on_partial) dikirim worker lewat satu mp.Queue bersama dan
+    dibaca thread di proses utama yang meneruskannya ke callback per job.
+    """
+
+    LATENCY_EMA = 0.2
+
+    def __init__(
+            self,
+            workers: int = 2,
+            max_queue: int = 4,
+            ocr_kwargs: Optional[dict] = None,
+            cache: Optional[OCRResultCache] = None,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._ocr_kwargs = ocr_kwargs or {}
+        # Cache hidup di proses utama supaya berlaku lintas worker.
+        self.cache = cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._progress_queue = None
+        self._progress_thread: Optional[threading.Thread] = None
+        self._listeners: dict[int, PartialCallback] = {}
+        self._job_ids = itertools.count()
+        self._in_flight: int = 0
+        self.avg_latency: float = 1.0
+        self.completed: int = 0
+        self.rejected: int = 0
+        self.busy_total: float = 0.0
+        self._started = time.perf_counter()
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def start(self) -> None:
+        """Spawn semua worker dan tunggu sampai PaddleOCR di setiap worker siap."""
+        t0 = self._started = time.perf_counter()
+        ctx = mp.get_context("spawn")
+        self._progress_queue = ctx.Queue()
+        self._progress_thread = threading.Thread(
+            target=self._read_progress, name="ocr-progress", daemon=True
+        )
+        self._progress_thread.start()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self._ocr_kwargs, self._progress_queue, ctx.Barrier(self.workers)),
+        )
+        pids = {f.result() for f in [self._executor.submit(_worker_ping) for _ in range(self.workers)]}
+        if len(pids) != self.workers:
+            raise RuntimeError(f"Hanya {len(pids)}/{self.workers} worker OCR yang siap.")
+        logger.info(
+            "OCR process pool aktif | %.2fs | workers=%d | max_queue=%d | pids=%s",
+            time.perf_counter() - t0, self.workers, self.max_queue, sorted(pids),
+        )
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._progress_queue is not None:
+            self._progress_queue.put(None)
+            self._progress_thread.join(timeout=1.0)
+            self._progress_queue = None
+            self._progress_thread = None
+        self._listeners.clear()
+
+    def _read_progress(self) -> None:
+        queue = self._progress_queue
+        while True:
+            item = queue.get()
+            if item is None:
+                return
+            job_id, partial = item
+            callback = self._listeners.get(job_id)
+            if callback is None:
+                continue   # job sudah selesai; hasil akhir sudah terkirim
+            try:
+                callback(partial)
+            except Exception as e:
+                logger.error("Callback hasil parsial OCR error: %s", e)
+
+    def estimated_wait(self) -> float:
+        return self.avg_latency * math.ceil((self._in_flight + 1) / self.workers)
+
+    async def extract(
+            self,
+            image: np.ndarray,
+            session_id: Optional[str] = None,
+            on_partial: Optional[PartialCallback] = None,
+            ocr_profile: Optional[str] = None,
+    ) -> KTPData:
+        """
+        Setara OCRService.extract_from_array, dijalankan di worker process.
+        on_partial dipanggil dari thread pembaca progress, bukan dari event loop.
+        """
+        return await self.extract_consensus([image], session_id, on_partial, ocr_profile)
+
+    async def extract_consensus(
+            self,
+            images: list[np.ndarray],
+            session_id: Optional[str] = None,
+            on_partial: Optional[PartialCallback] = None,
+            ocr_profile: Optional[str] = None,
+    ) -> KTPData:
+        """
+        Setara OCRService.extract_consensus. Semua frame dikerjakan satu worker
+        secara berurutan supaya bisa berhenti lebih awal begitu field sepakat;
+        tetap dihitung satu slot antrian.
+        """
+        if self._executor is None:
+            raise RuntimeError("OCR process pool belum dijalankan.")
+
+        ocr_profile = ocr_profile or self.allowed_profiles[0]
+        if ocr_profile not in self.allowed_profiles:
+            raise ValueError(f"Profil PaddleOCR tidak diizinkan: {ocr_profile!r}. Pilihan: {self.allowed_profiles}")
+
+        key = None
+        scope = (session_id, self._ocr_kwargs.get("mode", "full"), ocr_profile)
+        if self.cache is not None and session_id is not None:
+            key = await asyncio.get_running_loop().run_in_executor(None, card_hash, images[0])
+            cached = self.cache.get(scope, key)
+            if cached is not None:
+                return cached
+
+        if self._in_flight >= self.capacity:
+            self.rejected += 1
+            raise OCRBusyError(self.estimated_wait())
+
+        images = [np.ascontiguousarray(image) for image in images]
+        blocks = [shared_memory.SharedMemory(create=True, size=max(1, image.nbytes)) for image in images]
+        job_id = None
+        if on_partial is not None:
+            job_id = next(self._job_ids)
+            self._listeners[job_id] = on_partial
+        self._in_flight += 1
+        t0 = time.perf_counter()
+
+        try:
+            for shm, image in zip(blocks, images):
+                np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[...] = image
+            specs = [(shm.name, image.shape, image.dtype.str) for shm, image in zip(blocks, images)]
+            future = self._executor.submit(_worker_extract, specs, job_id, ocr_profile)
+            result, stages = await asyncio.wrap_future(future)
+            metrics.merge_stages(stages)
+        finally:
+            self._in_flight -= 1
+            if job_id is not None:
+                self._listeners.pop(job_id, None)
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+        latency = time.perf_counter() - t0
+        self.busy_total += latency
+        self.avg_latency += self.LATENCY_EMA * (latency - self.avg_latency)
+        self.completed += 1
+        if key is not None and result.completeness > 0:
+            self.cache.put(scope, key, result)
+        return result
+
+    @property
+    def consensus_frames(self) -> int:
+        return max(1, self._ocr_kwargs.get("consensus_frames", 1))
+
+    @property
+    def allowed_profiles(self) -> tuple[str, ...]:
+        """Profil PaddleOCR yang dimuat di worker; profil default di urutan pertama."""
+        default = self._ocr_kwargs.get("paddle_profile", "default")
+        return tuple(dict.fromkeys((default, *self._ocr_kwargs.get("allowed_profiles", ()))))
+
+    @property
+    def utilisation(self) -> float:
+        """Perkiraan fraksi waktu worker sibuk (latency job termasuk antrian executor, dibatasi 1)."""
+        elapsed = time.perf_counter() - self._started
+        return min(1.0, self.busy_total / (elapsed * self.workers)) if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_latency_s": round(self.avg_latency, 3),
+            "utilisation": round(self.utilisation, 3),
+        }
@@ -1,18 +1,52 @@
 from __future__ import annotations
 
+import json
 import logging
 import re
+import threading
 import time
 from dataclasses import dataclass, field, asdict
 from enum import Enum
-from typing import Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional
 
 import cv2
 import numpy as np
-from paddleocr import PaddleOCR
+
+from app.services import metrics
+from app.services.field_layout import Box, FieldLayout
+from app.services.ocr_cache import OCRResultCache, perceptual_hash
+from app.services.predictor_pool import PredictorPool
+from app.services.template_index import TemplateIndex, build_label_mask, mask_labels
+
+if TYPE_CHECKING:
+    from paddleocr import PaddleOCR
 
 logger = logging.getLogger()
 
+TEMPLATE_DIR = Path(__file__).parent.parent.parent / "Data" / "Template"
+FIELDS_PATH = TEMPLATE_DIR / "fields.json"
+TEMPLATE_PATH = TEMPLATE_DIR / "Template-KTP.png"
+TEMPLATE_SIZE = (1818, 1125)  # (w, h) Template-KTP.png, koordinat fields.json
+
+# Model recognition latin (dipakai PaddleOCR untuk lang='id') untuk mode "fields".
+REC_MODEL_NAME = "latin_PP-OCRv5_mobile_rec"
+
+OCR_MODES = ("full", "fields", "layout")
+
+# Ukuran crop KTP tipikal dari frame kamera 720p, untuk warm-up predictor.
+WARMUP_CROP_SHAPE = (540, 860, 3)
+
+# Urutan tahap OCR progresif (nama field fields.json). None = semua field sisanya.
+PROGRESSIVE_STAGES: tuple[tuple[str, Optional[tuple[str, ...]]], ...] = (
+    ("nik", ("NIK",)),
+    ("identitas", ("Nama", "Tempat Tanggal Lahir")),
+    ("lainnya", None),
+)
+
+# Callback hasil parsial: dipanggil dengan dict siap kirim (lihat _partial_event).
+PartialCallback = Callable[[dict], None]
+
 
 class JenisKelamin(str, Enum):
     LAKI_LAKI = "LAKI-LAKI"
@@ -75,6 +109,78 @@ _RE = {
     ),
 }
 
+# Kata kunci literal per trigger / nilai di _parse_ktp_texts. Regex sebuah
+# trigger hanya bisa cocok jika salah satu kata kuncinya ada di baris (huruf
+# besar), jadi setiap baris diklasifikasi sekali oleh satu regex gabungan
+# (_LINE_TRIGGER, dispatch lewat m.lastgroup) dan hanya extractor yang
+# relevan yang menjalankan regex-nya.
+_LINE_KEYWORDS: dict[str, tuple[str, ...]] = {
+    "nama": ("NAMA",),
+    "ttl": ("TEMPAT", "TGL", "TANGGAL", "LAHIR"),
+    "kelamin": ("LAKI", "PEREMPUAN"),
+    "darah": ("GOL",),
+    "alamat": ("ALAMAT",),
+    "rtrw": ("RT",),
+    "kel": ("KEL", "DESA"),
+    "kec": ("KECAMATAN",),
+    "agama": ("AGAMA",),
+    "agama_val": tuple(AGAMA_VALID),
+    "status": ("KAWIN", "CERAI"),
+    "pek": ("PEKERJAAN",),
+    "warga": ("WARGA",),
+    "berlaku": ("BERLAKU",),
+}
+_ALL_LINE_KINDS: frozenset[str] = frozenset(_LINE_KEYWORDS)
+
+
+def _build_line_trigger() -> tuple[re.Pattern, dict[str, str]]:
+    """
+    Satu regex gabungan untuk semua kata kunci _LINE_KEYWORDS. Alternation
+    dikelompokkan per huruf pertama (trie satu tingkat) dan setiap kata kunci
+    punya named group sendiri (nama group harus unik), dipetakan ke jenisnya.
+    Pola dibungkus lookahead agar match nol-lebar dicoba di setiap posisi:
+    kata kunci yang tumpang tindih (mis. "GOL" + "LAHIR" pada "GOLAHIR")
+    tetap terdeteksi semua, sama seperti cek substring per kata kunci.
+    """
+    by_initial: dict[str, dict[str, str]] = {}
+    for kind, keywords in _LINE_KEYWORDS.items():
+        for keyword in keywords:
+            by_initial.setdefault(keyword[0], {})[keyword] = kind
+
+    groups: dict[str, str] = {}
+    branches = []
+    for initial, keywords in by_initial.items():
+        alts = []
+        for keyword in sorted(keywords, key=len, reverse=True):
+            name = f"k{len(groups)}"
+            groups[name] = keywords[keyword]
+            alts.append(f"(?P<{name}>{re.escape(keyword[1:])})")
+        branches.append(f"{re.escape(initial)}(?:{'|'.join(alts)})")
+
+    initials = "".join(sorted(by_initial))
+    pattern = f"(?=[{initials}])(?=(?:{'|'.join(branches)}))"
+    return re.compile(pattern), groups
+
+
+_LINE_TRIGGER, _LINE_TRIGGER_KINDS = _build_line_trigger()
+
+# Panjang minimum baris yang masih bisa menghasilkan NIK 16 digit.
+_NIK_MIN_LEN = 16
+
+
+def _classify_line(upper: str) -> frozenset[str]:
+    """
+    Jenis trigger/nilai yang mungkin ada di baris. Untuk teks non-ASCII,
+    IGNORECASE bisa mencocokkan karakter yang tidak sama persis dengan kata
+    kunci (mis. tanda Kelvin), jadi semua jenis dianggap mungkin.
+    """
+    if not upper.isascii():
+        return _ALL_LINE_KINDS
+    return frozenset(
+        _LINE_TRIGGER_KINDS[m.lastgroup] for m in _LINE_TRIGGER.finditer(upper)
+    )
+
+
 _ALL_FIELDS: frozenset[str] = frozenset([
     "nik", "nama", "tempat_lahir", "tgl_lahir",
     "jenis_kelamin", "gol_darah", "alamat", "rt_rw",
@@ -101,6 +207,7 @@ class KTPData:
     kewarganegaraan: Optional[str] = None
     berlaku_hingga: Optional[str] = None
     confidence_avg: float = 0.0
+    field_confidence: dict[str, float] = field(default_factory=dict)
     parse_warnings: list[str] = field(default_factory=list)
 
     def to_dict(self) -> dict:
@@ -131,14 +238,27 @@ def _strip_label(text: str) -> str:
     return _RE["strip_label"].sub("", text).strip()
 
 
-def _next_nonempty(texts: list[str], idx: int, max_look: int = 2) -> Optional[str]:
+def _next_index(texts: list[str], idx: int, max_look: int = 2) -> Optional[int]:
     for j in range(idx + 1, min(idx + 1 + max_look, len(texts))):
-        candidate = texts[j].strip()
-        if candidate:
-            return candidate
+        if texts[j].strip():
+            return j
     return None
 
 
+def _next_nonempty(texts: list[str], idx: int, max_look: int = 2) -> Optional[str]:
+    j = _next_index(texts, idx, max_look)
+    return texts[j].strip() if j is not None else None
+
+
+def _label_value(texts: list[str], idx: int, text: str) -> tuple[Optional[str], int]:
+    """Nilai setelah label di baris idx, atau baris tidak kosong berikutnya. Return (nilai, indeks baris)."""
+    val = _strip_label(text)
+    if val:
+        return val, idx
+    j = _next_index(texts, idx)
+    return (texts[j].strip(), j) if j is not None else (None, idx)
+
+
 def _normalize_date(raw: str) -> str:
     return raw.replace("/", "-")
 
@@ -169,6 +289,14 @@ def _parse_ktp_texts(
             return result
     else:
         result.confidence_avg = -1.0
+        scores = None
+
+    def mark(line: int, *attrs: str) -> None:
+        """Field ditemukan di baris line; skor baris itu menjadi confidence field."""
+        found.update(attrs)
+        if scores is not None:
+            for attr in attrs:
+                result.field_confidence[attr] = scores[line]
 
     for i, raw_text in enumerate(texts):
         if len(found) >= len(_ALL_FIELDS):
@@ -176,131 +304,293 @@ def _parse_ktp_texts(
 
         text = raw_text.strip()
         upper = text.upper()
+        kinds = _classify_line(upper)
 
-        if "nik" not in found:
+        if "nik" not in found and len(text) >= _NIK_MIN_LEN:
             candidate = re.sub(r"[^0-9OolIlZSGB]", "", text)
             candidate = _fix_ocr_digit_noise(candidate)
             if _RE["nik_valid"].match(candidate):
                 result.nik = candidate
-                found.add("nik")
+                mark(i, "nik")
 
-        if "nama" not in found and _RE["trig_nama"].search(upper):
-            val = _strip_label(text)
-            if not val:
-                val = _next_nonempty(texts, i)
+        if "nama" not in found and "nama" in kinds and _RE["trig_nama"].search(upper):
+            val, j = _label_value(texts, i, text)
             if val:
                 result.nama = _clean_name(val)
-                found.add("nama")
+                mark(j, "nama")
             else:
                 warnings.append(f"[{i}] Trigger 'Nama' ditemukan tapi nilai kosong.")
 
-        if "tempat_lahir" not in found and _RE["trig_ttl"].search(upper):
+        if "tempat_lahir" not in found and "ttl" in kinds and _RE["trig_ttl"].search(upper):
             m = _RE["val_ttl"].search(text)
             if m:
                 result.tempat_lahir = m.group(1).strip().title()
                 result.tgl_lahir = _normalize_date(m.group(2).strip())
-                found.update(["tempat_lahir", "tgl_lahir"])
+                mark(i, "tempat_lahir", "tgl_lahir")
             else:
-                nxt = _next_nonempty(texts, i)
-                if nxt:
+                j = _next_index(texts, i)
+                if j is not None:
+                    nxt = texts[j].strip()
                     m2 = _RE["val_ttl"].search(nxt)
                     if m2:
                         result.tempat_lahir = m2.group(1).strip().title()
                         result.tgl_lahir = _normalize_date(m2.group(2).strip())
-                        found.update(["tempat_lahir", "tgl_lahir"])
+                        mark(j, "tempat_lahir", "tgl_lahir")
                     else:
                         dm = _RE["val_date"].search(nxt)
                         if dm:
                             result.tgl_lahir = _normalize_date(dm.group())
-                            found.add("tgl_lahir")
-                if not m:
-                    warnings.append(f"[{i}] Format TTL tidak cocok: {text!r}")
+                            mark(j, "tgl_lahir")
+                warnings.append(f"[{i}] Format TTL tidak cocok: {text!r}")
 
-        if "jenis_kelamin" not in found:
+        if "jenis_kelamin" not in found and "kelamin" in kinds:
             m = _RE["val_kelamin"].search(upper)
             if m:
                 raw_jk = re.sub(r"\s+", " ", m.group(1)).upper().strip()
                 raw_jk = re.sub(r"LAKI\s*-\s*LAKI", "LAKI-LAKI", raw_jk)
                 result.jenis_kelamin = raw_jk
-                found.add("jenis_kelamin")
+                mark(i, "jenis_kelamin")
 
-        if "gol_darah" not in found and _RE["trig_darah"].search(upper):
+        if "gol_darah" not in found and "darah" in kinds and _RE["trig_darah"].search(upper):
             m = _RE["val_gol_darah"].search(upper)
             if m:
                 result.gol_darah = m.group(1).upper()
-                found.add("gol_darah")
+                mark(i, "gol_darah")
 
-        if "alamat" not in found and _RE["trig_alamat"].search(upper):
-            val = _strip_label(text)
-            if not val:
-                val = _next_nonempty(texts, i)
+        if "alamat" not in found and "alamat" in kinds and _RE["trig_alamat"].search(upper):
+            val, j = _label_value(texts, i, text)
             if val:
                 result.alamat = val.title()
-                found.add("alamat")
+                mark(j, "alamat")
 
-        if "rt_rw" not in found and _RE["trig_rtrw"].search(upper):
+        if "rt_rw" not in found and "rtrw" in kinds and _RE["trig_rtrw"].search(upper):
             m = _RE["val_rtrw"].search(text)
             if m:
                 result.rt_rw = f"{m.group(1).zfill(3)}/{m.group(2).zfill(3)}"
-                found.add("rt_rw")
+                mark(i, "rt_rw")
 
-        if "kelurahan" not in found and _RE["trig_kel"].search(upper):
-            val = _strip_label(text)
-            if not val:
-                val = _next_nonempty(texts, i)
+        if "kelurahan" not in found and "kel" in kinds and _RE["trig_kel"].search(upper):
+            val, j = _label_value(texts, i, text)
             if val:
                 result.kelurahan = val.title()
-                found.add("kelurahan")
+                mark(j, "kelurahan")
 
-        if "kecamatan" not in found and _RE["trig_kec"].search(upper):
-            val = _strip_label(text)
-            if not val:
-                val = _next_nonempty(texts, i)
+        if "kecamatan" not in found and "kec" in kinds and _RE["trig_kec"].search(upper):
+            val, j = _label_value(texts, i, text)
             if val:
                 result.kecamatan = val.title()
-                found.add("kecamatan")
+                mark(j, "kecamatan")
 
-        if "agama" not in found:
-            if _RE["trig_agama"].search(upper):
-                val = _strip_label(text).upper() or (_next_nonempty(texts, i) or "").upper()
+        if "agama" not in found and ("agama" in kinds or "agama_val" in kinds):
+            if "agama" in kinds and _RE["trig_agama"].search(upper):
+                val, j = _label_value(texts, i, text)
+                val = (val or "").upper()
             else:
-                val = upper
+                val, j = upper, i
             for agama in AGAMA_VALID:
                 if agama in val:
                     result.agama = "BUDDHA" if agama == "BUDHA" else agama
-                    found.add("agama")
+                    mark(j, "agama")
                     break
 
-        if "status_perkawinan" not in found:
+        if "status_perkawinan" not in found and "status" in kinds:
             m = _RE["val_status"].search(upper)
             if m:
                 result.status_perkawinan = re.sub(r"\s+", " ", m.group(1)).upper().strip()
-                found.add("status_perkawinan")
+                mark(i, "status_perkawinan")
 
-        if "pekerjaan" not in found and _RE["trig_pek"].search(upper):
-            val = _strip_label(text)
-            if not val:
-                val = _next_nonempty(texts, i)
+        if "pekerjaan" not in found and "pek" in kinds and _RE["trig_pek"].search(upper):
+            val, j = _label_value(texts, i, text)
             if val:
                 result.pekerjaan = val.title()
-                found.add("pekerjaan")
+                mark(j, "pekerjaan")
 
-        if "kewarganegaraan" not in found and _RE["trig_warga"].search(upper):
+        if "kewarganegaraan" not in found and "warga" in kinds and _RE["trig_warga"].search(upper):
             m = _RE["val_warga"].search(upper)
             if m:
                 result.kewarganegaraan = m.group(1).upper()
-                found.add("kewarganegaraan")
+                mark(i, "kewarganegaraan")
 
-        if "berlaku_hingga" not in found and _RE["trig_berlaku"].search(upper):
+        if "berlaku_hingga" not in found and "berlaku" in kinds and _RE["trig_berlaku"].search(upper):
             m = _RE["val_berlaku"].search(upper)
             if m:
                 result.berlaku_hingga = re.sub(r"\s+", " ", m.group(1)).upper()
-                found.add("berlaku_hingga")
+                mark(i, "berlaku_hingga")
 
     _post_validate(result)
+    result.field_confidence = {
+        k: v for k, v in result.field_confidence.items() if getattr(result, k) is not None
+    }
     return result
 
 
+# Nama field di fields.json -> atribut KTPData. Field yang tidak ada di sini
+# (Provinsi, Foto, Kota Dibuat, ...) tidak di-OCR di mode "fields".
+TEMPLATE_FIELDS: dict[str, str] = {
+    "NIK": "nik",
+    "Nama": "nama",
+    "Tempat Tanggal Lahir": "tempat_lahir",
+    "Jenis Kelamin": "jenis_kelamin",
+    "Gol. Darah": "gol_darah",
+    "Alamat": "alamat",
+    "RT/RW": "rt_rw",
+    "Kelurahan/Desa": "kelurahan",
+    "Kecamatan": "kecamatan",
+    "Agama": "agama",
+    "Status Perkawinan": "status_perkawinan",
+    "Pekerjaan": "pekerjaan",
+    "Kewarganegaraan": "kewarganegaraan",
+    "Berlaku Hingga": "berlaku_hingga",
+}
+
+
+def _parse_field_texts(
+        field_texts: dict[str, tuple[str, float]],
+        min_confidence: float = 0.65,
+) -> KTPData:
+    """
+    Parse hasil recognition per ROI template. Karena setiap teks sudah pasti
+    milik satu field, tidak perlu trigger label — cukup normalisasi nilai.
+    """
+    result = KTPData()
+    warnings = result.parse_warnings
+    scores: list[float] = []
+
+    for name, (raw, score) in field_texts.items():
+        attr = TEMPLATE_FIELDS.get(name)
+        text = _strip_label(raw.strip().lstrip(":").strip())
+        if attr is None or not text:
+            continue
+        if score < min_confidence:
+            warnings.append(f"[{name}] skor OCR {score:.2f} di bawah threshold: {text!r}")
+            continue
+        scores.append(score)
+        upper = text.upper()
+        result.field_confidence[attr] = score
+        if attr == "tempat_lahir":
+            result.field_confidence["tgl_lahir"] = score
+
+        if attr == "nik":
+            result.nik = _fix_ocr_digit_noise(re.sub(r"[^0-9OolIlZSGB]", "", text))
+        elif attr == "nama":
+            result.nama = _clean_name(text) or None
+        elif attr == "tempat_lahir":
+            m = _RE["val_ttl"].search(text)
+            if m:
+                result.tempat_lahir = m.group(1).strip().title()
+                result.tgl_lahir = _normalize_date(m.group(2).strip())
+            else:
+                dm = _RE["val_date"].search(text)
+                if dm:
+                    result.tgl_lahir = _normalize_date(dm.group())
+                warnings.append(f"[{name}] Format TTL tidak cocok: {text!r}")
+        elif attr == "jenis_kelamin":
+            m = _RE["val_kelamin"].search(upper)
+            if m:
+                result.jenis_kelamin = re.sub(r"LAKI\s*-\s*LAKI", "LAKI-LAKI", m.group(1).upper())
+        elif attr == "gol_darah":
+            m = _RE["val_gol_darah"].search(upper)
+            if m:
+                result.gol_darah = m.group(1)
+        elif attr == "rt_rw":
+            m = _RE["val_rtrw"].search(text)
+            if m:
+                result.rt_rw = f"{m.group(1).zfill(3)}/{m.group(2).zfill(3)}"
+        elif attr == "agama":
+            for agama in AGAMA_VALID:
+                if agama in upper:
+                    result.agama = "BUDDHA" if agama == "BUDHA" else agama
+                    break
+        elif attr == "status_perkawinan":
+            m = _RE["val_status"].search(upper)
+            if m:
+                result.status_perkawinan = re.sub(r"\s+", " ", m.group(1)).upper().strip()
+        elif attr == "kewarganegaraan":
+            m = _RE["val_warga"].search(upper)
+            if m:
+                result.kewarganegaraan = m.group(1).upper()
+        elif attr == "berlaku_hingga":
+            m = _RE["val_berlaku"].search(upper)
+            if m:
+                result.berlaku_hingga = re.sub(r"\s+", " ", m.group(1)).upper()
+        else:
+            setattr(result, attr, text.title())
+
+    result.confidence_avg = sum(scores) / len(scores) if scores else 0.0
+    _post_validate(result)
+    result.field_confidence = {
+        k: v for k, v in result.field_confidence.items() if getattr(result, k) is not None
+    }
+    return result
+
+
+def _partial_event(stage: str, data: KTPData, t0: float) -> dict:
+    """Payload hasil parsial: nilai + confidence per field yang sudah terbaca."""
+    return {
+        "stage": stage,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "fields": {
+            attr: {"value": value, "confidence": round(data.field_confidence.get(attr, -1.0), 3)}
+            for attr in sorted(_ALL_FIELDS)
+            if (value := getattr(data, attr)) is not None
+        },
+    }
+
+
+def _merge_missing(result: KTPData, partial: KTPData) -> KTPData:
+    """Isi field result yang kosong dengan nilai dari partial."""
+    for attr in _ALL_FIELDS:
+        value = getattr(partial, attr)
+        if getattr(result, attr) is None and value is not None:
+            setattr(result, attr, value)
+            if attr in partial.field_confidence:
+                result.field_confidence[attr] = partial.field_confidence[attr]
+    return result
+
+
+def _vote_key(value: str) -> str:
+    return re.sub(r"[^A-Z0-9]", "", value.upper())
+
+
+def _fuse_ktp(
+        results: list[KTPData],
+        min_votes: int = 2,
+        accept_confidence: float = 0.97,
+) -> tuple[KTPData, set[str]]:
+    """
+    Gabungkan KTPData dari beberapa frame dengan voting berbobot confidence
+    per field (field_confidence; confidence_avg frame hanya dipakai jika
+    parser tidak punya skor untuk field itu). Nilai dikelompokkan setelah normalisasi (huruf besar, tanpa spasi/tanda
+    baca); kelompok dengan bobot terbesar menang. Return (hasil, field yang
+    sudah disepakati: >= min_votes suara sama, atau satu suara >= accept_confidence).
+    """
+    fused = KTPData()
+    agreed: set[str] = set()
+
+    for attr in _ALL_FIELDS:
+        groups: dict[str, list[tuple[str, float]]] = {}
+        for r in results:
+            value = getattr(r, attr)
+            if value is None:
+                continue
+            conf = r.field_confidence.get(attr, r.confidence_avg if r.confidence_avg > 0 else 0.5)
+            groups.setdefault(_vote_key(value), []).append((value, conf))
+        if not groups:
+            continue
+
+        votes = max(groups.values(), key=lambda g: sum(c for _, c in g))
+        value, conf = max(votes, key=lambda v: v[1])
+        setattr(fused, attr, value)
+        fused.field_confidence[attr] = conf
+        if len(votes) >= min_votes or conf >= accept_confidence:
+            agreed.add(attr)
+
+    confs = list(fused.field_confidence.values())
+    fused.confidence_avg = sum(confs) / len(confs) if confs else 0.0
+    _post_validate(fused)
+    return fused, agreed
+
+
 def _post_validate(data: KTPData) -> None:
     w = data.parse_warnings
 
@@ -326,33 +616,137 @@ def _post_validate(data: KTPData) -> None:
         data.gol_darah = None
 
 
-def _preprocess_image(image: np.ndarray) -> np.ndarray:
+@dataclass(frozen=True)
+class PreprocessProfile:
+    name: str
+    target_text_height: Optional[int]   # None = resolusi asli
+    denoise: str                        # "bilateral" | "gaussian" | "none"
+    bilateral_d: int = 9
+    deskew: bool = True
+
+
+PREPROCESS_PROFILES: dict[str, PreprocessProfile] = {
+    # Pipeline asli: bilateral d=9 di resolusi penuh.
+    "quality": PreprocessProfile("quality", target_text_height=None, denoise="bilateral", bilateral_d=9),
+    "balanced": PreprocessProfile("balanced", target_text_height=32, denoise="bilateral", bilateral_d=5),
+    "fast": PreprocessProfile("fast", target_text_height=24, denoise="gaussian"),
+}
+
+# Tinggi baris field KTP relatif tinggi kartu (fields.json: ~46 px dari 1125 px).
+TEXT_HEIGHT_RATIO = 46 / 1125
+
+_buffers = threading.local()
+_clahe = threading.local()
+
+
+def _buffer(name: str, shape: tuple[int, ...]) -> np.ndarray:
+    """Buffer uint8 per-thread yang dipakai ulang selama shape-nya sama."""
+    cache = getattr(_buffers, "cache", None)
+    if cache is None:
+        cache = _buffers.cache = {}
+    buf = cache.get(name)
+    if buf is None or buf.shape != shape:
+        buf = cache[name] = np.empty(shape, dtype=np.uint8)
+    return buf
+
+
+def _get_clahe():
+    clahe = getattr(_clahe, "obj", None)
+    if clahe is None:
+        clahe = _clahe.obj = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+    return clahe
+
+
+def _preprocess_image(
+        image: np.ndarray,
+        profile: str | PreprocessProfile = "quality",
+        timings: Optional[dict[str, float]] = None,
+) -> np.ndarray:
+    """
+    Grayscale -> (resize) -> denoise -> CLAHE -> Otsu -> deskew -> RGB.
+    Jika timings diberikan, durasi tiap tahap (detik) ditambahkan ke dict itu.
+    Buffer perantara dipakai ulang per thread; hasil akhir selalu array baru.
+    """
+    p = PREPROCESS_PROFILES[profile] if isinstance(profile, str) else profile
+    t = t_start = time.perf_counter()
+
+    def lap(stage: str) -> None:
+        nonlocal t
+        if timings is not None:
+            now = time.perf_counter()
+            timings[stage] = timings.get(stage, 0.0) + now - t
+            t = now
+
     if len(image.shape) == 3:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=_buffer("gray", image.shape[:2]))
     else:
         gray = image.copy()
+    lap("gray")
+
+    if p.target_text_height is not None:
+        h, w = gray.shape[:2]
+        scale = p.target_text_height / max(1.0, h * TEXT_HEIGHT_RATIO)
+        if scale < 1.0:
+            size = (max(1, int(w * scale)), max(1, int(h * scale)))
+            gray = cv2.resize(gray, size, dst=_buffer("resized", size[::-1]), interpolation=cv2.INTER_AREA)
+    lap("resize")
+
+    if p.denoise == "bilateral":
+        denoised = cv2.bilateralFilter(gray, d=p.bilateral_d, sigmaColor=75, sigmaSpace=75)
+    elif p.denoise == "gaussian":
+        denoised = cv2.GaussianBlur(gray, (3, 3), 0, dst=_buffer("denoised", gray.shape))
+    else:
+        denoised = gray
+    lap("denoise")
 
-    denoised = cv2.bilateralFilter(gray, d=9, sigmaColor=75, sigmaSpace=75)
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    equalized = clahe.apply(denoised)
-    _, binary = cv2.threshold(equalized, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    deskewed = _deskew(binary)
+    equalized = _get_clahe().apply(denoised, dst=_buffer("equalized", denoised.shape))
+    lap("clahe")
 
-    return cv2.cvtColor(deskewed, cv2.COLOR_GRAY2RGB)
+    _, binary = cv2.threshold(
+        equalized, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=_buffer("binary", equalized.shape)
+    )
+    lap("otsu")
 
+    deskewed = _deskew(binary) if p.deskew else binary
+    lap("deskew")
+
+    rgb = cv2.cvtColor(deskewed, cv2.COLOR_GRAY2RGB)
+    lap("to_rgb")
+    metrics.observe("preprocess", time.perf_counter() - t_start)
+    return rgb
+
+
+# Sisi terpanjang grid sampel untuk estimasi skew; jumlah titik yang diperiksa
+# minAreaRect dibatasi ~SKEW_SAMPLE_SIDE² berapa pun ukuran crop.
+SKEW_SAMPLE_SIDE = 256
 
-def _deskew(image: np.ndarray) -> np.ndarray:
-    coords = np.column_stack(np.where(image > 0))
-    if len(coords) < 100:
-        return image
+
+def _estimate_skew(image: np.ndarray) -> Optional[float]:
+    """
+    Sudut skew (derajat) dari minAreaRect piksel foreground, atau None jika
+    foreground terlalu sedikit. Piksel disampel dengan stride pada kedua
+    sumbu (view, tanpa copy) sehingga memori dan waktu tidak tumbuh dengan
+    ukuran crop. Karena stride sama di kedua sumbu, sudutnya tidak berubah.
+    """
+    h, w = image.shape[:2]
+    step = max(1, -(-max(h, w) // SKEW_SAMPLE_SIDE))
+    sample = image[::step, ::step]
+
+    coords = np.column_stack(np.where(sample > 0)).astype(np.int32)
+    if len(coords) * step * step < 100:
+        return None
 
     angle = cv2.minAreaRect(coords)[-1]
     if angle < -45:
         angle = 90 + angle
     elif angle > 45:
         angle = angle - 90
+    return angle
 
-    if abs(angle) < 0.5 or abs(angle) > 10:
+
+def _deskew(image: np.ndarray) -> np.ndarray:
+    angle = _estimate_skew(image)
+    if angle is None or abs(angle) < 0.5 or abs(angle) > 10:
         return image
 
     h, w = image.shape[:2]
@@ -361,15 +755,297 @@ def _deskew(image: np.ndarray) -> np.ndarray:
     return cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
 
 
+def _order_corners(pts: np.ndarray) -> np.ndarray:
+    """Urutkan 4 titik: kiri-atas, kanan-atas, kanan-bawah, kiri-bawah."""
+    pts = pts.reshape(4, 2).astype(np.float32)
+    s = pts.sum(axis=1)
+    d = np.diff(pts, axis=1).ravel()
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)], pts[np.argmax(s)], pts[np.argmax(d)]], dtype=np.float32)
+
+
+def _find_card_corners(image: np.ndarray, min_area: float = 0.4) -> Optional[np.ndarray]:
+    """
+    Cari 4 sudut kartu di crop YOLO (kontur segi empat terbesar). Deteksi
+    dilakukan di versi kecil (lebar 480) lalu diskalakan balik.
+    """
+    h, w = image.shape[:2]
+    scale = min(1.0, 480 / w)
+    small = cv2.resize(image, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    edges = cv2.Canny(cv2.GaussianBlur(gray, (5, 5), 0), 50, 150)
+    edges = cv2.dilate(edges, None)
+
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    area_min = min_area * small.shape[0] * small.shape[1]
+
+    for cnt in sorted(contours, key=cv2.contourArea, reverse=True)[:5]:
+        if cv2.contourArea(cnt) < area_min:
+            break
+        approx = cv2.approxPolyDP(cnt, 0.02 * cv2.arcLength(cnt, True), True)
+        if len(approx) == 4:
+            return _order_corners(approx) / scale
+    return None
+
+
+def _rectify_to_template(image: np.ndarray, scale: float = 1.0) -> np.ndarray:
+    """
+    Warp crop YOLO ke bidang koordinat template (TEMPLATE_SIZE * scale) lewat
+    homography dari sudut kartu. Jika sudut tidak ditemukan, crop dianggap
+    sudah pas dengan kartu dan cukup di-resize.
+    """
+    tw, th = int(TEMPLATE_SIZE[0] * scale), int(TEMPLATE_SIZE[1] * scale)
+    corners = _find_card_corners(image)
+    if corners is None:
+        return cv2.resize(image, (tw, th), interpolation=cv2.INTER_LINEAR)
+
+    dst = np.array([[0, 0], [tw - 1, 0], [tw - 1, th - 1], [0, th - 1]], dtype=np.float32)
+    M = cv2.getPerspectiveTransform(corners, dst)
+    return cv2.warpPerspective(image, M, (tw, th), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+
+# Resolusi kartu (relatif template) untuk perceptual hash cache OCR.
+CACHE_HASH_SCALE = 0.25
+
+
+def card_hash(image: np.ndarray) -> np.ndarray:
+    """Perceptual hash crop KTP setelah di-rectify (key OCRResultCache)."""
+    return perceptual_hash(_rectify_to_template(image, CACHE_HASH_SCALE))
+
+
+def _page_boxes(page) -> list[Box]:
+    """Box axis-aligned per baris dari hasil PaddleOCR (rec_boxes, fallback rec_polys)."""
+    boxes = page.get("rec_boxes")
+    if boxes is not None and len(boxes):
+        return [tuple(float(v) for v in b[:4]) for b in boxes]
+
+    polys = page.get("rec_polys")
+    if polys is None:
+        return []
+    result = []
+    for poly in polys:
+        pts = np.asarray(poly, dtype=np.float32).reshape(-1, 2)
+        x1, y1 = pts.min(axis=0)
+        x2, y2 = pts.max(axis=0)
+        result.append((float(x1), float(y1), float(x2), float(y2)))
+    return result
+
+
+def _load_field_boxes(path: Path = FIELDS_PATH) -> dict[str, tuple[int, int, int, int]]:
+    with open(path) as f:
+        boxes = json.load(f)
+    return {name: tuple(boxes[name]) for name in TEMPLATE_FIELDS if name in boxes}
+
+
+@dataclass(frozen=True)
+class PaddleProfile:
+    """
+    Konfigurasi pipeline PaddleOCR (deteksi + recognition) untuk mode
+    "full"/"layout". Nilai None = default PaddleOCR untuk lang='id'.
+    """
+    name: str
+    det_model: Optional[str] = None
+    rec_model: Optional[str] = None
+    doc_stages: bool = True              # orientasi dokumen + unwarping; tidak perlu setelah crop YOLO
+    det_limit_side: Optional[int] = None  # sisi terpanjang input deteksi (limit_type "max")
+    rec_batch: Optional[int] = None
+
+    def kwargs(self) -> dict:
+        kwargs: dict = {"use_textline_orientation": False}
+        if self.det_model is None and self.rec_model is None:
+            kwargs["lang"] = "id"
+        if self.det_model is not None:
+            kwargs["text_detection_model_name"] = self.det_model
+        if self.rec_model is not None:
+            kwargs["text_recognition_model_name"] = self.rec_model
+        if not self.doc_stages:
+            kwargs["use_doc_orientation_classify"] = False
+            kwargs["use_doc_unwarping"] = False
+        if self.det_limit_side is not None:
+            kwargs["text_det_limit_side_len"] = self.det_limit_side
+            kwargs["text_det_limit_type"] = "max"
+        if self.rec_batch is not None:
+            kwargs["text_recognition_batch_size"] = self.rec_batch
+        return kwargs
+
+
+PADDLE_PROFILES: dict[str, PaddleProfile] = {
+    # PaddleOCR(lang='id') apa adanya, seperti sebelum ada profil.
+    "default": PaddleProfile("default"),
+    "server": PaddleProfile(
+        "server", det_model="PP-OCRv5_server_det", rec_model=REC_MODEL_NAME,
+        doc_stages=False, det_limit_side=1280, rec_batch=8,
+    ),
+    "mobile": PaddleProfile(
+        "mobile", det_model="PP-OCRv5_mobile_det", rec_model=REC_MODEL_NAME,
+        doc_stages=False, det_limit_side=960, rec_batch=16,
+    ),
+    "fast": PaddleProfile(
+        "fast", det_model="PP-OCRv5_mobile_det", rec_model=REC_MODEL_NAME,
+        doc_stages=False, det_limit_side=640, rec_batch=16,
+    ),
+}
+
+
+def _load_label_mask(size: tuple[int, int]) -> Optional[np.ndarray]:
+    """Mask label statis Template-KTP.png untuk kartu berukuran size, atau None jika template tidak ada."""
+    template = cv2.imread(str(TEMPLATE_PATH))
+    if template is None:
+        logger.warning("Template KTP tidak ditemukan (%s), label tidak di-mask.", TEMPLATE_PATH)
+        return None
+    with open(FIELDS_PATH) as f:
+        fields = json.load(f)
+    return build_label_mask(template, fields, size)
+
+
+def _new_paddle(kwargs: dict) -> "PaddleOCR":
+    # Import paddleocr ditunda sampai predictor pertama dibuat (startup paralel, lihat app/main.py).
+    from paddleocr import PaddleOCR
+    return PaddleOCR(**kwargs)
+
+
+def _check_paddle_profile(profile: str) -> None:
+    if profile not in PADDLE_PROFILES:
+        raise ValueError(f"Profil PaddleOCR tidak dikenal: {profile!r}. Pilihan: {tuple(PADDLE_PROFILES)}")
+
+
 class OCRService:
 
-    def __init__(self, min_confidence: float = 0.65, debug: bool = False):
+    FIELD_SCALE = 0.75   # resolusi kartu hasil rectify relatif terhadap template
+    FIELD_PAD = 4        # piksel (skala template) di sekitar tiap ROI
+
+    # Konsensus multi-frame: field dianggap sepakat jika >= MIN_VOTES frame
+    # memberi nilai sama, atau satu frame membacanya dengan confidence tinggi.
+    CONSENSUS_MIN_VOTES = 2
+    CONSENSUS_ACCEPT_CONF = 0.97
+
+    def __init__(
+            self,
+            min_confidence: float = 0.65,
+            debug: bool = False,
+            mode: str = "full",
+            preprocess: str = "quality",
+            cache: Optional[OCRResultCache] = None,
+            consensus_frames: int = 1,
+            consensus_budget: float = 2.0,
+            mask_labels: bool = True,
+            paddle_profile: str = "default",
+            allowed_profiles: tuple[str, ...] = (),
+            predictors: int = 1,
+            cpu_threads: Optional[int] = None,
+    ):
+        """
+        mode       : "full"   — deteksi + recognition seluruh crop, lalu parse per baris.
+                     "fields" — rectify ke template, recognition saja per ROI fields.json.
+                     "layout" — rectify ke template, deteksi + recognition, lalu box teks
+                                dipetakan ke field fields.json secara spasial.
+        preprocess : profil _preprocess_image untuk mode "full" ("quality" | "balanced" | "fast").
+        cache      : cache hasil per sesi; hanya dipakai jika extract_from_array diberi session_id.
+        consensus_frames / consensus_budget : jumlah frame maksimal dan batas waktu
+                     (detik) extract_consensus; 1 = capture satu frame seperti biasa.
+        mask_labels: mode "layout" — timpa label statis template setelah rectify
+                     supaya detector/recognizer tidak memproses "Nama", "Agama", dst.
+        paddle_profile: profil PADDLE_PROFILES default untuk mode "full"/"layout";
+                     bisa diganti per request lewat argumen ocr_profile.
+        allowed_profiles: profil tambahan yang boleh dipilih per request; dimuat
+                     (dan di-warm-up) di awal. Profil lain ditolak dengan ValueError.
+        predictors / cpu_threads : jumlah instance predictor Paddle per profil (untuk
+                     thread executor yang OCR bersamaan) dan thread CPU per instance
+                     (None = default Paddle); lihat app/services/resource_plan.py.
+        """
+        if mode not in OCR_MODES:
+            raise ValueError(f"Mode OCR tidak dikenal: {mode!r}. Pilihan: {OCR_MODES}")
+        if preprocess not in PREPROCESS_PROFILES:
+            raise ValueError(
+                f"Profil preprocess tidak dikenal: {preprocess!r}. Pilihan: {tuple(PREPROCESS_PROFILES)}"
+            )
+        for profile in (paddle_profile, *allowed_profiles):
+            _check_paddle_profile(profile)
+
         self.min_confidence = min_confidence
         self.debug = debug
-        self.paddle_ocr = PaddleOCR(
-            use_angle_cls=False,
-            lang='id'
-        )
+        self.mode = mode
+        self.preprocess = preprocess
+        self.cache = cache
+        self.consensus_frames = max(1, consensus_frames)
+        self.consensus_budget = consensus_budget
+        self.paddle_profile = paddle_profile
+        self.allowed_profiles = tuple(dict.fromkeys((paddle_profile, *allowed_profiles)))
+        self.predictors = max(1, predictors)
+        self.cpu_threads = cpu_threads
+        self._paddle: dict[str, PredictorPool[PaddleOCR]] = {}
+        self._paddle_lock = threading.Lock()
+        for profile in self.allowed_profiles:
+            self._paddle_pool(profile).fill()
+        self._rec_pool: PredictorPool = PredictorPool("rec", self._new_rec_model, self.predictors)
+        self._field_boxes = _load_field_boxes()
+        self.layout = FieldLayout(self._field_boxes, TEMPLATE_SIZE)
+        self.template_index = TemplateIndex.load()
+        self.card_scale = self.template_index.scale if self.template_index else self.FIELD_SCALE
+        if self.template_index is None:
+            logger.info("Template index belum ada, rectify memakai deteksi sudut kartu.")
+        card_size = (int(TEMPLATE_SIZE[0] * self.card_scale), int(TEMPLATE_SIZE[1] * self.card_scale))
+        self.label_mask = _load_label_mask(card_size) if mask_labels else None
+        if mode == "fields":
+            self._rec_pool.fill()
+
+    def _paddle_pool(self, profile: Optional[str] = None) -> PredictorPool[PaddleOCR]:
+        """Pool predictor PaddleOCR untuk profil; hanya profil di allowed_profiles."""
+        profile = profile or self.paddle_profile
+        pool = self._paddle.get(profile)
+        if pool is None:
+            if profile not in self.allowed_profiles:
+                raise ValueError(
+                    f"Profil PaddleOCR tidak diizinkan: {profile!r}. Pilihan: {self.allowed_profiles}"
+                )
+            with self._paddle_lock:
+                pool = self._paddle.get(profile)
+                if pool is None:
+                    kwargs = PADDLE_PROFILES[profile].kwargs()
+                    if self.cpu_threads is not None:
+                        kwargs["cpu_threads"] = self.cpu_threads
+                    pool = self._paddle[profile] = PredictorPool(
+                        f"paddle[{profile}]", lambda: _new_paddle(kwargs), self.predictors
+                    )
+        return pool
+
+    def _new_rec_model(self):
+        from paddleocr import TextRecognition
+        kwargs = {"cpu_threads": self.cpu_threads} if self.cpu_threads is not None else {}
+        return TextRecognition(model_name=REC_MODEL_NAME, **kwargs)
+
+    def predictor_usage(self) -> dict:
+        """Utilisasi tiap pool predictor yang sudah dibuat."""
+        pools = [self._paddle[p] for p in sorted(self._paddle)]
+        if self._rec_pool.checkouts or self.mode == "fields":
+            pools.append(self._rec_pool)
+        return {pool.name: pool.to_dict() for pool in pools}
+
+    def warmup(self) -> float:
+        """
+        Satu pass OCR dummy supaya capture pertama tidak membayar inisialisasi
+        predictor. Memakai Template-KTP.png seukuran WARMUP_CROP_SHAPE (berisi
+        teks label, jadi detector dan recognizer ikut berjalan) lewat jalur
+        progresif, sehingga model recognition ROI juga termuat. Setelah itu
+        setiap instance lain di pool (predictors > 1, allowed_profiles) ikut
+        di-warm-up. Return detik.
+        """
+        t0 = time.perf_counter()
+        h, w = WARMUP_CROP_SHAPE[:2]
+        template = cv2.imread(str(TEMPLATE_PATH))
+        if template is not None:
+            image = cv2.resize(template, (w, h), interpolation=cv2.INTER_AREA)
+        else:
+            image = np.full(WARMUP_CROP_SHAPE, 255, dtype=np.uint8)
+        self.extract_from_array(image, on_partial=lambda _: None)
+
+        preprocessed = _preprocess_image(image, self.preprocess)
+        for profile in self.allowed_profiles:
+            if profile != self.paddle_profile or self.predictors > 1:
+                self._paddle_pool(profile).warm(lambda paddle_ocr: paddle_ocr.predict(preprocessed))
+        if self.predictors > 1:
+            line = preprocessed[: h // 8, : w // 2]
+            self._rec_pool.warm(lambda rec_model: rec_model.predict(input=[line], batch_size=1))
+        return time.perf_counter() - t0
 
     def extract_from_file(self, path: str) -> KTPData:
         image = cv2.imread(path)
@@ -377,11 +1053,134 @@ class OCRService:
             raise FileNotFoundError(f"Gambar tidak ditemukan: {path!r}")
         return self.extract_from_array(image)
 
-    def extract_from_array(self, image: np.ndarray) -> KTPData:
+    def extract_from_array(
+            self,
+            image: np.ndarray,
+            mode: Optional[str] = None,
+            session_id: Optional[str] = None,
+            on_partial: Optional[PartialCallback] = None,
+            ocr_profile: Optional[str] = None,
+    ) -> KTPData:
+        """
+        on_partial  : jika diberikan, dipanggil per tahap PROGRESSIVE_STAGES
+                      (NIK dulu, lalu nama + TTL, lalu sisanya); hasil akhir
+                      gabungan tetap berupa return value.
+        ocr_profile : profil PADDLE_PROFILES untuk request ini (default: paddle_profile).
+        """
+        mode = mode or self.mode
+        ocr_profile = ocr_profile or self.paddle_profile
+        scope = (session_id, mode, ocr_profile)
+        key = None
+        if self.cache is not None and session_id is not None:
+            key = card_hash(image)
+            cached = self.cache.get(scope, key)
+            if cached is not None:
+                logger.info("OCR cache hit | session=%s | NIK=%s", session_id, cached.nik or "NOT FOUND")
+                return cached
+
+        if mode == "fields":
+            result = self.extract_fields(image, on_partial=on_partial)
+        elif on_partial is not None:
+            result = self._extract_progressive(image, on_partial, mode, ocr_profile)
+        elif mode == "layout":
+            result = self.extract_layout(image, ocr_profile)
+        else:
+            result = self.extract_full(image, ocr_profile)
+
+        if key is not None and result.completeness > 0:
+            self.cache.put(scope, key, result)
+        return result
+
+    def extract_consensus(
+            self,
+            images: list[np.ndarray],
+            mode: Optional[str] = None,
+            session_id: Optional[str] = None,
+            on_partial: Optional[PartialCallback] = None,
+            budget: Optional[float] = None,
+            ocr_profile: Optional[str] = None,
+    ) -> KTPData:
+        """
+        OCR beberapa frame kartu yang sama (urut dari kualitas terbaik) dan
+        gabungkan hasilnya dengan _fuse_ktp. Frame dikerjakan berurutan, bukan
+        paralel: tiap frame tambahan hanya dijalankan jika frame sebelumnya
+        belum cukup, dan slot OCR lain tetap bebas untuk sesi lain. Berhenti begitu semua field yang
+        terbaca sudah disepakati (field yang kosong di semua frame sejak
+        CONSENSUS_MIN_VOTES frame tidak ditunggu), atau jika frame berikutnya
+        diperkirakan melewati budget (detik). Di mode "fields", frame kedua
+        dan seterusnya hanya me-recognize ROI field yang belum disepakati.
+        Frame pertama memakai jalur progresif (NIK dulu) jika on_partial
+        diberikan; setelah itu on_partial menerima hasil gabungan per frame.
+        """
+        if len(images) <= 1:
+            return self.extract_from_array(images[0], mode, session_id, on_partial, ocr_profile)
+
+        mode = mode or self.mode
+        ocr_profile = ocr_profile or self.paddle_profile
+        scope = (session_id, mode, ocr_profile)
+        budget = self.consensus_budget if budget is None else budget
+        t0 = time.perf_counter()
+
+        key = None
+        if self.cache is not None and session_id is not None:
+            key = card_hash(images[0])
+            cached = self.cache.get(scope, key)
+            if cached is not None:
+                logger.info("OCR cache hit | session=%s | NIK=%s", session_id, cached.nik or "NOT FOUND")
+                return cached
+
+        results: list[KTPData] = []
+        pending: set[str] = set(_ALL_FIELDS)
+        fused = KTPData()
+
+        for i, image in enumerate(images):
+            elapsed = time.perf_counter() - t0
+            # Frame berikutnya diperkirakan selama rata-rata frame sebelumnya.
+            if i > 0 and elapsed + elapsed / i > budget:
+                break
+            if i == 0 and on_partial is not None:
+                if mode == "fields":
+                    results.append(self.extract_fields(image, on_partial=on_partial))
+                else:
+                    results.append(self._extract_progressive(image, on_partial, mode, ocr_profile))
+            elif mode == "fields":
+                only = None if i == 0 else tuple(
+                    name for name, attr in TEMPLATE_FIELDS.items()
+                    if attr in pending or (attr == "tempat_lahir" and "tgl_lahir" in pending)
+                )
+                results.append(self.extract_fields(image, only=only))
+            elif mode == "layout":
+                results.append(self.extract_layout(image, ocr_profile))
+            else:
+                results.append(self.extract_full(image, ocr_profile))
+
+            fused, agreed = _fuse_ktp(results, self.CONSENSUS_MIN_VOTES, self.CONSENSUS_ACCEPT_CONF)
+            pending = set(_ALL_FIELDS) - agreed
+            if len(results) >= self.CONSENSUS_MIN_VOTES:
+                # Kosong/tak terparse di semua frame (mis. Gol. Darah "-"): frame lain
+                # hampir pasti juga tidak menambah nilai.
+                pending = {attr for attr in pending if any(getattr(r, attr) is not None for r in results)}
+            if on_partial is not None:
+                on_partial(_partial_event(f"frame_{i + 1}", fused, t0))
+            if not pending:
+                break
+
+        logger.info(
+            "Konsensus OCR selesai | %.3fs | frame=%d/%d | completeness=%.0f%% | belum sepakat=%s",
+            time.perf_counter() - t0, len(results), len(images),
+            fused.completeness * 100, sorted(pending) or "-",
+        )
+
+        if key is not None and fused.completeness > 0:
+            self.cache.put(scope, key, fused)
+        return fused
+
+    def extract_full(self, image: np.ndarray, ocr_profile: Optional[str] = None) -> KTPData:
+        """Mode "full": preprocess seluruh crop, deteksi + recognition, lalu parse per baris."""
         t0 = time.perf_counter()
 
-        preprocessed = _preprocess_image(image)
-        texts, scores = self._run_ocr(preprocessed)
+        preprocessed = _preprocess_image(image, self.preprocess)
+        texts, scores, _ = self._run_ocr(preprocessed, ocr_profile)
 
         if not texts:
             logger.warning("Tidak ada teks terdeteksi oleh OCR.")
@@ -393,7 +1192,9 @@ class OCRService:
                 for i, (t, s) in enumerate(zip(texts, scores))
             ))
 
+        t_parse = time.perf_counter()
         result = _parse_ktp_texts(texts, scores, min_confidence=self.min_confidence)
+        metrics.observe("parse", time.perf_counter() - t_parse)
 
         logger.info(
             "Ekstraksi selesai | %.3fs | completeness=%.0f%% | NIK=%s",
@@ -407,17 +1208,207 @@ class OCRService:
 
         return result
 
-    def _run_ocr(self, image: np.ndarray) -> tuple[list[str], list[float]]:
+    def extract_layout(
+            self,
+            image: np.ndarray,
+            ocr_profile: Optional[str] = None,
+            card: Optional[np.ndarray] = None,
+    ) -> KTPData:
+        """
+        Mode "layout": rectify crop ke template, deteksi + recognition, lalu
+        tiap box teks dipetakan ke field fields.json lewat FieldLayout. Tidak
+        bergantung pada urutan baris maupun trigger label; baris label statis
+        dibuang sebelum parsing. card = hasil rectify(image) jika sudah ada.
+        """
+        t0 = time.perf_counter()
+
+        card = self.rectify(image) if card is None else card.copy()
+        if self.label_mask is not None:
+            mask_labels(card, self.label_mask)
+        preprocessed = _preprocess_image(card, self.preprocess)
+        texts, scores, boxes = self._run_ocr(preprocessed, ocr_profile)
+
+        if not boxes:
+            logger.warning("Tidak ada box teks terdeteksi oleh OCR.")
+            return KTPData(parse_warnings=["Tidak ada teks terdeteksi."])
+
+        t_parse = time.perf_counter()
+        field_texts = self.layout.assign(texts, scores, boxes, preprocessed.shape[1::-1])
+
+        if self.debug:
+            logger.debug("Teks OCR per field (layout, %d/%d baris terpakai):\n%s",
+                         len(field_texts), len(texts), "\n".join(
+                             f"  {name:<22} ({s:.3f}) {t!r}" for name, (t, s) in field_texts.items()
+                         ))
+
+        result = _parse_field_texts(field_texts, min_confidence=self.min_confidence)
+        metrics.observe("parse", time.perf_counter() - t_parse)
+
+        logger.info(
+            "Ekstraksi layout selesai | %.3fs | completeness=%.0f%% | NIK=%s",
+            time.perf_counter() - t0,
+            result.completeness * 100,
+            result.nik or "NOT FOUND",
+        )
+
+        for w in result.parse_warnings:
+            logger.warning("⚠  %s", w)
+
+        return result
+
+    def _extract_progressive(
+            self,
+            image: np.ndarray,
+            on_partial: PartialCallback,
+            mode: str,
+            ocr_profile: Optional[str] = None,
+    ) -> KTPData:
+        """
+        Mode "full"/"layout" dengan hasil parsial: tahap awal PROGRESSIVE_STAGES
+        (NIK, lalu nama + TTL) dibaca lewat recognition ROI template supaya
+        cepat, lalu pipeline deteksi berjalan untuk sisanya. Field yang tidak
+        terbaca pipeline deteksi diisi dari tahap awal. Mode "layout" memakai
+        kartu hasil rectify yang sama.
+        """
+        t0 = time.perf_counter()
+
+        card = self.rectify(image)
+        early = KTPData()
+        for stage, names in PROGRESSIVE_STAGES[:-1]:
+            stage_data = _parse_field_texts(self._run_field_rec(card, self.card_scale, names), self.min_confidence)
+            on_partial(_partial_event(stage, stage_data, t0))
+            _merge_missing(early, stage_data)
+
+        if mode == "layout":
+            result = self.extract_layout(image, ocr_profile, card=card)
+        else:
+            result = self.extract_full(image, ocr_profile)
+        return _merge_missing(result, early)
+
+    def extract_fields(
+            self,
+            image: np.ndarray,
+            on_partial: Optional[PartialCallback] = None,
+            only: Optional[tuple[str, ...]] = None,
+    ) -> KTPData:
+        """
+        Mode "fields": rectify crop ke template, potong ROI tiap field dari
+        fields.json, lalu jalankan recognition saja (tanpa text detection).
+        Tanpa on_partial semua ROI masuk satu batch; dengan on_partial, satu
+        batch per tahap PROGRESSIVE_STAGES dan hasilnya dilaporkan per tahap.
+        """
+        t0 = time.perf_counter()
+
+        card = self.rectify(image)
+        if on_partial is None:
+            field_texts = self._run_field_rec(card, self.card_scale, only)
+        else:
+            field_texts = {}
+            for stage, names in PROGRESSIVE_STAGES:
+                if names is None:
+                    names = tuple(n for n in self._field_boxes if n not in field_texts)
+                stage_texts = self._run_field_rec(card, self.card_scale, names)
+                field_texts.update(stage_texts)
+                on_partial(_partial_event(
+                    stage, _parse_field_texts(stage_texts, self.min_confidence), t0
+                ))
+
+        if self.debug:
+            logger.debug("Teks OCR per field:\n%s", "\n".join(
+                f"  {name:<22} ({s:.3f}) {t!r}" for name, (t, s) in field_texts.items()
+            ))
+
+        t_parse = time.perf_counter()
+        result = _parse_field_texts(field_texts, min_confidence=self.min_confidence)
+        metrics.observe("parse", time.perf_counter() - t_parse)
+
+        logger.info(
+            "Ekstraksi field selesai | %.3fs | completeness=%.0f%% | NIK=%s",
+            time.perf_counter() - t0,
+            result.completeness * 100,
+            result.nik or "NOT FOUND",
+        )
+
+        for w in result.parse_warnings:
+            logger.warning("⚠  %s", w)
+
+        return result
+
+    def rectify(self, image: np.ndarray) -> np.ndarray:
+        """
+        Deskew crop YOLO menjadi kartu berukuran tetap (koordinat template x card_scale).
+        Pakai keypoint template index jika ada; fallback ke homography sudut kartu.
+        """
+        if self.template_index is not None:
+            card = self.template_index.rectify(image)
+            if card is not None:
+                return card
+        return _rectify_to_template(image, self.card_scale)
+
+    def _run_field_rec(
+            self,
+            card: np.ndarray,
+            scale: float,
+            only: Optional[tuple[str, ...]] = None,
+    ) -> dict[str, tuple[str, float]]:
+        """Recognition per ROI field; only membatasi ke sebagian nama field."""
+        h, w = card.shape[:2]
+        names: list[str] = []
+        crops: list[np.ndarray] = []
+
+        for name, (x1, y1, x2, y2) in self._field_boxes.items():
+            if only is not None and name not in only:
+                continue
+            x1 = max(0, int((x1 - self.FIELD_PAD) * scale))
+            y1 = max(0, int((y1 - self.FIELD_PAD) * scale))
+            x2 = min(w, int((x2 + self.FIELD_PAD) * scale))
+            y2 = min(h, int((y2 + self.FIELD_PAD) * scale))
+            if x2 > x1 and y2 > y1:
+                names.append(name)
+                crops.append(card[y1:y2, x1:x2])
+
+        if not crops:
+            return {}
+
+        t0 = time.perf_counter()
         try:
-            raw = self.paddle_ocr.predict(image)
+            with self._rec_pool.checkout() as rec_model:
+                raw = rec_model.predict(input=crops, batch_size=len(crops))
+        except Exception as e:
+            raise OCRPredictError(f"PaddleOCR recognition gagal: {e}") from e
+        metrics.observe("ocr_predict", time.perf_counter() - t0)
+
+        return {
+            name: (res.get("rec_text", "") or "", float(res.get("rec_score", 0.0) or 0.0))
+            for name, res in zip(names, raw)
+        }
+
+    def _run_ocr(
+            self,
+            image: np.ndarray,
+            ocr_profile: Optional[str] = None,
+    ) -> tuple[list[str], list[float], list[Box]]:
+        """
+        Teks, skor, dan box (x1, y1, x2, y2, piksel image) per baris. List box
+        kosong jika PaddleOCR tidak mengembalikan geometri untuk semua baris.
+        """
+        t0 = time.perf_counter()
+        try:
+            with self._paddle_pool(ocr_profile).checkout() as paddle_ocr:
+                raw = paddle_ocr.predict(image)
         except Exception as e:
             raise OCRPredictError(f"PaddleOCR predict gagal: {e}") from e
+        metrics.observe("ocr_predict", time.perf_counter() - t0)
 
         if not raw:
-            return [], []
+            return [], [], []
 
         page = raw[0]
         texts = page.get("rec_texts", []) or []
         scores = page.get("rec_scores", []) or []
         min_len = min(len(texts), len(scores))
-        return texts[:min_len], scores[:min_len]
+
+        boxes = _page_boxes(page)
+        if len(boxes) < min_len:
+            boxes = []
+        return texts[:min_len], scores[:min_len], boxes[:min_len]
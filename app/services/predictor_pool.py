@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Generic, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PredictorPool(Generic[T]):
+    """
+    K instance predictor (PaddleOCR / TextRecognition) untuk thread executor.
+
+    Predictor Paddle tidak aman dipakai bersamaan dari banyak thread, dan satu
+    instance bersama membuat semua OCR in-process antri di belakang satu
+    predictor. Thread checkout() satu instance dan mengembalikannya setelah
+    selesai; jika semua sedang dipakai, thread menunggu. Instance dibuat saat
+    dibutuhkan sampai `size` (fill() untuk membuat semuanya di awal).
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T], size: int = 1) -> None:
+        self.name = name
+        self.size = max(1, size)
+        self._factory = factory
+        self._idle: queue.LifoQueue[T] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created: int = 0
+        self._busy: int = 0
+        self._started = time.perf_counter()
+        self.checkouts: int = 0
+        self.wait_total: float = 0.0
+        self.busy_total: float = 0.0
+
+    def fill(self) -> None:
+        """Buat semua instance sekarang (startup) supaya request pertama tidak membayar load model."""
+        while True:
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            self._idle.put(self._create())
+
+    def warm(self, fn: Callable[[T], object]) -> None:
+        """
+        Jalankan fn sekali pada setiap instance (dibuat dulu jika belum) secara
+        paralel, supaya inisialisasi inference pertama tiap predictor terjadi di
+        startup, bukan di request. Semua instance di-checkout selama warm-up.
+        """
+        self.fill()
+        instances = [self._idle.get() for _ in range(self._created)]
+        try:
+            with ThreadPoolExecutor(max_workers=len(instances), thread_name_prefix=f"warm-{self.name}") as ex:
+                list(ex.map(fn, instances))
+        finally:
+            for instance in instances:
+                self._idle.put(instance)
+
+    def _create(self) -> T:
+        t0 = time.perf_counter()
+        try:
+            instance = self._factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        logger.info("Predictor %s #%d dimuat | %.1fs", self.name, self._created, time.perf_counter() - t0)
+        return instance
+
+    def _acquire(self) -> T:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        return self._create() if create else self._idle.get()
+
+    @contextmanager
+    def checkout(self) -> Iterator[T]:
+        t0 = time.perf_counter()
+        instance = self._acquire()
+        t1 = time.perf_counter()
+        with self._lock:
+            self._busy += 1
+            self.checkouts += 1
+            self.wait_total += t1 - t0
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                self._busy -= 1
+                self.busy_total += time.perf_counter() - t1
+            self._idle.put(instance)
+
+    @property
+    def utilisation(self) -> float:
+        """Fraksi waktu predictor sibuk sejak pool dibuat (0..1, dirata-rata atas size)."""
+        elapsed = time.perf_counter() - self._started
+        return min(1.0, self.busy_total / (elapsed * self.size)) if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "size": self.size,
+            "loaded": self._created,
+            "busy": self._busy,
+            "checkouts": self.checkouts,
+            "avg_wait_ms": round(self.wait_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+            "utilisation": round(self.utilisation, 3),
+        }
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Thread pool intra-op runtime native (OpenMP/MKL/OpenBLAS) dibaca saat library
+# pertama kali di-load, jadi hanya berlaku untuk proses yang di-spawn setelahnya.
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+MIN_OCR_THREADS = 4   # di bawah ini satu predictor Paddle lebih lambat dari antriannya
+
+
+def available_cores() -> int:
+    """Core yang boleh dipakai proses ini (menghormati affinity / cgroup cpuset)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+@dataclass(frozen=True)
+class ResourcePlan:
+    cores: int
+    loop_cores: int         # core yang disisihkan untuk event loop
+    yolo_threads: int       # thread intra-op YOLO (proses utama)
+    ocr_predictors: int     # jumlah predictor PaddleOCR (proses worker atau instance in-process)
+    ocr_threads: int        # cpu_threads per predictor
+    executor_threads: int   # ukuran default executor event loop
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def log(self) -> None:
+        used = self.loop_cores + self.yolo_threads + self.ocr_predictors * self.ocr_threads
+        logger.info(
+            "Rencana core | total=%d | loop=%d | yolo=%d thread | ocr=%d x %d thread | executor=%d thread%s",
+            self.cores, self.loop_cores, self.yolo_threads,
+            self.ocr_predictors, self.ocr_threads, self.executor_threads,
+            f" | ⚠ oversubscribe {used}/{self.cores}" if used > self.cores else "",
+        )
+
+
+def plan_resources(
+        cores: Optional[int] = None,
+        ocr_predictors: Optional[int] = None,
+        loop_cores: int = 1,
+        yolo_share: float = 0.25,
+        ocr_in_process: bool = True,
+) -> ResourcePlan:
+    """
+    Bagi core antara event loop, YOLO, dan predictor OCR supaya thread pool
+    ultralytics dan Paddle tidak saling berebut core.
+
+    loop_cores disisihkan dulu; dari sisanya yolo_share untuk YOLO dan sisanya
+    untuk OCR. ocr_predictors None = sebanyak mungkin predictor dengan minimal
+    MIN_OCR_THREADS thread masing-masing. Di mesin kecil setiap bagian tetap
+    mendapat minimal satu core (oversubscribe dicatat di log).
+
+    Executor event loop diberi thread decode/tracking sebanyak default asyncio
+    (min(32, cores + 4)) ditambah satu untuk batch YOLO; thread per predictor
+    OCR hanya ditambahkan jika OCR jalan in-process (ocr_in_process).
+    """
+    cores = max(1, cores or available_cores())
+    loop_cores = max(1, min(loop_cores, cores - 2))
+    rest = max(1, cores - loop_cores)
+
+    yolo_threads = max(1, round(rest * yolo_share))
+    ocr_budget = max(1, rest - yolo_threads)
+    if ocr_predictors is None:
+        ocr_predictors = max(1, ocr_budget // MIN_OCR_THREADS)
+    ocr_predictors = max(1, ocr_predictors)
+    ocr_threads = max(1, ocr_budget // ocr_predictors)
+
+    return ResourcePlan(
+        cores=cores,
+        loop_cores=loop_cores,
+        yolo_threads=yolo_threads,
+        ocr_predictors=ocr_predictors,
+        ocr_threads=ocr_threads,
+        # OCR in-process memblok satu thread per predictor selama predict; dengan
+        # process pool thread tersebut tidak pernah menjalankan OCR.
+        executor_threads=min(32, cores + 4) + 1 + (ocr_predictors if ocr_in_process else 0),
+    )
+
+
+def set_thread_env(threads: int) -> None:
+    """Batasi thread pool native untuk proses anak yang di-spawn setelah ini."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
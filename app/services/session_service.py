@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import secrets
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from av import VideoFrame
+from fastapi import WebSocket
+
+from app.services.auto_capture import AutoCaptureTrigger
+from app.services.box_tracker import BoxTracker
+from app.services.frame_mailbox import FrameMailbox
+from app.services.frame_quality import FrameRing
+from app.services.motion_gate import MotionGate
+from app.services.ocr_cache import OCRResultCache
+from app.services.yolo_service import YOLOBox
+from app.services.yolo_throttle import AdaptiveYOLOThrottle
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class KTPSession:
+    """
+    State milik satu sesi scan KTP (satu peer connection + satu WebSocket).
+    Frame dan box terakhir disimpan per sesi supaya capture tidak pernah
+    memakai frame milik user lain. session_id dan token dibuat server;
+    WebSocket hanya bisa dipasang dengan token yang cocok.
+    """
+    session_id: str
+    token: str = field(default_factory=lambda: secrets.token_urlsafe(32))
+    created_at: float = field(default_factory=time.perf_counter)
+    websocket: Optional[WebSocket] = None
+    peer_active: bool = False
+    mailbox: FrameMailbox = field(default_factory=FrameMailbox)
+    throttle: AdaptiveYOLOThrottle = field(default_factory=AdaptiveYOLOThrottle)
+    tracker: BoxTracker = field(default_factory=BoxTracker)
+    motion_gate: MotionGate = field(default_factory=MotionGate)
+    frame_ring: FrameRing = field(default_factory=FrameRing)
+    auto_capture: AutoCaptureTrigger = field(default_factory=AutoCaptureTrigger)
+    last_box: Optional[YOLOBox] = None
+    # Satu OCR per sesi dalam satu waktu; hasil terakhir + frame-nya untuk dedup.
+    capture_task: Optional[asyncio.Task] = None
+    captured_frame: Optional[np.ndarray] = None
+    captured_result: Optional[dict] = None
+    frame_ts: float = 0.0
+    box_ts: float = 0.0
+
+    @property
+    def public_id(self) -> str:
+        """Alias sesi untuk /sessions dan /metrics; session_id asli tidak pernah diekspos."""
+        return hashlib.sha256(self.session_id.encode()).hexdigest()[:12]
+
+    def check_token(self, token: Optional[str]) -> bool:
+        return token is not None and secrets.compare_digest(token, self.token)
+
+    @property
+    def has_frame(self) -> bool:
+        return not self.mailbox.empty
+
+    @property
+    def last_frame(self) -> Optional[np.ndarray]:
+        """Frame terakhir dalam BGR. Decode terjadi di sini, jadi panggil dari executor."""
+        return self.mailbox.latest()
+
+    def store_frame(self, frame: VideoFrame) -> None:
+        """Simpan frame terakhir (belum di-decode) untuk dipakai saat YOLO tick / capture."""
+        self.mailbox.put(frame)
+        self.frame_ts = time.perf_counter()
+
+    @property
+    def capture_in_flight(self) -> bool:
+        return self.capture_task is not None and not self.capture_task.done()
+
+    def store_box(self, box: Optional[YOLOBox]) -> None:
+        """Simpan box terakhir hasil YOLO predict."""
+        self.last_box = box
+        self.box_ts = time.perf_counter()
+
+    async def send(self, message: dict) -> bool:
+        """Kirim event ke WebSocket milik sesi ini. Return False jika gagal."""
+        ws = self.websocket
+        if ws is None:
+            return False
+        try:
+            await ws.send_json(message)
+            return True
+        except Exception:
+            self.websocket = None
+            return False
+
+    def to_dict(self) -> dict:
+        now = time.perf_counter()
+        return {
+            "session": self.public_id,
+            "age_s": round(now - self.created_at, 2),
+            "peer_active": self.peer_active,
+            "websocket": self.websocket is not None,
+            "frames": self.mailbox.stats(),
+            "has_box": self.last_box is not None,
+            "yolo": self.throttle.to_dict(),
+            "tracker": self.tracker.to_dict(),
+            "motion_gate": self.motion_gate.to_dict(),
+            "frame_ring": self.frame_ring.to_dict(),
+            "auto_capture": self.auto_capture.to_dict(),
+            "capture_in_flight": self.capture_in_flight,
+            "frame_age_s": round(now - self.frame_ts, 2) if self.frame_ts else None,
+            "box_age_s": round(now - self.box_ts, 2) if self.box_ts else None,
+        }
+
+
+class SessionRegistry:
+    """Registry sesi KTP, dikunci berdasarkan session_id yang dibuat server."""
+
+    def __init__(self) -> None:
+        self._sessions: dict[str, KTPSession] = {}
+        # Diisi saat tahap OCR siap; entry cache sesi dibuang saat sesinya dihapus.
+        self.ocr_cache: Optional[OCRResultCache] = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: Optional[str]) -> Optional[KTPSession]:
+        if not session_id:
+            return None
+        return self._sessions.get(session_id)
+
+    def create(self) -> KTPSession:
+        session = KTPSession(session_id=uuid.uuid4().hex)
+        self._sessions[session.session_id] = session
+        logger.info("Sesi dibuat: %s | Total: %d", session.session_id, len(self._sessions))
+        return session
+
+    def attach_websocket(
+            self,
+            session_id: Optional[str],
+            token: Optional[str],
+            ws: WebSocket,
+    ) -> Optional[KTPSession]:
+        """
+        Pasang WebSocket ke sesi. Tanpa session_id dibuat sesi baru khusus
+        socket ini (mis. halaman verifikasi wajah). Dengan session_id, token
+        harus cocok dan sesi belum punya WebSocket; selain itu return None.
+        """
+        if session_id is None:
+            session = self.create()
+        else:
+            session = self.get(session_id)
+            if session is None or not session.check_token(token) or session.websocket is not None:
+                logger.warning("WebSocket ditolak untuk sesi %s", session_id)
+                return None
+        session.websocket = ws
+        return session
+
+    def detach_websocket(self, session: KTPSession) -> None:
+        session.websocket = None
+        # Sesi tanpa peer connection tidak akan pernah dibersihkan oleh
+        # WebRTCService._cleanup, jadi hapus langsung di sini.
+        if not session.peer_active:
+            self.remove(session.session_id)
+
+    def remove(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return
+        session.mailbox.clear()
+        session.frame_ring.clear()
+        if session.capture_in_flight:
+            session.capture_task.cancel()
+        session.captured_frame = None
+        session.captured_result = None
+        session.tracker.reset(None, None)
+        session.last_box = None
+        if self.ocr_cache is not None:
+            self.ocr_cache.drop(session_id)
+        logger.info("Sesi dihapus: %s | Total: %d", session_id, len(self._sessions))
+
+    def clear(self) -> None:
+        for session_id in list(self._sessions):
+            self.remove(session_id)
+
+    def snapshot(self) -> list[dict]:
+        return [s.to_dict() for s in self._sessions.values()]
+
+    def frames_dropped(self) -> dict[str, int]:
+        return {s.public_id: s.mailbox.skipped for s in self._sessions.values()}
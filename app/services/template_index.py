@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = Path(__file__).parent.parent.parent / "Data" / "Template" / "index"
+
+N_FEATURES = 1500
+RATIO_TEST = 0.75
+MIN_MATCHES = 15
+
+# Label statis template (tinta hitam "NIK", "Nama", ":", ...) = piksel lebih
+# gelap dari LABEL_DARK di luar field box fields.json.
+LABEL_DARK = 100
+LABEL_PAD = 6   # piksel kartu di sekitar tulisan label yang ikut di-mask
+
+
+def build_label_mask(
+        template: np.ndarray,
+        fields: dict[str, list[int]],
+        size: tuple[int, int],
+) -> np.ndarray:
+    """
+    Mask uint8 (255 = label statis) seukuran kartu kanonik `size` (w, h).
+    Area semua field di fields.json (nilai, foto, header provinsi) tidak
+    pernah ikut di-mask, jadi teks milik pemegang kartu tidak tersentuh.
+    """
+    h, w = template.shape[:2]
+    sx, sy = size[0] / w, size[1] / h
+    card = cv2.resize(template, size, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(card, cv2.COLOR_BGR2GRAY) if card.ndim == 3 else card
+
+    field_area = np.zeros(gray.shape, dtype=bool)
+    for x1, y1, x2, y2 in fields.values():
+        field_area[int(y1 * sy):int(y2 * sy) + 1, int(x1 * sx):int(x2 * sx) + 1] = True
+
+    ink = np.where((gray < LABEL_DARK) & ~field_area, 255, 0).astype(np.uint8)
+    k = 2 * LABEL_PAD + 1
+    mask = cv2.dilate(ink, cv2.getStructuringElement(cv2.MORPH_RECT, (k, k)))
+    mask[field_area] = 0
+    return mask
+
+
+def mask_labels(card: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """
+    Timpa area label pada kartu hasil rectify dengan warna latar kartu
+    (median), in-place. Mask di-resize jika ukuran kartu berbeda.
+    """
+    if mask.shape != card.shape[:2]:
+        mask = cv2.resize(mask, card.shape[1::-1], interpolation=cv2.INTER_NEAREST)
+    sample = card[::8, ::8].reshape(-1, card.shape[2]) if card.ndim == 3 else card[::8, ::8].ravel()
+    card[mask > 0] = np.median(sample, axis=0).astype(card.dtype)
+    return card
+
+
+@dataclass
+class TemplateIndex:
+    """
+    Index alignment template KTP yang dihitung sekali (src/build_template_index.py).
+
+    Berisi keypoint + descriptor ORB dari bagian statis template (area nilai
+    di fields.json di-mask karena isinya beda di tiap kartu), field box dalam
+    koordinat kartu kanonik, dan ukuran kartu kanonik. Disimpan sebagai .npy
+    terpisah supaya bisa di-memory-map saat startup.
+    """
+    keypoints: np.ndarray       # (N, 2) float32, koordinat kartu kanonik
+    descriptors: np.ndarray     # (N, 32) uint8
+    size: tuple[int, int]       # (w, h) kartu kanonik
+    scale: float                # size / ukuran template asli
+    fields: dict[str, tuple[int, int, int, int]]
+
+    @classmethod
+    def build(
+            cls,
+            template: np.ndarray,
+            fields: dict[str, list[int]],
+            scale: float = 0.75,
+            n_features: int = N_FEATURES,
+    ) -> "TemplateIndex":
+        h, w = template.shape[:2]
+        size = (int(w * scale), int(h * scale))
+        card = cv2.resize(template, size, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(card, cv2.COLOR_BGR2GRAY) if card.ndim == 3 else card
+
+        scaled = {
+            name: tuple(int(v * scale) for v in box)
+            for name, box in fields.items()
+        }
+        mask = np.full(gray.shape, 255, dtype=np.uint8)
+        for x1, y1, x2, y2 in scaled.values():
+            mask[y1:y2, x1:x2] = 0
+
+        orb = cv2.ORB_create(nfeatures=n_features)
+        kps, desc = orb.detectAndCompute(gray, mask)
+        if desc is None or len(kps) < MIN_MATCHES:
+            raise ValueError(f"Keypoint template terlalu sedikit: {len(kps)}")
+
+        return cls(
+            keypoints=np.array([kp.pt for kp in kps], dtype=np.float32),
+            descriptors=desc,
+            size=size,
+            scale=scale,
+            fields=scaled,
+        )
+
+    def save(self, directory: Path = INDEX_DIR) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "keypoints.npy", self.keypoints)
+        np.save(directory / "descriptors.npy", self.descriptors)
+        with open(directory / "meta.json", "w") as f:
+            json.dump({
+                "size": list(self.size),
+                "scale": self.scale,
+                "fields": {k: list(v) for k, v in self.fields.items()},
+            }, f, indent=4)
+
+    @classmethod
+    def load(cls, directory: Path = INDEX_DIR) -> Optional["TemplateIndex"]:
+        """Muat index (array di-memory-map). Return None jika index belum dibuat."""
+        meta_path = directory / "meta.json"
+        if not meta_path.exists():
+            return None
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        return cls(
+            keypoints=np.load(directory / "keypoints.npy", mmap_mode="r"),
+            descriptors=np.load(directory / "descriptors.npy", mmap_mode="r"),
+            size=tuple(meta["size"]),
+            scale=float(meta["scale"]),
+            fields={k: tuple(v) for k, v in meta["fields"].items()},
+        )
+
+    def homography(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Homography dari koordinat image ke kartu kanonik, atau None jika
+        match terlalu sedikit. Image diskalakan dulu ke lebar kartu kanonik
+        supaya skala keypoint mirip dengan template.
+        """
+        h, w = image.shape[:2]
+        f = self.size[0] / w
+        small = cv2.resize(image, (self.size[0], max(1, int(h * f))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+        kps, desc = cv2.ORB_create(nfeatures=N_FEATURES).detectAndCompute(gray, None)
+        if desc is None or len(kps) < MIN_MATCHES:
+            return None
+
+        matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+        pairs = matcher.knnMatch(desc, np.ascontiguousarray(self.descriptors), k=2)
+        good = [p[0] for p in pairs if len(p) == 2 and p[0].distance < RATIO_TEST * p[1].distance]
+        if len(good) < MIN_MATCHES:
+            return None
+
+        src = np.float32([kps[m.queryIdx].pt for m in good]) / f
+        dst = np.asarray(self.keypoints)[[m.trainIdx for m in good]]
+        H, inliers = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+        if H is None or int(inliers.sum()) < MIN_MATCHES:
+            return None
+        return H
+
+    def rectify(self, image: np.ndarray) -> Optional[np.ndarray]:
+        """Warp image ke kartu kanonik berukuran self.size, atau None jika alignment gagal."""
+        H = self.homography(image)
+        if H is None:
+            return None
+        return cv2.warpPerspective(image, H, self.size, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
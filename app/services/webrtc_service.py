@@ -2,44 +2,58 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Callable
+from typing import Callable, Optional, Union
 
 import numpy as np
 from aiortc import MediaStreamTrack, RTCPeerConnection, RTCSessionDescription
 from aiortc.contrib.media import MediaBlackhole
+from av import VideoFrame
+
+from app.services.session_service import SessionRegistry
 
 logger = logging.getLogger(__name__)
 
+FrameCallback = Callable[[Union[np.ndarray, VideoFrame]], None]
+
 
 class WebRTCService:
 
-    def __init__(self) -> None:
+    def __init__(self, sessions: Optional[SessionRegistry] = None) -> None:
         self._peer_connections: set[RTCPeerConnection] = set()
+        self._sessions = sessions
+        self._session_ids: dict[RTCPeerConnection, str] = {}
 
     async def handle_offer(
             self,
             sdp: str,
             type_: str,
-            on_frame: Callable[[np.ndarray], None],
+            on_frame: FrameCallback,
+            session_id: Optional[str] = None,
+            decode: bool = True,
     ) -> dict:
+        """
+        decode=False mengaktifkan mode mailbox: on_frame menerima av.VideoFrame
+        mentah dan konversi ke numpy diserahkan ke consumer (lihat FrameMailbox).
+        """
         pc = RTCPeerConnection()
         self._peer_connections.add(pc)
+        if session_id is not None:
+            self._session_ids[pc] = session_id
         sink = MediaBlackhole()
 
         async def _consume_track(
                 track: MediaStreamTrack,
-                callback: Callable[[np.ndarray], None],
+                callback: FrameCallback,
         ) -> None:
 
             frame_count = 0
             while True:
                 try:
                     frame = await track.recv()
-                    img = frame.to_ndarray(format="bgr24")
                     frame_count += 1
                     if frame_count % 30 == 0:
                         logger.info("Frame consumed: %d", frame_count)
-                    callback(img)
+                    callback(frame.to_ndarray(format="bgr24") if decode else frame)
                 except Exception as e:
                     logger.info("Track ended atau error: %s", e)
                     break
@@ -73,8 +87,20 @@ class WebRTCService:
     async def _cleanup(self, pc: RTCPeerConnection) -> None:
         await pc.close()
         self._peer_connections.discard(pc)
+
+        session_id = self._session_ids.pop(pc, None)
+        if session_id is not None and self._sessions is not None:
+            self._sessions.remove(session_id)
+
         logger.info("Peer connection ditutup dan dibersihkan.")
 
     async def close_all(self) -> None:
         await asyncio.gather(*[pc.close() for pc in self._peer_connections])
         self._peer_connections.clear()
+        self._session_ids.clear()
+        if self._sessions is not None:
+            self._sessions.clear()
+
+    @property
+    def active_connections(self) -> int:
+        return len(self._peer_connections)
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import importlib.util
+import json
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from ultralytics import YOLO
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+
+# Artefak terkuantisasi tidak ikut auto-select: harus dibuat dan divalidasi
+# dulu dengan src/quantize_yolo.py, lalu dipilih eksplisit.
+QUANTIZED_BACKENDS = ("openvino-int8",)
+
+# Runtime Python yang dibutuhkan tiap backend (selain ultralytics sendiri).
+_BACKEND_MODULE = {
+    "pytorch": "torch",
+    "onnx": "onnxruntime",
+    "openvino": "openvino",
+    "openvino-int8": "openvino",
+}
+
+EXPORT_IMGSZ = 640
+
+
+@dataclass
+class YOLOBackend:
+    """
+    Satu artefak model + runtime-nya. Semua backend dijalankan lewat
+    ultralytics.YOLO (AutoBackend), jadi pre/post-processing dan format
+    Results identik — yang berbeda hanya engine forward pass.
+    """
+    name: str
+    artifact: Path
+    device: str
+    threads: Optional[int] = None   # batas thread intra-op CPU (None = default runtime)
+    model: Optional[YOLO] = None
+
+    def load(self) -> None:
+        from ultralytics import YOLO
+        self.model = YOLO(str(self.artifact), task="detect")
+        if self.name == "pytorch":
+            self.model.to(self.device)
+        elif self.threads is not None and self.device == "cpu":
+            self._limit_runtime_threads()
+
+    def _limit_runtime_threads(self) -> None:
+        """
+        AutoBackend membuat session ONNX Runtime / OpenVINO tanpa opsi jumlah
+        thread (semua core). Setelah predictor terbentuk (satu dummy predict),
+        session-nya dibuat ulang dari artefak yang sama dengan batas thread.
+        """
+        dummy = np.zeros((EXPORT_IMGSZ, EXPORT_IMGSZ, 3), dtype=np.uint8)
+        self.predict([dummy], confidence=0.5)
+        auto_backend = self.model.predictor.model
+        threads = max(1, self.threads)
+
+        if self.name == "onnx":
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+            auto_backend.session = ort.InferenceSession(
+                str(self.artifact), sess_options=options, providers=auto_backend.session.get_providers()
+            )
+        else:
+            import openvino as ov
+            xml = next(self.artifact.glob("*.xml"))
+            core = ov.Core()
+            auto_backend.ov_compiled_model = core.compile_model(
+                core.read_model(str(xml)),
+                device_name="CPU",
+                config={"PERFORMANCE_HINT": "LATENCY", "INFERENCE_NUM_THREADS": threads},
+            )
+        logger.info("Backend YOLO %s dibatasi %d thread", self.name, threads)
+
+    def predict(self, frames: list[np.ndarray], confidence: float) -> list:
+        if self.model is None:
+            raise RuntimeError(f"Backend YOLO {self.name} belum dimuat.")
+        return self.model.predict(
+            frames,
+            conf=confidence,
+            verbose=False,
+            device=self.device,
+        )
+
+    def warmup(self, runs: int = 1) -> float:
+        """Jalankan dummy predict, return latency rata-rata (detik) setelah run pertama."""
+        dummy = np.zeros((EXPORT_IMGSZ, EXPORT_IMGSZ, 3), dtype=np.uint8)
+        self.predict([dummy], confidence=0.5)
+        if runs <= 1:
+            return 0.0
+
+        t0 = time.perf_counter()
+        for _ in range(runs - 1):
+            self.predict([dummy], confidence=0.5)
+        return (time.perf_counter() - t0) / (runs - 1)
+
+
+def resolve_device(device: str) -> str:
+    if device != "auto":
+        return device
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+
+def limit_threads(threads: int) -> None:
+    """
+    Batasi thread intra-op PyTorch di proses ini (rencana core, lihat
+    app/services/resource_plan.py). ONNX Runtime dan OpenVINO dibatasi per
+    session lewat YOLOBackend.threads.
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(max(1, threads))
+
+
+def is_available(backend: str) -> bool:
+    module = _BACKEND_MODULE.get(backend)
+    return module is not None and importlib.util.find_spec(module) is not None
+
+
+def artifact_path(model_path: Path, backend: str) -> Path:
+    """Lokasi artefak hasil export, mengikuti penamaan default ultralytics (di sebelah .pt)."""
+    if backend == "pytorch":
+        return model_path
+    if backend == "onnx":
+        return model_path.with_suffix(".onnx")
+    if backend == "openvino":
+        return model_path.parent / f"{model_path.stem}_openvino_model"
+    if backend == "openvino-int8":
+        return model_path.parent / f"{model_path.stem}_int8_openvino_model"
+    raise ValueError(f"Backend YOLO tidak dikenal: {backend!r}")
+
+
+def ensure_artifact(model_path: Path, backend: str) -> Path:
+    """
+    Export .pt ke format backend sekali saja, lalu pakai ulang dari cache.
+    Artefak di-export ulang jika .pt lebih baru dari artefaknya.
+    """
+    target = artifact_path(model_path, backend)
+    if backend == "pytorch":
+        return target
+
+    if backend in QUANTIZED_BACKENDS:
+        if not target.exists():
+            raise FileNotFoundError(
+                f"Artefak {backend} tidak ditemukan: {target}. "
+                "Jalankan dulu: python -m src.quantize_yolo"
+            )
+        return target
+
+    if target.exists() and target.stat().st_mtime >= model_path.stat().st_mtime:
+        return target
+
+    from ultralytics import YOLO
+
+    logger.info("Export YOLO ke %s (sekali saja) ...", backend)
+    t0 = time.perf_counter()
+    exported = YOLO(str(model_path)).export(
+        format=backend,
+        imgsz=EXPORT_IMGSZ,
+        dynamic=True,
+    )
+    logger.info("Export %s selesai | %.2fs | %s", backend, time.perf_counter() - t0, exported)
+    return Path(exported)
+
+
+def load_backend(model_path: Path, backend: str, device: str, threads: Optional[int] = None) -> YOLOBackend:
+    if backend not in BACKENDS + QUANTIZED_BACKENDS:
+        raise ValueError(
+            f"Backend YOLO tidak dikenal: {backend!r}. Pilihan: {BACKENDS + QUANTIZED_BACKENDS}"
+        )
+    if not is_available(backend):
+        raise RuntimeError(f"Runtime untuk backend {backend!r} tidak terpasang.")
+
+    instance = YOLOBackend(
+        name=backend,
+        artifact=ensure_artifact(model_path, backend),
+        device=device,
+        threads=threads,
+    )
+    instance.load()
+    return instance
+
+
+def choice_path(model_path: Path) -> Path:
+    """Cache hasil auto-select backend, di sebelah .pt."""
+    return model_path.parent / f"{model_path.stem}_backend.json"
+
+
+def _choice_key(model_path: Path, device: str, threads: Optional[int], candidates: tuple[str, ...]) -> dict:
+    """Pilihan hanya dipakai ulang jika .pt, device, thread, dan kandidatnya sama."""
+    return {
+        "model_mtime": model_path.stat().st_mtime,
+        "device": device,
+        "threads": threads,
+        "candidates": list(candidates),
+    }
+
+
+def _load_cached_choice(model_path: Path, key: dict) -> Optional[str]:
+    try:
+        with open(choice_path(model_path)) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    backend = cached.get("backend")
+    if any(cached.get(k) != v for k, v in key.items()) or backend not in key["candidates"]:
+        return None
+    return backend
+
+
+def _save_choice(model_path: Path, key: dict, backend: str, latency: float) -> None:
+    try:
+        with open(choice_path(model_path), "w") as f:
+            json.dump({**key, "backend": backend, "latency_ms": round(latency * 1000, 2)}, f, indent=2)
+    except OSError as e:
+        logger.warning("Pilihan backend YOLO tidak bisa disimpan: %s", e)
+
+
+def select_backend(
+        model_path: Path,
+        device: str,
+        candidates: Optional[tuple[str, ...]] = None,
+        runs: int = 5,
+        threads: Optional[int] = None,
+) -> YOLOBackend:
+    """
+    Pilih backend tercepat. Run pertama memuat semua backend yang tersedia
+    (termasuk export), mengukur latency dummy predict, lalu menyimpan
+    pilihannya ke choice_path(); start berikutnya hanya memuat backend itu.
+    Cache diabaikan jika .pt berubah atau device/thread/kandidat berbeda —
+    hapus file-nya untuk memaksa pengukuran ulang. Di GPU hanya PyTorch yang
+    dipakai (export CPU tidak akan lebih cepat dari CUDA).
+    """
+    if device.startswith("cuda"):
+        candidates = ("pytorch",)
+    candidates = tuple(b for b in (candidates or BACKENDS) if is_available(b))
+    if not candidates:
+        raise RuntimeError("Tidak ada backend YOLO yang tersedia.")
+
+    key = _choice_key(model_path, device, threads, candidates)
+    cached = _load_cached_choice(model_path, key) if len(candidates) > 1 else None
+    if cached is not None:
+        try:
+            backend = load_backend(model_path, cached, device, threads)
+            backend.warmup()
+            logger.info("Backend YOLO %s dari cache %s", cached, choice_path(model_path).name)
+            return backend
+        except Exception as e:
+            logger.warning("Backend YOLO %s dari cache gagal, ukur ulang: %s", cached, e)
+
+    best: Optional[YOLOBackend] = None
+    best_latency = float("inf")
+
+    for name in candidates:
+        try:
+            backend = load_backend(model_path, name, device, threads)
+            latency = backend.warmup(runs=runs if len(candidates) > 1 else 1)
+        except Exception as e:
+            logger.warning("Backend YOLO %s dilewati: %s", name, e)
+            continue
+
+        logger.info("Backend YOLO %-8s | %.1f ms/frame", name, latency * 1000)
+        if latency < best_latency:
+            best, best_latency = backend, latency
+
+    if best is None:
+        raise RuntimeError("Semua backend YOLO gagal dimuat.")
+    if len(candidates) > 1:
+        _save_choice(model_path, key, best.name, best_latency)
+    return best
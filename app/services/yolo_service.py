@@ -7,7 +7,9 @@ from pathlib import Path
 from typing import Optional
 
 import numpy as np
-from ultralytics import YOLO
+
+from app.services import metrics
+from app.services.yolo_backends import YOLOBackend, limit_threads, load_backend, resolve_device, select_backend
 
 logger = logging.getLogger(__name__)
 
@@ -48,65 +50,88 @@ class YOLOService:
             self,
             model_path: str | Path = MODEL_PATH,
             confidence: float = 0.5,
-            device: str = "cuda"
+            device: str = "auto",
+            backend: str = "auto",
+            threads: Optional[int] = None,
     ) -> None:
-
+        """
+        device  : "auto" | "cpu" | "cuda" | "cuda:N" — auto memilih CUDA jika tersedia.
+        backend : "auto" | "pytorch" | "onnx" | "openvino" | "openvino-int8" — auto
+                  mengukur semua backend FP32 yang terpasang sekali, memakai yang
+                  tercepat, dan menyimpan pilihannya untuk start berikutnya;
+                  "openvino-int8" memuat artefak dari src/quantize_yolo.py.
+        threads : batas thread intra-op CPU (None = default runtime).
+        """
         self.confidence = confidence
-        self.device = device
-        self._model: Optional[YOLO] = None
-        self.last_frame: Optional[np.ndarray] = None
-        self.last_box: Optional[YOLOBox] = None
-        self._load(model_path)
-
-    def _load(self, model_path: str | Path) -> None:
+        self.device = resolve_device(device)
+        self.threads = threads
+        if threads is not None and self.device == "cpu":
+            limit_threads(threads)
+        self._backend: Optional[YOLOBackend] = None
+        self._load(model_path, backend)
+
+    @property
+    def backend_name(self) -> Optional[str]:
+        return self._backend.name if self._backend is not None else None
+
+    def _load(self, model_path: str | Path, backend: str) -> None:
         path = Path(model_path)
-        print(f"DEBUG PATH: {path.resolve()}")
+        logger.debug("Path model YOLO: %s", path.resolve())
         if not path.exists():
             raise FileNotFoundError(f"Model YOLO tidak ditemukan: {path}")
 
         logger.info("Memuat model YOLO dari %s ...", path)
         t0 = time.perf_counter()
 
-        self._model = YOLO(str(path))
-        self._model.to(self.device)
-
-        dummy = np.zeros((640, 640, 3), dtype=np.uint8)
-        self._model.predict(dummy, verbose=False)
+        if backend == "auto":
+            self._backend = select_backend(path, self.device, threads=self.threads)
+        else:
+            self._backend = load_backend(path, backend, self.device, self.threads)
+            self._backend.warmup()
 
-        logger.info("YOLO aktif | %.2fs | device=%s", time.perf_counter() - t0, self.device)
+        logger.info(
+            "YOLO aktif | %.2fs | device=%s | backend=%s",
+            time.perf_counter() - t0, self.device, self._backend.name,
+        )
 
     def predict(self, frame: np.ndarray) -> list[YOLOBox]:
-        if self._model is None:
+        return self.predict_batch([frame])[0]
+
+    def predict_batch(self, frames: list[np.ndarray]) -> list[list[YOLOBox]]:
+        """Satu forward pass untuk beberapa frame sekaligus. Urutan hasil = urutan input."""
+        if self._backend is None:
             raise RuntimeError("Model YOLO belum diinisialisasi.")
 
-        h, w = frame.shape[:2]
+        if not frames:
+            return []
 
-        results = self._model.predict(
-            frame,
-            conf=self.confidence,
-            verbose=False,
-            device=self.device
-        )
+        t0 = time.perf_counter()
+        results = self._backend.predict(frames, confidence=self.confidence)
+        boxes = [self._to_boxes(result, frame) for result, frame in zip(results, frames)]
+        metrics.observe("yolo_predict", time.perf_counter() - t0)
+        return boxes
 
+    @staticmethod
+    def _to_boxes(result, frame: np.ndarray) -> list[YOLOBox]:
+        h, w = frame.shape[:2]
         boxes: list[YOLOBox] = []
 
-        for result in results:
-            for box in result.boxes:
-                cls_id = int(box.cls[0])
-                if cls_id != 0:
-                    continue
+        for box in result.boxes:
+            cls_id = int(box.cls[0])
+            if cls_id != 0:
+                continue
 
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                score = float(box.conf[0])
+            x1, y1, x2, y2 = box.xyxy[0].tolist()
+            score = float(box.conf[0])
 
-                boxes.append(YOLOBox(
-                    label=CLASS_NAMES.get(cls_id, str(cls_id)),
-                    x=x1 / w,
-                    y=y1 / h,
-                    w=(x2 - x1) / w,
-                    h=(y2 - y1) / h,
-                    score=score,
-                ))
+            boxes.append(YOLOBox(
+                label=CLASS_NAMES.get(cls_id, str(cls_id)),
+                x=x1 / w,
+                y=y1 / h,
+                w=(x2 - x1) / w,
+                h=(y2 - y1) / h,
+                score=score,
+            ))
 
         boxes.sort(key=lambda b: b.score, reverse=True)
         return boxes[:1]
@@ -116,6 +141,7 @@ class YOLOService:
         Crop frame berdasarkan YOLOBox + padding kecil.
         Return cropped BGR array siap masuk PaddleOCR.
         """
+        t0 = time.perf_counter()
         h, w = frame.shape[:2]
 
         x1 = max(0, int((box.x - padding) * w))
@@ -124,17 +150,10 @@ class YOLOService:
         y2 = min(h, int((box.y + box.h + padding) * h))
 
         cropped = frame[y1:y2, x1:x2]
+        metrics.observe("crop", time.perf_counter() - t0)
 
         if cropped.size == 0:
             logger.warning("Crop kosong, return frame asli.")
             return frame
 
         return cropped
-
-    def store_frame(self, frame: np.ndarray) -> None:
-        """Simpan frame terakhir untuk dipakai saat capture."""
-        self.last_frame = frame.copy()
-
-    def store_box(self, box: Optional["YOLOBox"]) -> None:
-        """Simpan box terakhir hasil YOLO predict."""
-        self.last_box = box
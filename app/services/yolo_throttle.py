@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+
+
+class AdaptiveYOLOThrottle:
+    """
+    Throttle YOLO per sesi yang menyesuaikan interval dari latency terukur.
+
+    - Maksimal satu deteksi in-flight per sesi.
+    - Keputusan memakai median RECENT sampel latency terakhir, jadi satu
+      spike tidak memicu backoff dan tidak menahan interval lama-lama.
+    - Jika median di bawah target dan antrian kosong, interval dikurangi
+      SPEEDUP_STEP detik (fps naik perlahan, additive).
+    - Jika median melewati target atau antrian menumpuk, interval dikali
+      BACKOFF (fps turun cepat, multiplicative).
+    p95 atas WINDOW sampel hanya untuk pelaporan.
+    """
+
+    MIN_INTERVAL = 1 / 15
+    MAX_INTERVAL = 1.0
+    START_INTERVAL = 0.3
+    TARGET_P95 = 0.15    # detik, end-to-end termasuk antri
+    MAX_BACKLOG = 4      # request YOLO yang masih antri di scheduler
+    SPEEDUP_STEP = 0.01  # detik
+    BACKOFF = 1.5
+    RECENT = 3           # sampel latency terakhir untuk keputusan
+    WINDOW = 30          # jumlah sampel latency untuk p95
+    FPS_WINDOW = 5.0     # detik
+
+    def __init__(self) -> None:
+        self.interval: float = self.START_INTERVAL
+        self._last_ts: float = 0.0
+        self._in_flight: bool = False
+        self._latencies: deque[float] = deque(maxlen=self.WINDOW)
+        self._completed: deque[float] = deque()
+
+    @property
+    def in_flight(self) -> bool:
+        return self._in_flight
+
+    def should_run(self) -> bool:
+        if self._in_flight:
+            return False
+        return (time.perf_counter() - self._last_ts) >= self.interval
+
+    def mark(self) -> None:
+        self._last_ts = time.perf_counter()
+        self._in_flight = True
+
+    def done(self, latency: float, backlog: int = 0) -> None:
+        """Dipanggil setelah deteksi selesai (sukses atau gagal)."""
+        now = time.perf_counter()
+        self._in_flight = False
+        self._latencies.append(latency)
+        self._completed.append(now)
+
+        if self.recent_latency() > self.TARGET_P95 or backlog > self.MAX_BACKLOG:
+            self.interval = min(self.MAX_INTERVAL, self.interval * self.BACKOFF)
+        elif backlog == 0:
+            self.interval = max(self.MIN_INTERVAL, self.interval - self.SPEEDUP_STEP)
+
+    def recent_latency(self) -> float:
+        """Median RECENT sampel terakhir."""
+        recent = sorted(list(self._latencies)[-self.RECENT:])
+        return recent[len(recent) // 2] if recent else 0.0
+
+    def p95(self) -> float:
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def effective_fps(self) -> float:
+        cutoff = time.perf_counter() - self.FPS_WINDOW
+        while self._completed and self._completed[0] < cutoff:
+            self._completed.popleft()
+        return len(self._completed) / self.FPS_WINDOW
+
+    def to_dict(self) -> dict:
+        return {
+            "interval_ms": round(self.interval * 1000, 1),
+            "target_fps": round(1 / self.interval, 2),
+            "effective_fps": round(self.effective_fps(), 2),
+            "p95_ms": round(self.p95() * 1000, 1),
+            "in_flight": self._in_flight,
+        }
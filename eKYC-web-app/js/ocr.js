@@ -166,7 +166,11 @@ function setKTPDetected(detected) {
   }
 }
 
-function renderKTPResult(data) {
+// Hasil parsial OCR (ktp_partial) dikumpulkan sampai ktp_result datang
+let partialData   = {}
+let ocrProcessing = false
+
+function renderKTPResult(data, final = true) {
   if (resultEmpty) resultEmpty.remove()
 
   resultBody.innerHTML = ''
@@ -195,6 +199,8 @@ function renderKTPResult(data) {
     statConf.textContent = `${Math.round(data.confidence_avg * 100)}%`
   }
 
+  if (!final) return
+
   if (pct >= 60) {
     scanStatus.className       = 'status-badge success'
     scanStatusText.textContent = '✓ Data KTP berhasil dibaca'
@@ -234,6 +240,8 @@ function onMessage(data) {
 
   // Capture sedang diproses
   if (data.event === 'capture_processing') {
+    partialData   = {}
+    ocrProcessing = true
     btnCapture.className       = 'btn-capture processing'
     btnCapture.disabled        = true
     scanStatus.className       = 'status-badge scanning'
@@ -241,8 +249,17 @@ function onMessage(data) {
     return
   }
 
+  // Hasil OCR parsial (NIK dulu, lalu nama + TTL, lalu sisanya)
+  if (data.event === 'ktp_partial') {
+    if (!ocrProcessing) return
+    Object.entries(data.fields).forEach(([key, field]) => { partialData[key] = field.value })
+    renderKTPResult(partialData, false)
+    return
+  }
+
   // Hasil OCR berhasil
   if (data.event === 'ktp_result') {
+    ocrProcessing = false
     renderKTPResult(data.data)
     btnCapture.className = 'btn-capture active'
     btnCapture.disabled  = false
@@ -252,6 +269,7 @@ function onMessage(data) {
 
   // Capture gagal
   if (data.event === 'capture_failed') {
+    ocrProcessing = false
     scanStatus.className       = 'status-badge failed'
     scanStatusText.textContent = `✗ ${data.reason}`
     btnCapture.className       = ktpDetected ? 'btn-capture active' : 'btn-capture'
@@ -5,6 +5,10 @@ let localStream = null
 let pc          = null
 let ws          = null
 
+// session_id + session_token dibuat server di jawaban /offer; WebSocket
+// hanya bisa dipasang ke sesi tersebut dengan token yang cocok.
+let session = null
+
 const wsPill   = document.getElementById('wsPill')
 const wsStatus = document.getElementById('wsStatus')
 const iceState = document.getElementById('iceState')
@@ -16,7 +20,10 @@ const btnStop  = document.getElementById('btnStop')
 // ─── WebSocket ───────────────────────────────────────────────────────────────
 
 function connectWebSocket(wsEndpoint, onMessage) {
-  const url = `${BE_WS}${wsEndpoint}`
+  const query = session
+    ? `?session_id=${encodeURIComponent(session.id)}&token=${encodeURIComponent(session.token)}`
+    : ''
+  const url = `${BE_WS}${wsEndpoint}${query}`
   console.log('[WS] Connecting to:', url)
 
   ws = new WebSocket(url)
@@ -61,10 +68,6 @@ async function startWebRTC(wsEndpoint, offerEndpoint, onMessage) {
     return
   }
 
-  // ✅ Pass wsEndpoint ke connectWebSocket — sebelumnya tidak dipakai sama sekali
-  connectWebSocket(wsEndpoint, onMessage)
-  await new Promise(r => setTimeout(r, 400))
-
   pc = new RTCPeerConnection({
     iceServers: [{ urls: 'stun:stun.l.google.com:19302' }]
   })
@@ -98,12 +101,17 @@ async function startWebRTC(wsEndpoint, offerEndpoint, onMessage) {
     if (!res.ok) throw new Error(`HTTP ${res.status}`)
     const answer = await res.json()
     console.log('[WebRTC] Answer received, setting remote description')
-    await pc.setRemoteDescription(new RTCSessionDescription(answer))
+    await pc.setRemoteDescription(new RTCSessionDescription({ sdp: answer.sdp, type: answer.type }))
+    session = answer.session_id ? { id: answer.session_id, token: answer.session_token } : null
   } catch (err) {
     console.error('[WebRTC] Offer failed:', err)
     wsPill.className     = 'status-pill error'
     wsStatus.textContent = 'Server error'
+    return
   }
+
+  // WebSocket dibuka setelah offer supaya memakai sesi yang dibuat server.
+  connectWebSocket(wsEndpoint, onMessage)
 }
 
 // ─── Stop ────────────────────────────────────────────────────────────────────
@@ -111,6 +119,7 @@ async function startWebRTC(wsEndpoint, offerEndpoint, onMessage) {
 function stopAll() {
   if (pc)          { pc.close(); pc = null }
   if (ws)          { ws.close(); ws = null }
+  session = null
   if (localStream) { localStream.getTracks().forEach(t => t.stop()); localStream = null }
 
   video.srcObject      = null
@@ -0,0 +1,75 @@
+"""
+Ukur efek mask label template (Template-KTP.png) pada mode OCR "layout".
+
+Label statis kartu ("NIK", "Nama", ...) ditutup sebelum deteksi teks, jadi
+PaddleOCR tidak lagi menjalankan recognition untuk crop label. Script ini
+membandingkan kartu asli vs di-mask: jumlah box terdeteksi (= crop
+recognition), latency, dan akurasi field per kartu.
+
+Butuh dataset sintetis + ground truth (lihat src/ktp_dataset.py):
+    python src/benchmark_label_mask.py [--limit 50] [--preprocess quality]
+"""
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.services.ocr_service import OCRService, _parse_field_texts, _preprocess_image  # noqa: E402
+from app.services.template_index import mask_labels  # noqa: E402
+from src.ktp_dataset import require_samples, run_ocr  # noqa: E402
+
+
+def run_layout(ocr: OCRService, card, box_counts: list[int]):
+    """Satu pass mode "layout" pada kartu hasil rectify; jumlah box dicatat ke box_counts."""
+    preprocessed = _preprocess_image(card, ocr.preprocess)
+    texts, scores, boxes = ocr._run_ocr(preprocessed)
+    box_counts.append(len(texts))
+    field_texts = ocr.layout.assign(texts, scores, boxes, preprocessed.shape[1::-1])
+    return _parse_field_texts(field_texts, min_confidence=ocr.min_confidence)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ukur efek mask label template pada mode OCR \"layout\": jumlah box "
+                    "terdeteksi (= crop recognition), latency, dan akurasi field per kartu."
+    )
+    parser.add_argument("--limit", type=int, default=0, help="jumlah gambar maksimal (0 = semua)")
+    parser.add_argument("--preprocess", default="quality")
+    args = parser.parse_args()
+
+    samples = require_samples(args.limit)
+    ocr = OCRService(mode="layout", preprocess=args.preprocess)
+    if ocr.label_mask is None:
+        print("ERROR: mask label tidak bisa dibuat (Template-KTP.png tidak ada).")
+        return 1
+    print(f"Gambar     : {len(samples)}")
+    print(f"Mask label : {int((ocr.label_mask > 0).sum())} px ({(ocr.label_mask > 0).mean():.1%} kartu)\n")
+
+    cards = {s.name: ocr.rectify(s.image) for s in samples}
+    masked_cards = {name: mask_labels(card.copy(), ocr.label_mask) for name, card in cards.items()}
+
+    rows = []
+    for masked, card_set in ((False, cards), (True, masked_cards)):
+        box_counts: list[int] = []
+        run = run_ocr(samples, lambda s: run_layout(ocr, card_set[s.name], box_counts))
+        boxes = box_counts[1:]  # tanpa warm-up
+        rows.append((masked, sum(boxes) / len(boxes), run.mean_ms, run.accuracy.overall))
+
+    print(f"{'Label':<10} {'Rec/kartu':>10} {'Latency':>11} {'Akurasi':>9}")
+    for masked, boxes, ms, accuracy in rows:
+        label = "di-mask" if masked else "asli"
+        print(f"{label:<10} {boxes:>10.1f} {ms:>8.1f} ms {accuracy:>9.1%}")
+
+    (_, base_boxes, base_ms, base_acc), (_, mask_boxes, mask_ms, mask_acc) = rows
+    saved = base_boxes - mask_boxes
+    ratio = saved / base_boxes if base_boxes else 0.0
+    print(f"\nRecognition dihemat : {saved:.1f} crop/kartu ({ratio:.0%})")
+    print(f"Latency             : {base_ms - mask_ms:+.1f} ms/kartu")
+    print(f"Akurasi             : {mask_acc - base_acc:+.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Benchmark profil PaddleOCR (PADDLE_PROFILES di app/services/ocr_service.py):
+waktu load + warm-up, latency rata-rata / p95, dan akurasi field per profil.
+
+Butuh dataset sintetis + ground truth (lihat src/ktp_dataset.py):
+    python src/benchmark_paddle_profiles.py [--profiles ...] [--mode full]
+"""
+import argparse
+import os
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.services.ocr_service import OCR_MODES, PADDLE_PROFILES, OCRService  # noqa: E402
+from src.ktp_dataset import print_field_accuracy, require_samples, run_ocr  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark profil PaddleOCR: latency dan akurasi field pada dataset "
+                    "sintetis (python src/generate_synthetic.py)."
+    )
+    parser.add_argument("--profiles", nargs="+", default=list(PADDLE_PROFILES), choices=list(PADDLE_PROFILES))
+    parser.add_argument("--mode", default="full", choices=[m for m in OCR_MODES if m != "fields"])
+    parser.add_argument("--preprocess", default="quality")
+    parser.add_argument("--limit", type=int, default=0, help="jumlah gambar maksimal (0 = semua)")
+    args = parser.parse_args()
+
+    samples = require_samples(args.limit)
+
+    print(f"Gambar : {len(samples)} | mode {args.mode} | preprocess {args.preprocess}\n")
+    rows = []
+
+    for profile in args.profiles:
+        t0 = time.perf_counter()
+        ocr = OCRService(mode=args.mode, preprocess=args.preprocess, paddle_profile=profile)
+        ocr.extract_from_array(samples[0].image)  # warm-up predictor
+        load_s = time.perf_counter() - t0
+
+        run = run_ocr(samples, lambda s: ocr.extract_from_array(s.image), warmup=False)
+
+        print(f"[{profile}] {PADDLE_PROFILES[profile]}")
+        print(f"    load+warm-up {load_s:.1f}s | rata-rata {run.mean_ms:.1f} ms | p95 {run.p95_ms:.1f} ms"
+              f" | akurasi field {run.accuracy.overall:.1%}")
+        print_field_accuracy(run.accuracy)
+        print()
+        rows.append((profile, run.mean_ms, run.p95_ms, run.accuracy.overall))
+
+    print(f"{'Profil':<10} {'Rata-rata':>11} {'p95':>11} {'Akurasi':>9}")
+    for profile, mean_ms, p95_ms, accuracy in rows:
+        print(f"{profile:<10} {mean_ms:>8.1f} ms {p95_ms:>8.1f} ms {accuracy:>9.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
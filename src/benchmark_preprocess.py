@@ -0,0 +1,77 @@
+"""
+Benchmark profil _preprocess_image (PREPROCESS_PROFILES di
+app/services/ocr_service.py): waktu per tahap preprocess, lalu latency dan
+akurasi field OCR penuh per profil.
+
+Butuh dataset sintetis + ground truth (lihat src/ktp_dataset.py):
+    python src/benchmark_preprocess.py [--profiles fast quality] [--no-ocr]
+"""
+import argparse
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.services.ocr_service import PREPROCESS_PROFILES, OCRService, _preprocess_image  # noqa: E402
+from src.ktp_dataset import print_field_accuracy, require_samples, run_ocr  # noqa: E402
+
+
+def bench_stages(samples, profile: str, repeat: int) -> dict[str, float]:
+    """Rata-rata ms per tahap _preprocess_image per gambar."""
+    for s in samples[:1]:
+        _preprocess_image(s.image, profile)  # warm-up buffer per-thread
+
+    timings: dict[str, float] = {}
+    for _ in range(repeat):
+        for s in samples:
+            _preprocess_image(s.image, profile, timings)
+
+    n = max(1, repeat * len(samples))
+    return {stage: total / n * 1000 for stage, total in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark profil _preprocess_image: waktu per tahap dan akurasi field OCR "
+                    "pada dataset sintetis (python src/generate_synthetic.py)."
+    )
+    parser.add_argument("--profiles", nargs="+", default=list(PREPROCESS_PROFILES),
+                        choices=list(PREPROCESS_PROFILES))
+    parser.add_argument("--limit", type=int, default=0, help="jumlah gambar maksimal (0 = semua)")
+    parser.add_argument("--repeat", type=int, default=5, help="pengulangan untuk timing per tahap")
+    parser.add_argument("--no-ocr", action="store_true", help="hanya ukur waktu preprocess")
+    args = parser.parse_args()
+
+    samples = require_samples(args.limit)
+
+    print(f"Gambar : {len(samples)}\n")
+    rows = []
+
+    for profile in args.profiles:
+        stages = bench_stages(samples, profile, args.repeat)
+        total = sum(stages.values())
+        print(f"[{profile}] preprocess {total:.1f} ms/gambar")
+        for stage, ms in stages.items():
+            print(f"    {stage:<8} {ms:7.2f} ms")
+
+        accuracy, ocr_ms = None, None
+        if not args.no_ocr:
+            ocr = OCRService(preprocess=profile)
+            run = run_ocr(samples, lambda s: ocr.extract_from_array(s.image))
+            ocr_ms, accuracy = run.mean_ms, run.accuracy.overall
+            print(f"    OCR      {ocr_ms:7.1f} ms/gambar | akurasi field {accuracy:.1%}")
+            print_field_accuracy(run.accuracy)
+        print()
+        rows.append((profile, total, ocr_ms, accuracy))
+
+    print(f"{'Profil':<10} {'Preprocess':>12} {'OCR total':>12} {'Akurasi':>9}")
+    for profile, pre_ms, ocr_ms, accuracy in rows:
+        ocr_col = f"{ocr_ms:.1f} ms" if ocr_ms is not None else "-"
+        acc_col = f"{accuracy:.1%}" if accuracy is not None else "-"
+        print(f"{profile:<10} {pre_ms:>9.1f} ms {ocr_col:>12} {acc_col:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.services.template_index import INDEX_DIR, N_FEATURES, TemplateIndex  # noqa: E402
+
+TEMPLATE_PATH = os.path.join(BASE_DIR, "Data", "Template", "Template-KTP.png")
+FIELDS_PATH = os.path.join(BASE_DIR, "Data", "Template", "fields.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bangun index keypoint template KTP untuk OCRService.rectify "
+                    "(jalankan ulang setiap Template-KTP.png / fields.json berubah)."
+    )
+    parser.add_argument("--template", default=TEMPLATE_PATH)
+    parser.add_argument("--fields", default=FIELDS_PATH)
+    parser.add_argument("--out", default=str(INDEX_DIR))
+    parser.add_argument("--scale", type=float, default=0.75, help="ukuran kartu kanonik relatif template")
+    parser.add_argument("--features", type=int, default=N_FEATURES)
+    parser.add_argument("--check", default=None, help="gambar KTP untuk uji rectify setelah build")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.fields):
+        print("ERROR: fields.json belum ada.")
+        print("Jalankan dulu: python src/find_coordinate.py")
+        return 1
+
+    template = cv2.imread(args.template)
+    if template is None:
+        print(f"File tidak ditemukan: {args.template}")
+        return 1
+
+    with open(args.fields) as f:
+        fields = json.load(f)
+
+    index = TemplateIndex.build(template, fields, scale=args.scale, n_features=args.features)
+    index.save(Path(args.out))
+
+    print(f"Template  : {template.shape[1]}x{template.shape[0]} px")
+    print(f"Kanonik   : {index.size[0]}x{index.size[1]} px (scale {index.scale})")
+    print(f"Keypoint  : {len(index.keypoints)}")
+    print(f"Field     : {len(index.fields)}")
+    print(f"💾 Disimpan ke: {args.out}")
+
+    if args.check:
+        image = cv2.imread(args.check)
+        loaded = TemplateIndex.load(Path(args.out))
+        t0 = time.perf_counter()
+        card = loaded.rectify(image)
+        ms = (time.perf_counter() - t0) * 1000
+        if card is None:
+            print(f"✗ Rectify gagal untuk {args.check} ({ms:.1f} ms)")
+            return 1
+        out = os.path.splitext(args.check)[0] + "_rectified.png"
+        cv2.imwrite(out, card)
+        print(f"✓ Rectify {args.check} -> {out} ({ms:.1f} ms)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
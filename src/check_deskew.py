@@ -0,0 +1,112 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.services.ocr_service import _estimate_skew  # noqa: E402
+from src.ktp_dataset import load_samples  # noqa: E402
+
+ANGLES = (-8.0, -5.0, -3.0, -1.5, -0.7, 0.0, 0.7, 1.5, 3.0, 5.0, 8.0)
+SCALES = (0.5, 1.0, 2.0)
+
+
+def estimate_skew_full(image: np.ndarray):
+    """Implementasi lama: minAreaRect atas semua piksel foreground."""
+    coords = np.column_stack(np.where(image > 0)).astype(np.int32)
+    if len(coords) < 100:
+        return None
+    angle = cv2.minAreaRect(coords)[-1]
+    if angle < -45:
+        angle = 90 + angle
+    elif angle > 45:
+        angle = angle - 90
+    return angle
+
+
+def binarize(image: np.ndarray) -> np.ndarray:
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return binary
+
+
+def rotate(image: np.ndarray, angle: float) -> np.ndarray:
+    h, w = image.shape[:2]
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+    return cv2.warpAffine(image, M, (w, h), flags=cv2.INTER_LINEAR, borderValue=(0, 0, 0))
+
+
+def measure(fn, image):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    angle = fn(image)
+    ms = (time.perf_counter() - t0) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return angle, ms, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bandingkan _estimate_skew (sampel) dengan estimasi lama (semua piksel) "
+                    "pada KTP sintetis yang diputar."
+    )
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="selisih sudut maksimal (derajat)")
+    args = parser.parse_args()
+
+    samples = load_samples(args.limit)
+    if not samples:
+        print("ERROR: dataset sintetis belum ada. Jalankan dulu: python src/generate_synthetic.py")
+        return 1
+
+    max_diff = 0.0
+    failures = 0
+    stats = {"full": [0.0, 0], "sampled": [0.0, 0]}   # [total ms, peak bytes]
+
+    for scale in SCALES:
+        for s in samples:
+            base = cv2.resize(s.image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            for angle in ANGLES:
+                binary = binarize(rotate(base, angle))
+                ref, ms_ref, mem_ref = measure(estimate_skew_full, binary)
+                new, ms_new, mem_new = measure(_estimate_skew, binary)
+
+                stats["full"][0] += ms_ref
+                stats["full"][1] = max(stats["full"][1], mem_ref)
+                stats["sampled"][0] += ms_new
+                stats["sampled"][1] = max(stats["sampled"][1], mem_new)
+
+                if (ref is None) != (new is None):
+                    failures += 1
+                    print(f"✗ {s.name} x{scale} {angle:+.1f}°: lama={ref} baru={new}")
+                    continue
+                if ref is None:
+                    continue
+                diff = abs(ref - new)
+                max_diff = max(max_diff, diff)
+                if diff > args.tolerance:
+                    failures += 1
+                    print(f"✗ {s.name} x{scale} {angle:+.1f}°: lama={ref:.2f} baru={new:.2f}")
+
+    n = len(samples) * len(ANGLES) * len(SCALES)
+    print(f"\nKasus       : {n} ({len(samples)} kartu x {len(ANGLES)} sudut x {len(SCALES)} skala)")
+    print(f"Selisih max : {max_diff:.3f}° (toleransi {args.tolerance}°)")
+    for name, (ms, peak) in stats.items():
+        print(f"{name:<8}: {ms / n:7.2f} ms/kasus | peak {peak / 1e6:7.2f} MB")
+
+    if failures:
+        print(f"\n✗ {failures} kasus di luar toleransi")
+        return 1
+    print("\n✓ Estimasi skew konsisten")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,385 @@
+"""
+Cek paritas _parse_ktp_texts (dispatcher satu-pass + trigger regex gabungan)
+terhadap cascade regex lama (parse_ktp_texts_legacy, salinan parser sebelum
+refactor). Exit code 1 jika ada output yang berbeda.
+
+Korpus:
+  - ground truth KTP sintetis di Data/Generated E-ktp/ground_truth jika ada
+    (python src/generate_synthetic.py), jika tidak ada dibangkitkan di sini
+    dengan random ber-seed (--cards kartu);
+  - setiap kartu dirender menjadi --variants variasi baris OCR (label/nilai
+    terpisah atau digabung, noise digit, baris hilang/tertukar);
+  - opsional output PaddleOCR mentah (--record-ocr, butuh gambar sintetis).
+
+Contoh:
+    python src/check_parser_parity.py --cards 100 --variants 200
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from dataclasses import asdict
+from typing import Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.services.ocr_service import (  # noqa: E402
+    _ALL_FIELDS,
+    _RE,
+    AGAMA_VALID,
+    KTPData,
+    _clean_name,
+    _fix_ocr_digit_noise,
+    _next_nonempty,
+    _normalize_date,
+    _parse_ktp_texts,
+    _post_validate,
+    _strip_label,
+)
+from src.ktp_dataset import GENERATED_DIR, GROUND_TRUTH_DIR, load_samples  # noqa: E402
+
+OCR_CORPUS_PATH = os.path.join(GENERATED_DIR, "ocr_corpus.jsonl")
+
+# Label statis KTP sesuai urutan baca OCR (atas ke bawah).
+LABELS = [
+    ("NIK", "NIK"),
+    ("Nama", "Nama"),
+    ("Tempat/Tgl Lahir", "Tempat Tanggal Lahir"),
+    ("Jenis Kelamin", "Jenis Kelamin"),
+    ("Gol. Darah", "Gol. Darah"),
+    ("Alamat", "Alamat"),
+    ("RT/RW", "RT/RW"),
+    ("Kel/Desa", "Kelurahan/Desa"),
+    ("Kecamatan", "Kecamatan"),
+    ("Agama", "Agama"),
+    ("Status Perkawinan", "Status Perkawinan"),
+    ("Pekerjaan", "Pekerjaan"),
+    ("Kewarganegaraan", "Kewarganegaraan"),
+    ("Berlaku Hingga", "Berlaku Hingga"),
+]
+DIGIT_NOISE = {"0": "O", "1": "l", "5": "S", "8": "B", "6": "G", "2": "Z"}
+
+
+def parse_ktp_texts_legacy(
+        texts: list[str],
+        scores: Optional[list[float]] = None,
+        min_confidence: float = 0.65,
+) -> KTPData:
+    """Cascade regex per baris tanpa klasifikasi _LINE_KEYWORDS (referensi paritas)."""
+    result = KTPData()
+    warnings = result.parse_warnings
+    found = set()
+
+    if scores and len(scores) == len(texts):
+        valid_pairs = [(t, s) for t, s in zip(texts, scores) if s >= min_confidence]
+        if valid_pairs:
+            texts, scores = zip(*valid_pairs)  # type: ignore
+            texts = list(texts)
+            scores = list(scores)
+            result.confidence_avg = sum(scores) / len(scores)
+        else:
+            warnings.append("Semua skor OCR di bawah threshold.")
+            return result
+    else:
+        result.confidence_avg = -1.0
+
+    for i, raw_text in enumerate(texts):
+        if len(found) >= len(_ALL_FIELDS):
+            break
+
+        text = raw_text.strip()
+        upper = text.upper()
+
+        if "nik" not in found:
+            candidate = re.sub(r"[^0-9OolIlZSGB]", "", text)
+            candidate = _fix_ocr_digit_noise(candidate)
+            if _RE["nik_valid"].match(candidate):
+                result.nik = candidate
+                found.add("nik")
+
+        if "nama" not in found and _RE["trig_nama"].search(upper):
+            val = _strip_label(text)
+            if not val:
+                val = _next_nonempty(texts, i)
+            if val:
+                result.nama = _clean_name(val)
+                found.add("nama")
+            else:
+                warnings.append(f"[{i}] Trigger 'Nama' ditemukan tapi nilai kosong.")
+
+        if "tempat_lahir" not in found and _RE["trig_ttl"].search(upper):
+            m = _RE["val_ttl"].search(text)
+            if m:
+                result.tempat_lahir = m.group(1).strip().title()
+                result.tgl_lahir = _normalize_date(m.group(2).strip())
+                found.update(["tempat_lahir", "tgl_lahir"])
+            else:
+                nxt = _next_nonempty(texts, i)
+                if nxt:
+                    m2 = _RE["val_ttl"].search(nxt)
+                    if m2:
+                        result.tempat_lahir = m2.group(1).strip().title()
+                        result.tgl_lahir = _normalize_date(m2.group(2).strip())
+                        found.update(["tempat_lahir", "tgl_lahir"])
+                    else:
+                        dm = _RE["val_date"].search(nxt)
+                        if dm:
+                            result.tgl_lahir = _normalize_date(dm.group())
+                            found.add("tgl_lahir")
+                if not m:
+                    warnings.append(f"[{i}] Format TTL tidak cocok: {text!r}")
+
+        if "jenis_kelamin" not in found:
+            m = _RE["val_kelamin"].search(upper)
+            if m:
+                raw_jk = re.sub(r"\s+", " ", m.group(1)).upper().strip()
+                raw_jk = re.sub(r"LAKI\s*-\s*LAKI", "LAKI-LAKI", raw_jk)
+                result.jenis_kelamin = raw_jk
+                found.add("jenis_kelamin")
+
+        if "gol_darah" not in found and _RE["trig_darah"].search(upper):
+            m = _RE["val_gol_darah"].search(upper)
+            if m:
+                result.gol_darah = m.group(1).upper()
+                found.add("gol_darah")
+
+        if "alamat" not in found and _RE["trig_alamat"].search(upper):
+            val = _strip_label(text)
+            if not val:
+                val = _next_nonempty(texts, i)
+            if val:
+                result.alamat = val.title()
+                found.add("alamat")
+
+        if "rt_rw" not in found and _RE["trig_rtrw"].search(upper):
+            m = _RE["val_rtrw"].search(text)
+            if m:
+                result.rt_rw = f"{m.group(1).zfill(3)}/{m.group(2).zfill(3)}"
+                found.add("rt_rw")
+
+        if "kelurahan" not in found and _RE["trig_kel"].search(upper):
+            val = _strip_label(text)
+            if not val:
+                val = _next_nonempty(texts, i)
+            if val:
+                result.kelurahan = val.title()
+                found.add("kelurahan")
+
+        if "kecamatan" not in found and _RE["trig_kec"].search(upper):
+            val = _strip_label(text)
+            if not val:
+                val = _next_nonempty(texts, i)
+            if val:
+                result.kecamatan = val.title()
+                found.add("kecamatan")
+
+        if "agama" not in found:
+            if _RE["trig_agama"].search(upper):
+                val = _strip_label(text).upper() or (_next_nonempty(texts, i) or "").upper()
+            else:
+                val = upper
+            for agama in AGAMA_VALID:
+                if agama in val:
+                    result.agama = "BUDDHA" if agama == "BUDHA" else agama
+                    found.add("agama")
+                    break
+
+        if "status_perkawinan" not in found:
+            m = _RE["val_status"].search(upper)
+            if m:
+                result.status_perkawinan = re.sub(r"\s+", " ", m.group(1)).upper().strip()
+                found.add("status_perkawinan")
+
+        if "pekerjaan" not in found and _RE["trig_pek"].search(upper):
+            val = _strip_label(text)
+            if not val:
+                val = _next_nonempty(texts, i)
+            if val:
+                result.pekerjaan = val.title()
+                found.add("pekerjaan")
+
+        if "kewarganegaraan" not in found and _RE["trig_warga"].search(upper):
+            m = _RE["val_warga"].search(upper)
+            if m:
+                result.kewarganegaraan = m.group(1).upper()
+                found.add("kewarganegaraan")
+
+        if "berlaku_hingga" not in found and _RE["trig_berlaku"].search(upper):
+            m = _RE["val_berlaku"].search(upper)
+            if m:
+                result.berlaku_hingga = re.sub(r"\s+", " ", m.group(1)).upper()
+                found.add("berlaku_hingga")
+
+    _post_validate(result)
+    return result
+
+
+NAMA_DEPAN = ["BUDI", "SITI", "AHMAD", "DEWI", "RIZKY", "PUTRI", "AGUS", "NUR", "EKO", "RINA"]
+NAMA_BELAKANG = ["SANTOSO", "RAHAYU", "HIDAYAT", "LESTARI", "PRATAMA", "WIJAYA", "SAPUTRA"]
+KOTA = ["BANDUNG", "BEKASI", "BOGOR", "DEPOK", "CIREBON", "TASIKMALAYA", "SUKABUMI"]
+WILAYAH = ["SUKAJADI", "CIBEUNYING", "MEKARSARI", "SUKAMAJU", "CIMAHI TENGAH", "KEBON JERUK"]
+PEKERJAAN = ["PELAJAR/MAHASISWA", "KARYAWAN SWASTA", "WIRASWASTA", "MENGURUS RUMAH TANGGA",
+             "PEGAWAI NEGERI SIPIL", "PETANI/PEKEBUN"]
+
+
+def synthetic_ground_truth(rng: random.Random) -> dict:
+    """Ground truth satu KTP dengan key yang sama seperti src/generate_synthetic.py,
+    tanpa dependensi faker/PIL (dipakai jika dataset sintetis belum dibangkitkan)."""
+    kota = rng.choice(KOTA)
+    return {
+        "Provinsi": "PROVINSI JAWA BARAT",
+        "Kabupaten/Kota": rng.choice(["KOTA ", "KABUPATEN "]) + kota,
+        "NIK": "32" + "".join(str(rng.randint(0, 9)) for _ in range(14)),
+        "Nama": f"{rng.choice(NAMA_DEPAN)} {rng.choice(NAMA_BELAKANG)}",
+        "Tempat Tanggal Lahir": f"{rng.choice(KOTA)}, {rng.randint(1, 28):02d}-"
+                                f"{rng.randint(1, 12):02d}-{rng.randint(1950, 2005)}",
+        "Jenis Kelamin": rng.choice(["LAKI-LAKI", "PEREMPUAN"]),
+        "Alamat": f"JL. {rng.choice(WILAYAH)} NO. {rng.randint(1, 200)}",
+        "RT/RW": f"{rng.randint(1, 20):03d}/{rng.randint(1, 15):03d}",
+        "Kelurahan/Desa": rng.choice(WILAYAH),
+        "Kecamatan": rng.choice(WILAYAH),
+        "Agama": rng.choice(sorted(AGAMA_VALID)),
+        "Status Perkawinan": rng.choice(["BELUM KAWIN", "KAWIN", "CERAI HIDUP", "CERAI MATI"]),
+        "Pekerjaan": rng.choice(PEKERJAAN),
+        "Kewarganegaraan": "WNI",
+        "Berlaku Hingga": "SEUMUR HIDUP",
+        "Gol. Darah": rng.choice(["A", "B", "AB", "O", "-"]),
+        "Kota Dibuat": kota,
+        "Tanggal KTP Dikeluarkan": f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-"
+                                   f"{rng.randint(2012, 2024)}",
+    }
+
+
+def load_ground_truth(cards: int, rng: random.Random) -> list[dict]:
+    """Ground truth dari dataset sintetis; dibangkitkan di sini jika belum ada."""
+    if os.path.isdir(GROUND_TRUTH_DIR):
+        gts = []
+        for fname in sorted(os.listdir(GROUND_TRUTH_DIR)):
+            if fname.endswith(".json"):
+                with open(os.path.join(GROUND_TRUTH_DIR, fname)) as f:
+                    gts.append(json.load(f))
+        if gts:
+            return gts
+    return [synthetic_ground_truth(rng) for _ in range(cards)]
+
+
+def render_lines(gt: dict, rng: random.Random) -> tuple[list[str], list[float]]:
+    """Satu variasi output OCR dari ground truth: label/nilai terpisah atau
+    digabung, huruf kecil, noise digit, baris hilang/tertukar, skor acak."""
+    lines = [gt.get("Provinsi", ""), gt.get("Kabupaten/Kota", "")]
+    for label, key in LABELS:
+        value = gt.get(key, "")
+        if rng.random() < 0.2:
+            value = "".join(DIGIT_NOISE.get(c, c) if rng.random() < 0.3 else c for c in value)
+        if rng.random() < 0.1:
+            value = value.lower()
+        if rng.random() < 0.4:
+            lines.append(f"{label}{rng.choice([' : ', ': ', ' ', ':'])}{value}")
+        else:
+            lines.extend([label, f": {value}" if rng.random() < 0.3 else value])
+    lines.extend([gt.get("Kota Dibuat", ""), gt.get("Tanggal KTP Dikeluarkan", "")])
+
+    lines = [line for line in lines if rng.random() > 0.05]
+    for _ in range(rng.randint(0, 2)):
+        if len(lines) > 1:
+            j = rng.randrange(len(lines) - 1)
+            lines[j], lines[j + 1] = lines[j + 1], lines[j]
+    scores = [round(rng.uniform(0.4, 1.0), 4) for _ in lines]
+    return lines, scores
+
+
+def build_corpus(
+    cards: int, variants: int, seed: int,
+) -> list[tuple[list[str], Optional[list[float]]]]:
+    rng = random.Random(seed)
+    corpus = []
+
+    for gt in load_ground_truth(cards, rng):
+        for _ in range(variants):
+            lines, scores = render_lines(gt, rng)
+            corpus.append((lines, scores))
+            corpus.append((lines, None))
+
+    if os.path.exists(OCR_CORPUS_PATH):
+        with open(OCR_CORPUS_PATH) as f:
+            for line in f:
+                item = json.loads(line)
+                corpus.append((item["texts"], item["scores"]))
+
+    return corpus
+
+
+def record_ocr_corpus(limit: int) -> int:
+    """Simpan teks + skor PaddleOCR mentah dari gambar sintetis ke OCR_CORPUS_PATH."""
+    from app.services.ocr_service import OCRService, _preprocess_image
+
+    ocr = OCRService()
+    samples = load_samples(limit)
+    with open(OCR_CORPUS_PATH, "w") as f:
+        for s in samples:
+            texts, scores, _ = ocr._run_ocr(_preprocess_image(s.image))
+            f.write(json.dumps({"name": s.name, "texts": texts, "scores": scores}) + "\n")
+    print(f"💾 {len(samples)} output OCR disimpan ke {OCR_CORPUS_PATH}")
+    return len(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cek _parse_ktp_texts (dispatcher satu-pass) identik dengan cascade "
+                    "regex lama pada korpus dari KTP sintetis."
+    )
+    parser.add_argument("--cards", type=int, default=100,
+                        help="jumlah KTP yang dibangkitkan jika dataset sintetis belum ada")
+    parser.add_argument("--variants", type=int, default=200, help="variasi baris OCR per kartu")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record-ocr", action="store_true",
+                        help="jalankan PaddleOCR pada gambar sintetis dan tambahkan ke korpus")
+    parser.add_argument("--limit", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.record_ocr:
+        record_ocr_corpus(args.limit)
+
+    corpus = build_corpus(args.cards, args.variants, args.seed)
+    if not corpus:
+        print("ERROR: korpus kosong (--cards dan --variants harus > 0)")
+        return 1
+
+    mismatches = 0
+    for texts, scores in corpus:
+        # field_confidence hanya diisi parser baru; yang dibandingkan nilai field.
+        old = asdict(parse_ktp_texts_legacy(list(texts), scores))
+        new = asdict(_parse_ktp_texts(list(texts), scores))
+        old.pop("field_confidence")
+        new.pop("field_confidence")
+        if old != new:
+            mismatches += 1
+            if mismatches <= 5:
+                diff = {k: (old[k], new[k]) for k in old if old[k] != new[k]}
+                print(f"✗ {texts[:4]}... -> {diff}")
+
+    timings = {}
+    for name, fn in (("cascade", parse_ktp_texts_legacy), ("dispatch", _parse_ktp_texts)):
+        t0 = time.perf_counter()
+        for texts, scores in corpus:
+            fn(list(texts), scores)
+        timings[name] = (time.perf_counter() - t0) / len(corpus) * 1e6
+
+    print(f"Korpus   : {len(corpus)} output OCR")
+    for name, us in timings.items():
+        print(f"{name:<9}: {us:8.1f} µs/kartu")
+    print(f"Speedup  : {timings['cascade'] / timings['dispatch']:.2f}x")
+
+    if mismatches:
+        print(f"\n✗ {mismatches} hasil berbeda")
+        return 1
+    print("\n✓ Hasil identik")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Cek paritas hasil deteksi antar backend YOLO (PyTorch vs ONNX Runtime vs OpenVINO).
+
+Setiap backend yang terpasang dijalankan pada gambar di Data/Generated E-ktp/images,
+lalu YOLOBox-nya dibandingkan dengan hasil backend PyTorch. Exit code 1 jika ada
+gambar yang box-nya berbeda di luar toleransi.
+
+Jalankan dari root repo:
+    python -m src.check_yolo_parity [--tol 0.01] [--score-tol 0.05]
+"""
+import argparse
+import glob
+import os
+import sys
+
+import cv2
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.services.yolo_backends import BACKENDS, is_available  # noqa: E402
+from app.services.yolo_service import MODEL_PATH, YOLOBox, YOLOService  # noqa: E402
+
+IMAGES_DIR = os.path.join(BASE_DIR, "Data", "Generated E-ktp", "images")
+
+
+def box_diff(a: YOLOBox, b: YOLOBox) -> tuple[float, float]:
+    """Selisih koordinat maksimum (ternormalisasi) dan selisih score."""
+    coord = max(abs(a.x - b.x), abs(a.y - b.y), abs(a.w - b.w), abs(a.h - b.h))
+    return coord, abs(a.score - b.score)
+
+
+def compare(reference: list[YOLOBox], other: list[YOLOBox], tol: float, score_tol: float) -> str | None:
+    if len(reference) != len(other):
+        return f"jumlah box {len(reference)} vs {len(other)}"
+    for ref, box in zip(reference, other):
+        coord, score = box_diff(ref, box)
+        if coord > tol:
+            return f"koordinat berbeda {coord:.4f} > {tol}"
+        if score > score_tol:
+            return f"score berbeda {score:.4f} > {score_tol}"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    parser.add_argument("--images", default=IMAGES_DIR)
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--tol", type=float, default=0.01, help="toleransi koordinat ternormalisasi")
+    parser.add_argument("--score-tol", type=float, default=0.05)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.images, "*.png")))
+    if not paths:
+        print(f"Tidak ada gambar di {args.images}")
+        return 1
+
+    frames = [cv2.imread(p) for p in paths]
+    backends = [b for b in BACKENDS if is_available(b)]
+    print(f"Gambar  : {len(frames)}")
+    print(f"Backend : {backends}\n")
+
+    results = {}
+    for name in backends:
+        svc = YOLOService(model_path=args.model, device=args.device, backend=name)
+        results[name] = [svc.predict(f) for f in frames]
+
+    reference = results.get("pytorch")
+    if reference is None:
+        print("Backend pytorch tidak tersedia sebagai referensi.")
+        return 1
+
+    failed = 0
+    for name, boxes in results.items():
+        if name == "pytorch":
+            continue
+        mismatches = 0
+        for path, ref, got in zip(paths, reference, boxes):
+            reason = compare(ref, got, args.tol, args.score_tol)
+            if reason:
+                mismatches += 1
+                print(f"  ✗ [{name}] {os.path.basename(path)}: {reason}")
+        status = "OK" if mismatches == 0 else f"{mismatches} beda"
+        print(f"{name:<9} vs pytorch : {status}")
+        failed += mismatches
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
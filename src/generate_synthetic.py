@@ -13,10 +13,12 @@ FIELDS_PATH = os.path.join(BASE_DIR, "Data", "Template", "fields.json")
 GENERATED_DIR = os.path.join(BASE_DIR, "Data", "Generated E-ktp")
 OUTPUT_DIR = os.path.join(GENERATED_DIR, "images")
 LABEL_DIR = os.path.join(GENERATED_DIR, "labels")
+GROUND_TRUTH_DIR = os.path.join(GENERATED_DIR, "ground_truth")
 FACE_CACHE_DIR = os.path.join(BASE_DIR, "Data", "Face Cache")
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 os.makedirs(LABEL_DIR, exist_ok=True)
+os.makedirs(GROUND_TRUTH_DIR, exist_ok=True)
 os.makedirs(FACE_CACHE_DIR, exist_ok=True)
 
 fake = Faker("id_ID")
@@ -323,12 +325,17 @@ def generate_batch(n: int = 100):
         filename = f"ktp_{i + 1:04d}"
         img_path = os.path.join(OUTPUT_DIR, f"{filename}.png")
         label_path = os.path.join(LABEL_DIR, f"{filename}.txt")
+        gt_path = os.path.join(GROUND_TRUTH_DIR, f"{filename}.json")
 
         labels = render_ktp(data, fields, img_path)
 
         with open(label_path, "w") as f:
             f.write("\n".join(labels))
 
+        # Nilai teks tiap field, dipakai benchmark OCR (src/ktp_dataset.py).
+        with open(gt_path, "w") as f:
+            json.dump(data, f, indent=4)
+
         if (i + 1) % 10 == 0:
             print(f"  {i + 1}/{n} gambar selesai")
 
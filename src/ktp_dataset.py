@@ -0,0 +1,177 @@
+"""
+Dataset KTP sintetis (src/generate_synthetic.py) + ground truth per field,
+dipakai bersama oleh script benchmark OCR (src/benchmark_*.py): muat sampel,
+ukur latency + akurasi field, dan cetak hasilnya.
+
+Dataset tidak ikut di repo. Bangkitkan dulu dengan:
+
+    pip install faker requests pillow
+    python src/find_coordinate.py       # sekali, jika Data/Template/fields.json belum ada
+    python src/generate_synthetic.py
+
+generate_synthetic.py mengunduh foto wajah (butuh internet, di-cache di
+Data/Face Cache) lalu menulis ke Data/Generated E-ktp/:
+    images/ktp_NNNN.png        kartu sintetis
+    labels/ktp_NNNN.txt        label YOLO
+    ground_truth/ktp_NNNN.json nilai tiap field (dipakai benchmark)
+Gambar lama tanpa ground_truth/ dilewati oleh load_samples().
+"""
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GENERATED_DIR = os.path.join(BASE_DIR, "Data", "Generated E-ktp")
+IMAGES_DIR = os.path.join(GENERATED_DIR, "images")
+GROUND_TRUTH_DIR = os.path.join(GENERATED_DIR, "ground_truth")
+
+# Field ground truth (nama di fields.json) -> atribut KTPData.
+GT_FIELDS: dict[str, str] = {
+    "NIK": "nik",
+    "Nama": "nama",
+    "Jenis Kelamin": "jenis_kelamin",
+    "Gol. Darah": "gol_darah",
+    "Alamat": "alamat",
+    "RT/RW": "rt_rw",
+    "Kelurahan/Desa": "kelurahan",
+    "Kecamatan": "kecamatan",
+    "Agama": "agama",
+    "Status Perkawinan": "status_perkawinan",
+    "Pekerjaan": "pekerjaan",
+    "Kewarganegaraan": "kewarganegaraan",
+    "Berlaku Hingga": "berlaku_hingga",
+}
+
+
+@dataclass
+class KTPSample:
+    name: str
+    image: np.ndarray
+    truth: dict[str, str]   # atribut KTPData -> nilai
+
+
+def normalize(value) -> str:
+    """Bandingkan nilai tanpa peduli kapitalisasi, spasi dan tanda baca."""
+    if value is None:
+        return ""
+    return re.sub(r"[^A-Z0-9]", "", str(value).upper())
+
+
+def expected_values(gt: dict[str, str]) -> dict[str, str]:
+    """Ground truth generate_synthetic -> nilai yang diharapkan per atribut KTPData."""
+    out = {attr: gt[name] for name, attr in GT_FIELDS.items() if name in gt}
+    if out.get("agama") == "BUDHA":
+        out["agama"] = "BUDDHA"
+
+    ttl = gt.get("Tempat Tanggal Lahir")
+    if ttl and "," in ttl:
+        tempat, tgl = ttl.rsplit(",", 1)
+        out["tempat_lahir"] = tempat.strip()
+        out["tgl_lahir"] = tgl.strip()
+    return out
+
+
+DATASET_MISSING = (
+    "ERROR: dataset sintetis dengan ground truth belum ada.\n"
+    "Jalankan dulu: python src/generate_synthetic.py (lihat docstring src/ktp_dataset.py)"
+)
+
+
+def load_samples(limit: int = 0) -> list[KTPSample]:
+    """Muat gambar yang punya ground truth, urut nama file."""
+    if not os.path.isdir(GROUND_TRUTH_DIR):
+        return []
+
+    samples = []
+    for fname in sorted(os.listdir(GROUND_TRUTH_DIR)):
+        if not fname.endswith(".json"):
+            continue
+        stem = os.path.splitext(fname)[0]
+        image = cv2.imread(os.path.join(IMAGES_DIR, f"{stem}.png"))
+        if image is None:
+            continue
+        with open(os.path.join(GROUND_TRUTH_DIR, fname)) as f:
+            samples.append(KTPSample(stem, image, expected_values(json.load(f))))
+        if limit and len(samples) >= limit:
+            break
+    return samples
+
+
+@dataclass
+class FieldAccuracy:
+    correct: dict[str, int] = field(default_factory=dict)
+    total: dict[str, int] = field(default_factory=dict)
+
+    def add(self, truth: dict[str, str], result) -> None:
+        for attr, expected in truth.items():
+            self.total[attr] = self.total.get(attr, 0) + 1
+            if normalize(getattr(result, attr, None)) == normalize(expected):
+                self.correct[attr] = self.correct.get(attr, 0) + 1
+
+    def field_accuracy(self, attr: str) -> float:
+        total = self.total.get(attr, 0)
+        return self.correct.get(attr, 0) / total if total else 0.0
+
+    @property
+    def overall(self) -> float:
+        total = sum(self.total.values())
+        return sum(self.correct.values()) / total if total else 0.0
+
+
+def require_samples(limit: int = 0) -> list[KTPSample]:
+    """load_samples(), keluar dengan exit code 1 jika dataset belum dibangkitkan."""
+    samples = load_samples(limit)
+    if not samples:
+        print(DATASET_MISSING)
+        sys.exit(1)
+    return samples
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class OCRRun:
+    """Latency per sampel (ms) + akurasi field satu konfigurasi OCR."""
+    accuracy: FieldAccuracy
+    latencies: list[float]
+
+    @property
+    def mean_ms(self) -> float:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    @property
+    def p95_ms(self) -> float:
+        return percentile(self.latencies, 0.95) if self.latencies else 0.0
+
+
+def run_ocr(samples: list[KTPSample], extract: Callable[[KTPSample], object], warmup: bool = True) -> OCRRun:
+    """
+    Jalankan extract(sample) -> KTPData untuk setiap sampel, catat latency dan
+    akurasi field. Sampel pertama dijalankan sekali dulu tanpa dicatat
+    (warm-up predictor).
+    """
+    if warmup and samples:
+        extract(samples[0])
+
+    run = OCRRun(FieldAccuracy(), [])
+    for s in samples:
+        t0 = time.perf_counter()
+        result = extract(s)
+        run.latencies.append((time.perf_counter() - t0) * 1000)
+        run.accuracy.add(s.truth, result)
+    return run
+
+
+def print_field_accuracy(acc: FieldAccuracy, indent: str = "      ") -> None:
+    for attr in sorted(acc.total):
+        print(f"{indent}{attr:<18} {acc.field_accuracy(attr):.0%}")
@@ -0,0 +1,235 @@
+"""
+Kuantisasi detektor KTP (YOLO26) ke INT8 OpenVINO untuk inference CPU.
+
+Langkah:
+  1. Bangun dataset YOLO (kelas: id card, photo) dari kartu sintetis di
+     Data/Generated E-ktp/images (hasil src/generate_synthetic.py). Setiap kartu
+     ditempel di kanvas dengan skala/posisi acak supaya mirip frame kamera. Kartu
+     dibagi per kartu (bukan per kanvas) menjadi split kalibrasi dan split
+     validasi held-out (--val-fraction).
+  2. Export .pt -> OpenVINO INT8 (kalibrasi NNCF via ultralytics, hanya split kalibrasi).
+  3. Validasi mAP50 model FP32 dan INT8 di split held-out. Baseline mAP50 dari run
+     mlflow di "model development/mlflow/mlruns" ditampilkan sebagai referensi
+     (dataset-nya berbeda, jadi tidak dipakai sebagai gate).
+
+Exit code 1 jika mAP50 INT8 turun lebih dari --max-drop dari FP32 di split held-out.
+Hasil dipakai YOLOService lewat backend="openvino-int8".
+
+Jalankan dari root repo:
+    python -m src.quantize_yolo [--copies 20] [--max-drop 0.01]
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from app.services.yolo_backends import EXPORT_IMGSZ, artifact_path  # noqa: E402
+from app.services.yolo_service import CLASS_NAMES, MODEL_PATH  # noqa: E402
+
+IMAGES_DIR = os.path.join(BASE_DIR, "Data", "Generated E-ktp", "images")
+FIELDS_PATH = os.path.join(BASE_DIR, "Data", "Template", "fields.json")
+MLRUNS_DIR = os.path.join(BASE_DIR, "model development", "mlflow", "mlruns")
+CALIB_DIR = os.path.join(BASE_DIR, "Data", "Calibration KTP")
+
+CANVAS_SIZE = (1280, 960)  # (w, h), kira-kira frame webcam 4:3
+
+
+def read_mlflow_metric(mlruns_dir: str, metric: str = "metrics/mAP50B", run_id: str | None = None) -> tuple[str, float]:
+    """
+    Ambil nilai terakhir (step terbesar) sebuah metric dari run mlflow lokal.
+    Tanpa run_id, dipakai run yang paling akhir selesai (end_time di meta.yaml).
+    """
+    runs = []
+    for meta in glob.glob(os.path.join(mlruns_dir, "*", "*", "meta.yaml")):
+        run_dir = os.path.dirname(meta)
+        if run_id and os.path.basename(run_dir) != run_id:
+            continue
+        end_time = 0
+        with open(meta) as f:
+            for line in f:
+                if line.startswith("end_time:"):
+                    end_time = int(line.split(":", 1)[1].strip() or 0)
+        if os.path.exists(os.path.join(run_dir, "metrics", metric)):
+            runs.append((end_time, run_dir))
+
+    if not runs:
+        raise FileNotFoundError(f"Metric {metric!r} tidak ditemukan di {mlruns_dir}")
+
+    _, run_dir = max(runs)
+    best_step, value = -1, 0.0
+    with open(os.path.join(run_dir, "metrics", metric)) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and int(parts[2]) >= best_step:
+                best_step, value = int(parts[2]), float(parts[1])
+    return os.path.basename(run_dir), value
+
+
+def place_on_canvas(card: np.ndarray, rng: random.Random) -> tuple[np.ndarray, tuple[float, float, float, float]]:
+    """Tempel kartu di kanvas acak. Return (kanvas, box kartu x1,y1,x2,y2 dalam piksel)."""
+    cw, ch = CANVAS_SIZE
+    base = rng.randint(40, 200)
+    canvas = np.full((ch, cw, 3), base, dtype=np.uint8)
+    noise = np.random.default_rng(rng.randint(0, 2 ** 31)).integers(0, 25, canvas.shape, dtype=np.uint8)
+    canvas = cv2.add(canvas, noise)
+
+    h, w = card.shape[:2]
+    scale = rng.uniform(0.45, 0.9) * min(cw / w, ch / h)
+    nw, nh = int(w * scale), int(h * scale)
+    resized = cv2.resize(card, (nw, nh), interpolation=cv2.INTER_AREA)
+
+    x1 = rng.randint(0, cw - nw)
+    y1 = rng.randint(0, ch - nh)
+    canvas[y1:y1 + nh, x1:x1 + nw] = resized
+    return canvas, (x1, y1, x1 + nw, y1 + nh)
+
+
+def yolo_line(cls_id: int, box: tuple[float, float, float, float]) -> str:
+    cw, ch = CANVAS_SIZE
+    x1, y1, x2, y2 = box
+    return f"{cls_id} {(x1 + x2) / 2 / cw:.6f} {(y1 + y2) / 2 / ch:.6f} {(x2 - x1) / cw:.6f} {(y2 - y1) / ch:.6f}"
+
+
+def write_data_yaml(path: str, root: str, split: str) -> str:
+    with open(path, "w") as f:
+        f.write(f"path: {root}\n")
+        f.write(f"train: images/{split}\n")
+        f.write(f"val: images/{split}\n")
+        f.write("names:\n")
+        for cls_id, name in CLASS_NAMES.items():
+            f.write(f"  {cls_id}: {name}\n")
+    return path
+
+
+def build_calibration_dataset(
+        images_dir: str,
+        out_dir: str,
+        copies: int,
+        seed: int = 0,
+        val_fraction: float = 0.2,
+) -> tuple[str, str]:
+    """
+    Bangun dataset YOLO (images/{calib,val} + labels/{calib,val}). Kartu held-out
+    untuk validasi tidak pernah muncul di split kalibrasi.
+    Return (data yaml kalibrasi, data yaml validasi).
+    """
+    paths = sorted(glob.glob(os.path.join(images_dir, "*.png")))
+    if len(paths) < 2:
+        raise FileNotFoundError(
+            f"Butuh minimal 2 kartu sintetis di {images_dir} (kalibrasi + held-out). "
+            "Jalankan src/generate_synthetic.py"
+        )
+
+    rng = random.Random(seed)
+    shuffled = paths[:]
+    rng.shuffle(shuffled)
+    n_val = min(len(paths) - 1, max(1, round(len(paths) * val_fraction)))
+    held_out = set(shuffled[:n_val])
+
+    with open(FIELDS_PATH) as f:
+        foto = json.load(f)["Foto"]
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    for split in ("calib", "val"):
+        os.makedirs(os.path.join(out_dir, "images", split))
+        os.makedirs(os.path.join(out_dir, "labels", split))
+
+    for path in paths:
+        split = "val" if path in held_out else "calib"
+        img_dir = os.path.join(out_dir, "images", split)
+        lbl_dir = os.path.join(out_dir, "labels", split)
+        card = cv2.imread(path)
+        h, w = card.shape[:2]
+        stem = os.path.splitext(os.path.basename(path))[0]
+
+        for k in range(copies):
+            canvas, (x1, y1, x2, y2) = place_on_canvas(card, rng)
+            sx, sy = (x2 - x1) / w, (y2 - y1) / h
+            photo = (x1 + foto[0] * sx, y1 + foto[1] * sy, x1 + foto[2] * sx, y1 + foto[3] * sy)
+
+            name = f"{stem}_{k:02d}"
+            cv2.imwrite(os.path.join(img_dir, f"{name}.jpg"), canvas)
+            with open(os.path.join(lbl_dir, f"{name}.txt"), "w") as f:
+                f.write("\n".join([yolo_line(0, (x1, y1, x2, y2)), yolo_line(1, photo)]))
+
+    # Ultralytics mengambil data kalibrasi INT8 dari split "val", jadi kalibrasi
+    # dan validasi masing-masing punya data yaml sendiri.
+    calib_yaml = write_data_yaml(os.path.join(out_dir, "calib.yaml"), out_dir, "calib")
+    val_yaml = write_data_yaml(os.path.join(out_dir, "val.yaml"), out_dir, "val")
+
+    print(f"Dataset kalibrasi: {(len(paths) - n_val) * copies} gambar, held-out: {n_val * copies} gambar -> {out_dir}")
+    return calib_yaml, val_yaml
+
+
+def validate_map50(artifact: str, data_yaml: str) -> float:
+    from ultralytics import YOLO
+
+    metrics = YOLO(artifact, task="detect").val(
+        data=data_yaml, imgsz=EXPORT_IMGSZ, batch=1, device="cpu", plots=False, verbose=False
+    )
+    return float(metrics.box.map50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=str(MODEL_PATH))
+    parser.add_argument("--images", default=IMAGES_DIR)
+    parser.add_argument("--out", default=CALIB_DIR, help="folder dataset kalibrasi")
+    parser.add_argument("--copies", type=int, default=20, help="variasi kanvas per kartu")
+    parser.add_argument("--mlruns", default=MLRUNS_DIR)
+    parser.add_argument("--run-id", default=None)
+    parser.add_argument("--val-fraction", type=float, default=0.2, help="fraksi kartu untuk validasi held-out")
+    parser.add_argument("--max-drop", type=float, default=0.01, help="toleransi penurunan mAP50 INT8 dari FP32")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    run_id, baseline = read_mlflow_metric(args.mlruns, run_id=args.run_id)
+    print(f"Baseline mlflow : run={run_id} mAP50={baseline:.4f}\n")
+
+    calib_yaml, val_yaml = build_calibration_dataset(
+        args.images, args.out, args.copies, val_fraction=args.val_fraction
+    )
+
+    print("Export OpenVINO INT8 (kalibrasi NNCF) ...")
+    exported = YOLO(args.model).export(
+        format="openvino",
+        int8=True,
+        data=calib_yaml,
+        imgsz=EXPORT_IMGSZ,
+        dynamic=True,
+    )
+    target = artifact_path(Path(args.model), "openvino-int8")
+    print(f"Artefak INT8    : {exported}")
+    if os.path.abspath(str(exported).rstrip(os.sep)) != os.path.abspath(target):
+        print(f"  ⚠ YOLOService mencari artefak di {target}")
+
+    fp32 = validate_map50(args.model, val_yaml)
+    int8 = validate_map50(str(exported), val_yaml)
+
+    print()
+    print(f"{'model':<12}{'mAP50':>10}{'Δ fp32':>10}")
+    print(f"{'mlflow':<12}{baseline:>10.4f}{'':>10}  (referensi, dataset lain)")
+    print(f"{'fp32 (.pt)':<12}{fp32:>10.4f}{'':>10}")
+    print(f"{'int8':<12}{int8:>10.4f}{int8 - fp32:>+10.4f}")
+
+    if fp32 - int8 > args.max_drop:
+        print(f"\n✗ mAP50 INT8 turun {fp32 - int8:.4f} dari FP32 > {args.max_drop}. Jangan dipakai di produksi.")
+        return 1
+
+    print('\n✓ INT8 lolos. Aktifkan dengan YOLO_BACKEND = "openvino-int8" di app/main.py.')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())